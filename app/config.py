@@ -10,4 +10,92 @@ class Config:
     DATABASE = os.getenv('DATABASE')
     HOST = os.getenv('HOST')
     PORT = os.getenv('PORT')
-    DEBUG = os.getenv('DEBUG', 'False')
\ No newline at end of file
+    DEBUG = os.getenv('DEBUG', 'False')
+
+    # gunicorn.conf.py: SERVER_WORKERS processes forked from a preloaded app, SERVER_THREADS
+    # request threads each. A worker that gets a stop signal finishes its requests for up to
+    # SERVER_GRACEFUL_TIMEOUT seconds before closing its pool.
+    # NEARBY_ENGINE=memory keeps a snapshot per process and needs SERVER_WORKERS=1.
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', str(2 * (os.cpu_count() or 1) + 1)))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', '4'))
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', '30'))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', '5'))
+
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    # 'json' writes one object per line, 'text' the plain "[time] LEVEL in module: message" lines
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    # At most LOG_RATE_LIMIT records of the same message every LOG_RATE_INTERVAL seconds; 0 disables
+    LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '20'))
+    LOG_RATE_INTERVAL = float(os.getenv('LOG_RATE_INTERVAL', '10'))
+
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30'))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+    DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', str(64 * 1024)))
+
+    # Statements slower than this are logged with their EXPLAIN QUERY PLAN; 0 disables
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+
+    # Requests are profiled when they send X-Profile-Token: PROFILE_TOKEN, or at random with
+    # PROFILE_SAMPLE_RATE (0-1). The token also guards /debug/profiles. Both unset: no hooks at all.
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_HISTORY = int(os.getenv('PROFILE_HISTORY', '50'))
+
+    # 'sql' queries SpatiaLite on every request, 'memory' serves nearby queries from NumPy arrays.
+    NEARBY_ENGINE = os.getenv('NEARBY_ENGINE', 'sql')
+
+    # 'nominatim' geocodes every name remotely; 'gazetteer' looks names up in GAZETTEER_DATABASE
+    # (loaded with `cli.py gazetteer-import`) and calls Nominatim only on a miss; 'offline' never calls it.
+    GEOCODER = os.getenv('GEOCODER', 'nominatim')
+    GAZETTEER_DATABASE = os.getenv('GAZETTEER_DATABASE', 'gazetteer.db')
+
+    GEOCODE_CACHE_TTL = float(os.getenv('GEOCODE_CACHE_TTL', str(30 * 24 * 3600)))
+    GEOCODE_CACHE_NEGATIVE_TTL = float(os.getenv('GEOCODE_CACHE_NEGATIVE_TTL', str(24 * 3600)))
+    GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv('GEOCODE_CACHE_MAX_ENTRIES', '100000'))
+
+    # Nominatim's usage policy allows at most one request per second
+    NOMINATIM_RATE_LIMIT = float(os.getenv('NOMINATIM_RATE_LIMIT', '1'))
+    NOMINATIM_RATE_BURST = float(os.getenv('NOMINATIM_RATE_BURST', '1'))
+    NOMINATIM_CONNECT_TIMEOUT = float(os.getenv('NOMINATIM_CONNECT_TIMEOUT', '3.05'))
+    NOMINATIM_READ_TIMEOUT = float(os.getenv('NOMINATIM_READ_TIMEOUT', '10'))
+    NOMINATIM_RETRIES = int(os.getenv('NOMINATIM_RETRIES', '2'))
+    NOMINATIM_BACKOFF = float(os.getenv('NOMINATIM_BACKOFF', '0.5'))
+    NOMINATIM_POOL_SIZE = int(os.getenv('NOMINATIM_POOL_SIZE', '10'))
+    GEOCODE_WORKERS = int(os.getenv('GEOCODE_WORKERS', '4'))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '1000'))
+
+    # 'sync' geocodes inside POST/PUT /locations; 'async' answers 202 with a job id and geocodes in
+    # JOB_WORKERS background threads per process. A running job whose lease (JOB_LEASE seconds)
+    # expires, e.g. because its process died, is picked up again.
+    WRITE_MODE = os.getenv('WRITE_MODE', 'sync')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+    JOB_BACKOFF = float(os.getenv('JOB_BACKOFF', '2'))
+    JOB_LEASE = float(os.getenv('JOB_LEASE', '300'))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+    JOB_RETENTION = float(os.getenv('JOB_RETENTION', str(7 * 24 * 3600)))
+
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '5000'))
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+
+    PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', '50'))
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', '500'))
+
+    NEAREST_INITIAL_RADIUS_KM = float(os.getenv('NEAREST_INITIAL_RADIUS_KM', '5'))
+    NEARBY_STREAM_BATCH_SIZE = int(os.getenv('NEARBY_STREAM_BATCH_SIZE', '1000'))
+
+    # Candidate rows the /nearby result cache may hold in total; 0 (the default) disables it.
+    # The grid cell is about 1.1 km at the equator.
+    NEARBY_CACHE_MAX_ROWS = int(os.getenv('NEARBY_CACHE_MAX_ROWS', '0'))
+    NEARBY_CACHE_TTL = float(os.getenv('NEARBY_CACHE_TTL', '60'))
+    NEARBY_CACHE_GRID_DEG = float(os.getenv('NEARBY_CACHE_GRID_DEG', '0.01'))
+
+    CLUSTERS_MAX_CELLS = int(os.getenv('CLUSTERS_MAX_CELLS', '1024'))
+
+    # 'model' validates /nearby and /nearest rows with their Pydantic models, 'fast' hands
+    # the repository rows straight to the JSON encoder. Both produce the same JSON.
+    RESPONSE_MODE = os.getenv('RESPONSE_MODE', 'model')
@@ -1,23 +1,81 @@
 import http
+import io
 
-from flask import request
+from flask import Response, request, stream_with_context, url_for
 from flask_restx import Namespace, Resource
 from pydantic import ValidationError
 
+from app.controllers.representations import iter_json_array
 from app.controllers.swagger.location_model import LocationModel
-from app.exceptions import ConflictError, NotFoundError, UnprocessableEntityError
+from app.exceptions import BadRequestError, ConflictError, NotFoundError, UnprocessableEntityError
 from app.registry import Registry
-from app.schemas.location_schema import LocationIn, LocationNearbyIn
+from app.schemas.location_schema import (
+    LocationBatchIn,
+    LocationClustersIn,
+    LocationImportIn,
+    LocationIn,
+    LocationNearbyBatchIn,
+    LocationNearbyPageIn,
+    LocationNearestIn,
+    LocationPageIn,
+    LocationWithinBoxIn,
+    LocationWithinPolygonIn,
+)
+from app.services.location_transfer import MIMETYPES
 
 location_ns = Namespace('locations', description='Location operations')
 location_model = LocationModel(location_ns)
 
 
+def _write_location(registry, name, location_id=None):
+    """Create (or update ``location_id``) now, or with WRITE_MODE=async queue it and answer 202 with the job."""
+    if registry.config.WRITE_MODE == 'async':
+        jobs = registry.geocode_jobs()
+        job = jobs.submit_create(name) if location_id is None else jobs.submit_update(location_id, name)
+        return job.model_dump(), http.HTTPStatus.ACCEPTED, {'Location': url_for('geocode_job', id=job.id)}
+
+    location_service = registry.location()
+    if location_id is None:
+        return location_service.create_location(name).model_dump(), http.HTTPStatus.CREATED
+    return location_service.update_location(location_id, name).model_dump(), http.HTTPStatus.OK
+
+
+def _nearby_body(location_service, config, payload):
+    """A page when limit or cursor is given, otherwise every location in the radius."""
+    if payload.limit is not None or payload.cursor is not None:
+        return location_service.get_nearby_page(payload).model_dump()
+    if config.RESPONSE_MODE == 'fast':
+        return location_service.get_nearby_rows(payload.lat, payload.lon, payload.radius_km)
+    locations = location_service.get_nearby_locations(payload.lat, payload.lon, payload.radius_km)
+    return [loc.model_dump() for loc in locations]
+
+
 @location_ns.route('/')
-class CreateLocationController(Resource):
+class LocationsController(Resource):
+    @staticmethod
+    @location_ns.param('limit', 'Page size', required=False)
+    @location_ns.param('cursor', 'next_cursor returned by the previous page', required=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.location_page_response())
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def get():
+        try:
+            payload = LocationPageIn(**request.args)
+            registry = Registry.current()
+            location_service = registry.location()
+            page = location_service.list_locations(payload.cursor, payload.limit)
+            return page.model_dump(), http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
     @staticmethod
     @location_ns.expect(location_model.location_post(), validate=False)
     @location_ns.response(http.HTTPStatus.CREATED, 'Created', location_model.location_response())
+    @location_ns.response(http.HTTPStatus.ACCEPTED, 'Geocoding job queued', location_model.geocode_job_response())
     @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Failed to search for name', location_model.error_response())
     @location_ns.response(
         http.HTTPStatus.UNPROCESSABLE_ENTITY,
@@ -29,10 +87,7 @@ class CreateLocationController(Resource):
     def post():
         try:
             data = LocationIn(**location_ns.payload)
-            registry = Registry()
-            location_service = registry.location()
-            location = location_service.create_location(data.name)
-            return location.model_dump(), http.HTTPStatus.CREATED
+            return _write_location(Registry.current(), data.name)
         except ValidationError as e:
             return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
         except UnprocessableEntityError:
@@ -43,6 +98,71 @@ class CreateLocationController(Resource):
             return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@location_ns.route('/batch')
+class BatchCreateLocationController(Resource):
+    @staticmethod
+    @location_ns.expect(location_model.location_batch_post(), validate=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', [location_model.location_batch_response()])
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def post():
+        try:
+            data = LocationBatchIn(**location_ns.payload)
+            registry = Registry.current()
+            location_service = registry.location()
+            results = location_service.create_locations(data.names)
+            return [item.model_dump() for item in results], http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@location_ns.route('/import')
+class ImportLocationsController(Resource):
+    @staticmethod
+    @location_ns.param('format', 'ndjson or csv, rows with id (optional), name, lat and lon', default='ndjson')
+    @location_ns.param('chunk_size', 'Rows committed per transaction', required=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.import_response())
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def post():
+        try:
+            fmt = request.args.get('format', 'ndjson')
+            payload = LocationImportIn(**request.args)
+            registry = Registry.current()
+            location_service = registry.location()
+            stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+            chunk_size = payload.chunk_size or registry.config.IMPORT_CHUNK_SIZE
+            stats = location_service.import_locations(stream, fmt, chunk_size)
+            return stats, http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@location_ns.route('/export')
+class ExportLocationsController(Resource):
+    @staticmethod
+    @location_ns.param('format', 'ndjson or csv', default='ndjson')
+    @location_ns.response(http.HTTPStatus.OK, 'Streamed rows with id, name, lat and lon')
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    def get():
+        try:
+            fmt = request.args.get('format', 'ndjson')
+            registry = Registry.current()
+            location_service = registry.location()
+            rows = location_service.export_locations(fmt)
+            return Response(stream_with_context(rows), mimetype=MIMETYPES[fmt])
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+
+
 @location_ns.route('/<string:id>')
 class LocationController(Resource):
     @staticmethod
@@ -51,7 +171,7 @@ class LocationController(Resource):
     @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
     def get(id):
         try:
-            registry = Registry()
+            registry = Registry.current()
             location_service = registry.location()
             location = location_service.get_location_by_id(id)
             return location.model_dump(), http.HTTPStatus.OK
@@ -64,6 +184,7 @@ class LocationController(Resource):
     @staticmethod
     @location_ns.expect(location_model.location_post(), validate=False)
     @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.location_response())
+    @location_ns.response(http.HTTPStatus.ACCEPTED, 'Geocoding job queued', location_model.geocode_job_response())
     @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Failed to search for name', location_model.error_response())
     @location_ns.response(
         http.HTTPStatus.UNPROCESSABLE_ENTITY,
@@ -76,10 +197,7 @@ class LocationController(Resource):
     def put(id):
         try:
             data = LocationIn(**location_ns.payload)
-            registry = Registry()
-            location_service = registry.location()
-            location = location_service.update_location(id, data.name)
-            return location.model_dump(), http.HTTPStatus.OK
+            return _write_location(Registry.current(), data.name, id)
         except ValidationError as e:
             return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
         except UnprocessableEntityError:
@@ -96,7 +214,7 @@ class LocationController(Resource):
     @location_ns.response(http.HTTPStatus.NOT_FOUND, 'Location not found', location_model.error_response())
     def delete(id):
         try:
-            registry = Registry()
+            registry = Registry.current()
             location_service = registry.location()
             if location_service.delete_location(id):
                 return '', http.HTTPStatus.NO_CONTENT
@@ -104,21 +222,156 @@ class LocationController(Resource):
             return {'error': 'Location not found'}, http.HTTPStatus.NOT_FOUND
 
 
+@location_ns.route('/jobs/<string:id>', endpoint='geocode_job')
+class GeocodeJobController(Resource):
+    @staticmethod
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.geocode_job_response())
+    @location_ns.response(http.HTTPStatus.NOT_FOUND, 'Job not found', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def get(id):
+        try:
+            registry = Registry.current()
+            job = registry.geocode_jobs().get_job(id)
+            return job.model_dump(), http.HTTPStatus.OK
+        except NotFoundError:
+            return {'error': 'Job not found'}, http.HTTPStatus.NOT_FOUND
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
 @location_ns.route('/nearby')
 class NearbyLocationsController(Resource):
     @staticmethod
     @location_ns.param('lat', 'Latitude of the reference point', required=True)
     @location_ns.param('lon', 'Longitude of the reference point', required=True)
     @location_ns.param('radius_km', 'Radius in kilometers', required=False)
+    @location_ns.param('limit', 'Page size; the response becomes {items, next_cursor}', required=False)
+    @location_ns.param('cursor', 'next_cursor returned by the previous page', required=False)
+    @location_ns.param('stream', 'true streams every result as a chunked JSON array', required=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.location_nearby_response())
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Failed fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def get():
+        try:
+            payload = LocationNearbyPageIn(**request.args)
+            registry = Registry.current()
+            location_service = registry.location()
+            if payload.stream:
+                rows = location_service.iter_nearby_rows(payload.lat, payload.lon, payload.radius_km)
+                chunks = iter_json_array(rows, registry.config.NEARBY_STREAM_BATCH_SIZE)
+                return Response(stream_with_context(chunks), mimetype='application/json')
+            return _nearby_body(location_service, registry.config, payload), http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@location_ns.route('/nearby/batch')
+class BatchNearbyLocationsController(Resource):
+    @staticmethod
+    @location_ns.expect(location_model.location_nearby_batch_post(), validate=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', [location_model.location_nearby_batch_response()])
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def post():
+        try:
+            data = LocationNearbyBatchIn(**location_ns.payload)
+            registry = Registry.current()
+            location_service = registry.location()
+            results = location_service.get_nearby_locations_batch(data.queries)
+            return [item.model_dump() for item in results], http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@location_ns.route('/within')
+class WithinLocationsController(Resource):
+    @staticmethod
+    @location_ns.param('bbox', 'min_lon,min_lat,max_lon,max_lat', required=True)
+    @location_ns.param('limit', 'Page size', required=False)
+    @location_ns.param('cursor', 'next_cursor returned by the previous page', required=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.location_page_response())
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def get():
+        try:
+            payload = LocationWithinBoxIn(**request.args)
+            registry = Registry.current()
+            location_service = registry.location()
+            page = location_service.get_locations_within_box(payload)
+            return page.model_dump(), http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    @location_ns.expect(location_model.location_within_post(), validate=False)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.location_page_response())
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def post():
+        try:
+            data = LocationWithinPolygonIn(**location_ns.payload)
+            registry = Registry.current()
+            location_service = registry.location()
+            page = location_service.get_locations_within_polygon(data)
+            return page.model_dump(), http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except BadRequestError as e:
+            return {'error': 'Invalid fields', 'details': str(e)}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@location_ns.route('/clusters')
+class ClustersController(Resource):
+    @staticmethod
+    @location_ns.param('bbox', 'min_lon,min_lat,max_lon,max_lat', required=True)
+    @location_ns.param('zoom', 'Map zoom level (0-22)', required=True)
+    @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.clusters_response())
+    @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Invalid fields', location_model.error_response())
+    @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
+    def get():
+        try:
+            payload = LocationClustersIn(**request.args)
+            registry = Registry.current()
+            location_service = registry.location()
+            clusters = location_service.get_clusters(payload)
+            return clusters.model_dump(), http.HTTPStatus.OK
+        except ValidationError as e:
+            return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
+        except Exception:
+            return {'error': 'Internal server'}, http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@location_ns.route('/nearest')
+class NearestLocationsController(Resource):
+    @staticmethod
+    @location_ns.param('lat', 'Latitude of the reference point', required=True)
+    @location_ns.param('lon', 'Longitude of the reference point', required=True)
+    @location_ns.param('k', 'Number of locations to return (1-100)', required=False)
     @location_ns.response(http.HTTPStatus.OK, 'Ok', location_model.location_nearby_response())
     @location_ns.response(http.HTTPStatus.BAD_REQUEST, 'Failed fields', location_model.error_response())
     @location_ns.response(http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server', location_model.error_response())
     def get():
         try:
-            payload = LocationNearbyIn(**request.args)
-            registry = Registry()
+            payload = LocationNearestIn(**request.args)
+            registry = Registry.current()
             location_service = registry.location()
-            locations = location_service.get_nearby_locations(payload.lat, payload.lon, payload.radius_km)
+            if registry.config.RESPONSE_MODE == 'fast':
+                return location_service.get_nearest_rows(payload.lat, payload.lon, payload.k), http.HTTPStatus.OK
+            locations = location_service.get_nearest_locations(payload.lat, payload.lon, payload.k)
             return [loc.model_dump() for loc in locations], http.HTTPStatus.OK
         except ValidationError as e:
             return {'error': 'Invalid fields', 'details': e.errors()}, http.HTTPStatus.BAD_REQUEST
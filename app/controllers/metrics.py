@@ -0,0 +1,33 @@
+import time
+
+from flask import Blueprint, Response, g, request
+
+from app.metrics import HTTP_REQUEST_SECONDS, metrics
+from app.registry import Registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # The route template, not the path, so ids do not become label values. Streamed
+        # bodies are still being generated at this point and are not included.
+        rule = request.url_rule
+        endpoint = rule.rule if rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, endpoint, str(response.status_code))
+    return response
+
+
+@metrics_bp.get('/metrics')
+def get_metrics():
+    """Prometheus text format; each worker process reports its own series."""
+    return Response(metrics.render(Registry.current().stats()), content_type=PROMETHEUS_CONTENT_TYPE)
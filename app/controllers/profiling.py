@@ -0,0 +1,80 @@
+import hmac
+import random
+
+from flask import Blueprint, g, jsonify, request
+
+from app.logger import logger
+from app.profiling import Profile
+from app.registry import Registry
+
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+
+# Registered by create_app() only when PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set
+profiling_bp = Blueprint('profiling', __name__)
+
+
+def _has_token(config) -> bool:
+    token = request.headers.get(PROFILE_TOKEN_HEADER, '')
+    return bool(config.PROFILE_TOKEN) and hmac.compare_digest(token.encode(), config.PROFILE_TOKEN.encode())
+
+
+@profiling_bp.before_app_request
+def start_profile():
+    if request.blueprint == profiling_bp.name:
+        return
+    config = Registry.current().config
+    if _has_token(config):
+        reason = 'token'
+    elif random.random() < config.PROFILE_SAMPLE_RATE:
+        reason = 'sample'
+    else:
+        return
+    g.profile = Profile(request.method, request.full_path.rstrip('?'), reason).start()
+
+
+@profiling_bp.after_app_request
+def finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        _store(profile, response.status_code)
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+
+@profiling_bp.teardown_app_request
+def discard_profile(error=None):
+    # after_request does not run when an exception propagates out of the app
+    profile = g.pop('profile', None)
+    if profile is not None:
+        _store(profile, 500)
+
+
+def _store(profile, status):
+    report = profile.finish(status)
+    Registry.current().profiles().add(report)
+    logger.info(
+        'Profiled %s %s -> %s in %s ms, %d SQL statements (profile %s)',
+        report['method'],
+        report['path'],
+        status,
+        report['ms'],
+        len(report['statements']),
+        report['id'],
+    )
+
+
+@profiling_bp.get('/debug/profiles')
+def list_profiles():
+    if not _has_token(Registry.current().config):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(Registry.current().profiles().summaries())
+
+
+@profiling_bp.get('/debug/profiles/<string:profile_id>')
+def get_profile(profile_id):
+    if not _has_token(Registry.current().config):
+        return jsonify({'error': 'Forbidden'}), 403
+    report = Registry.current().profiles().get(profile_id)
+    if report is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(report)
@@ -0,0 +1,32 @@
+from typing import Dict, Iterable, Iterator
+
+import orjson
+from flask import current_app, make_response
+
+# Same output as flask-restx's stdlib encoder, parsed: non-str keys become strings,
+# NumPy scalars become numbers and the body ends with a newline.
+_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def output_json(data, code, headers=None):
+    """Makes a Flask response with an orjson encoded body"""
+    option = _OPTIONS | orjson.OPT_INDENT_2 if current_app.debug else _OPTIONS
+    resp = make_response(orjson.dumps(data, option=option), code)
+    resp.headers.extend(headers or {})
+    return resp
+
+
+def iter_json_array(rows: Iterable[Dict], rows_per_chunk: int) -> Iterator[bytes]:
+    """Encode rows as one JSON array, yielding a chunk every ``rows_per_chunk`` rows."""
+    yield b'['
+    chunk = []
+    separator = b''
+    for row in rows:
+        chunk.append(orjson.dumps(row, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+        if len(chunk) == rows_per_chunk:
+            yield separator + b','.join(chunk)
+            chunk = []
+            separator = b','
+    if chunk:
+        yield separator + b','.join(chunk)
+    yield b']\n'
@@ -22,6 +22,17 @@ class LocationModel:
             },
         )
 
+    def location_page_response(self):
+        return self.namespace.model(
+            'LocationPageResponse',
+            {
+                'items': fields.List(fields.Nested(self.location_response()), description='Locations in this page'),
+                'next_cursor': fields.String(
+                    description='Opaque cursor for the next page, null on the last page', default=None
+                ),
+            },
+        )
+
     def location_nearby_response(self):
         return self.namespace.model(
             'LocationNearbyResponse',
@@ -34,6 +45,121 @@ class LocationModel:
             },
         )
 
+    def clusters_response(self):
+        cluster = self.namespace.model(
+            'LocationCluster',
+            {
+                'cell': fields.Integer(description='Grid cell ID at the response level'),
+                'count': fields.Integer(description='Number of locations in the cell'),
+                'lat': fields.Float(description='Latitude of the centroid of the cell locations'),
+                'lon': fields.Float(description='Longitude of the centroid of the cell locations'),
+            },
+        )
+        return self.namespace.model(
+            'LocationClustersResponse',
+            {
+                'level': fields.Integer(description='Grid level: cells are 360 / 2**level degrees wide'),
+                'clusters': fields.List(fields.Nested(cluster), description='Non-empty cells intersecting the bbox'),
+            },
+        )
+
+    def location_nearby_batch_post(self):
+        query = self.namespace.model(
+            'LocationNearbyQuery',
+            {
+                'lat': fields.Float(required=True, description='Latitude of the reference point'),
+                'lon': fields.Float(required=True, description='Longitude of the reference point'),
+                'radius_km': fields.Float(description='Radius in kilometers', default=10),
+            },
+        )
+        return self.namespace.model(
+            'LocationNearbyBatch',
+            {'queries': fields.List(fields.Nested(query), required=True, description='Nearby queries')},
+        )
+
+    def location_nearby_batch_response(self):
+        return self.namespace.model(
+            'LocationNearbyBatchItemResponse',
+            {
+                'lat': fields.Float(description='Latitude of the reference point'),
+                'lon': fields.Float(description='Longitude of the reference point'),
+                'radius_km': fields.Float(description='Radius in kilometers'),
+                'locations': fields.List(
+                    fields.Nested(self.location_nearby_response()), description='Locations within radius_km'
+                ),
+            },
+        )
+
+    def location_within_post(self):
+        geometry = self.namespace.model(
+            'GeoJSONPolygon',
+            {
+                'type': fields.String(required=True, enum=['Polygon', 'MultiPolygon']),
+                'coordinates': fields.Raw(
+                    required=True,
+                    description='Closed rings of [lon, lat] positions',
+                    example=[[[0, 0], [1, 0], [1, 1], [0, 0]]],
+                ),
+            },
+        )
+        return self.namespace.model(
+            'LocationWithin',
+            {
+                'geometry': fields.Nested(geometry, required=True),
+                'limit': fields.Integer(description='Page size', default=None),
+                'cursor': fields.String(description='next_cursor returned by the previous page', default=None),
+            },
+        )
+
+    def location_batch_post(self):
+        return self.namespace.model(
+            'LocationBatchCreate',
+            {'names': fields.List(fields.String, required=True, description='Names of the locations')},
+        )
+
+    def location_batch_response(self):
+        return self.namespace.model(
+            'LocationBatchItemResponse',
+            {
+                'name': fields.String(description='Name of the location'),
+                'status': fields.Integer(description='HTTP status of this item', example=201),
+                'location': fields.Nested(self.location_response(), allow_null=True, default=None),
+                'error': fields.String(description='Error message', default=None),
+            },
+        )
+
+    def import_response(self):
+        return self.namespace.model(
+            'LocationImportResponse',
+            {
+                'imported': fields.Integer(description='Rows inserted'),
+                'skipped': fields.Integer(description='Valid rows whose id already existed'),
+                'rejected': fields.Integer(description='Rows that failed validation'),
+                'seconds': fields.Float(description='Import duration in seconds'),
+                'rows_per_sec': fields.Float(description='Inserted rows per second'),
+            },
+        )
+
+    def geocode_job_response(self):
+        return self.namespace.model(
+            'GeocodeJobResponse',
+            {
+                'id': fields.String(description='Job ID (UUID)'),
+                'operation': fields.String(description='Write the job performs', enum=['create', 'update']),
+                'status': fields.String(description='Job status', enum=['pending', 'running', 'succeeded', 'failed']),
+                'name': fields.String(description='Name being geocoded'),
+                'location_id': fields.String(description='Location updated, or created once succeeded', default=None),
+                'attempts': fields.Integer(description='Attempts started so far'),
+                'location': fields.Nested(self.location_response(), allow_null=True, default=None),
+                'error': fields.String(description='Last error message', default=None),
+                'error_status': fields.Integer(
+                    description='HTTP status the synchronous call would return', example=409, default=None
+                ),
+                'created_at': fields.Float(description='Unix time the job was submitted'),
+                'updated_at': fields.Float(description='Unix time of the last status change'),
+            },
+        )
+
     def error_response(self):
         return self.namespace.model(
             'ErrorResponse',
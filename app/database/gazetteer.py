@@ -0,0 +1,35 @@
+from .sqlite import DatabaseSqlite
+
+# Plain SQLite, no SpatiaLite: the gazetteer only maps names to coordinates. name_key is the
+# accent- and punctuation-free form of the name; places_fts indexes it by trigram so a lookup
+# can find names containing every word of the query. It is an external-content table rebuilt
+# at the end of each import.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS places (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    importance REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_places_name_key ON places (name_key, importance DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS places_fts USING fts5(
+    name_key, content='places', content_rowid='id', tokenize='trigram'
+);
+"""
+
+
+class GazetteerDatabase(DatabaseSqlite):
+    """Pooled connections to GAZETTEER_DATABASE, created with its schema on first use."""
+
+    @property
+    def path(self) -> str:
+        return self.config.GAZETTEER_DATABASE
+
+    def connect(self):
+        return self._tune(self._open())
+
+    @staticmethod
+    def initialize(conn) -> None:
+        conn.executescript(SCHEMA_SQL)
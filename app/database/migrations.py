@@ -0,0 +1,146 @@
+import sqlite3
+
+from ..logger import logger
+from ..utils import normalize_name
+from .utils_sqlite import CLUSTER_LEVELS, grid_cells, precompute_coordinates
+
+# The base schema (locations + geom + spatial index) is created by
+# scritps/init_db_spatial.sh. Everything added after that lives here and is
+# applied once per database, tracked by PRAGMA user_version.
+
+
+def _add_precomputed_coordinates(conn: sqlite3.Connection) -> None:
+    conn.execute('ALTER TABLE locations ADD COLUMN lat_rad REAL')
+    conn.execute('ALTER TABLE locations ADD COLUMN lon_rad REAL')
+    conn.execute('ALTER TABLE locations ADD COLUMN cos_lat REAL')
+
+    # Backfilled from Python so the stored values are exactly the ones
+    # precompute_coordinates() writes for new rows.
+    rows = conn.execute('SELECT ROWID, Y(geom), X(geom) FROM locations').fetchall()
+    conn.executemany(
+        'UPDATE locations SET lat_rad = ?, lon_rad = ?, cos_lat = ? WHERE ROWID = ?',
+        ((*precompute_coordinates(lat, lon), rowid) for rowid, lat, lon in rows),
+    )
+
+
+def _create_geocode_cache(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE geocode_cache (
+            name_key TEXT PRIMARY KEY,
+            lat REAL,
+            lon REAL,
+            found INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    """)
+    conn.execute('CREATE INDEX idx_geocode_cache_last_used_at ON geocode_cache (last_used_at)')
+
+
+def _add_cluster_cells(conn: sqlite3.Connection) -> None:
+    for level in CLUSTER_LEVELS:
+        conn.execute(f'ALTER TABLE locations ADD COLUMN cell_{level} INTEGER')
+
+    rows = conn.execute('SELECT ROWID, Y(geom), X(geom) FROM locations').fetchall()
+    assignments = ', '.join(f'cell_{level} = ?' for level in CLUSTER_LEVELS)
+    conn.executemany(
+        f'UPDATE locations SET {assignments} WHERE ROWID = ?',
+        ((*grid_cells(lat, lon), rowid) for rowid, lat, lon in rows),
+    )
+
+    # Covering indexes: clusters are counted and averaged without touching the table
+    for level in CLUSTER_LEVELS:
+        conn.execute(f'CREATE INDEX idx_locations_cell_{level} ON locations (cell_{level}, lat_rad, lon_rad)')
+
+
+def _add_normalized_name(conn: sqlite3.Connection) -> None:
+    conn.execute('ALTER TABLE locations ADD COLUMN name_normalized TEXT')
+
+    # Rows whose name already collides with an older one keep a NULL key: they are
+    # left untouched, and the unique index guards every write from now on.
+    seen = set()
+    updates = []
+    duplicates = 0
+    for rowid, name in conn.execute('SELECT ROWID, name FROM locations ORDER BY ROWID').fetchall():
+        key = normalize_name(name)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        updates.append((key, rowid))
+    conn.executemany('UPDATE locations SET name_normalized = ? WHERE ROWID = ?', updates)
+    if duplicates:
+        logger.warning('%d locations share a normalized name with an older one and were left unindexed', duplicates)
+
+    conn.execute('CREATE UNIQUE INDEX idx_locations_name_normalized ON locations (name_normalized)')
+
+
+def _create_geocode_jobs(conn: sqlite3.Connection) -> None:
+    # run_at is when a pending job may next be tried, or when a running job's lease expires
+    conn.execute("""
+        CREATE TABLE geocode_jobs (
+            id TEXT PRIMARY KEY,
+            operation TEXT NOT NULL,
+            location_id TEXT,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_at REAL NOT NULL,
+            result TEXT,
+            error TEXT,
+            error_status INTEGER,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute('CREATE INDEX idx_geocode_jobs_status_run_at ON geocode_jobs (status, run_at)')
+
+
+def _create_locations_generation(conn: sqlite3.Connection) -> None:
+    # Bumped in the same transaction as every write to locations, whichever process or
+    # tool makes it, so caches of query results can tell they are stale (NearbyResultCache)
+    conn.execute('CREATE TABLE locations_generation (generation INTEGER NOT NULL)')
+    conn.execute('INSERT INTO locations_generation (generation) VALUES (0)')
+    for event in ('INSERT', 'UPDATE OF name, geom', 'DELETE'):
+        conn.execute(f"""
+            CREATE TRIGGER locations_generation_{event.split()[0].lower()} AFTER {event} ON locations BEGIN
+                UPDATE locations_generation SET generation = generation + 1;
+            END
+        """)
+
+
+def _create_rate_limits(conn: sqlite3.Connection) -> None:
+    # One row per limited service, shared by every worker process (SharedTokenBucket)
+    conn.execute('CREATE TABLE rate_limits (key TEXT PRIMARY KEY, next_at REAL NOT NULL)')
+
+
+MIGRATIONS = [
+    (1, _add_precomputed_coordinates),
+    (2, _create_geocode_cache),
+    (3, _add_cluster_cells),
+    (4, _add_normalized_name),
+    (5, _create_geocode_jobs),
+    (6, _create_locations_generation),
+    (7, _create_rate_limits),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> None:
+    has_locations = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'locations'").fetchone()
+    if not has_locations:
+        logger.warning('Table locations not found, skipping migrations (run scritps/init_db_spatial.sh first)')
+        return
+
+    # BEGIN IMMEDIATE serializes concurrent workers; the version is re-read under the lock.
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, apply in MIGRATIONS:
+            if number > version:
+                logger.info('Applying database migration %d: %s', number, apply.__name__)
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
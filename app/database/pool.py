@@ -0,0 +1,179 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from ..logger import logger
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of warm SQLite connections.
+
+    Connections are created lazily by ``factory`` up to ``size`` and handed out
+    LIFO, so the most recently used (hottest) connection is reused first.
+    """
+
+    def __init__(self, factory, size: int, timeout: float, health_check_interval: float):
+        self._factory = factory
+        self._size = size
+        self._timeout = timeout
+        self._health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._closed = False
+
+        self._acquired = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._health_check_failures = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise PoolTimeoutError('Connection pool is closed')
+
+        start = time.perf_counter()
+        waited = False
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._create_if_capacity()
+            last_used = None
+            if conn is None:
+                waited = True
+                try:
+                    conn, last_used = self._idle.get(timeout=self._timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeoutError(f'Timed out after {self._timeout}s waiting for a database connection')
+
+        if last_used is not None and time.monotonic() - last_used > self._health_check_interval:
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                conn = self._create()
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._acquired += 1
+            if waited:
+                self._waits += 1
+                self._wait_seconds += elapsed
+                self._max_wait_seconds = max(self._max_wait_seconds, elapsed)
+        return conn
+
+    def release(self, conn: sqlite3.Connection, check: bool = False) -> None:
+        if self._closed:
+            self._discard(conn)
+            return
+
+        if check and not self._is_healthy(conn):
+            self._discard(conn)
+            try:
+                conn = self._create()
+            except Exception:
+                logger.exception('Failed to replace unhealthy database connection')
+                return
+
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # Includes GeneratorExit from abandoned streaming generators
+            self.release(conn, check=True)
+            raise
+        else:
+            self.release(conn)
+
+    def warm_up(self) -> None:
+        """Open every connection up front so the first requests do not pay for it."""
+        conns = []
+        while (conn := self._create_if_capacity()) is not None:
+            conns.append(conn)
+        for conn in conns:
+            self.release(conn)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': self._size,
+                'open': self._open,
+                'idle': self._idle.qsize(),
+                'in_use': self._open - self._idle.qsize(),
+                'acquired': self._acquired,
+                'waits': self._waits,
+                'wait_seconds_total': self._wait_seconds,
+                'wait_seconds_max': self._max_wait_seconds,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'health_check_failures': self._health_check_failures,
+            }
+
+    def _create_if_capacity(self):
+        with self._lock:
+            if self._open >= self._size:
+                return None
+            self._open += 1
+        try:
+            conn = self._factory()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _create(self) -> sqlite3.Connection:
+        conn = self._create_if_capacity()
+        if conn is None:
+            raise PoolTimeoutError('Connection pool is exhausted')
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            logger.exception('Failed to close database connection')
+        with self._lock:
+            self._open -= 1
+            self._discarded += 1
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            logger.warning('Discarding unhealthy database connection')
+            with self._lock:
+                self._health_check_failures += 1
+            return False
@@ -1,31 +1,215 @@
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
+from time import perf_counter
 
 from ..logger import logger
-from .utils_sqlite import haversine
+from ..metrics import DB_ERRORS, DB_SLOW_STATEMENTS, DB_STATEMENT_SECONDS, statement_family
+from ..profiling import current_profile
+from .migrations import migrate
+from .pool import ConnectionPool
 
 
 class DatabaseSqlite:
+    # Pools are process-wide and keyed by database path, so every DatabaseSqlite
+    # pointing at the same file shares the same warm connections.
+    _pools = {}
+    _pools_lock = threading.Lock()
+
     def __init__(self, config):
         self.config = config
+        # 0 turns slow statement logging off
+        self.slow_seconds = config.SLOW_QUERY_MS / 1000 if config.SLOW_QUERY_MS > 0 else float('inf')
+
+    @property
+    def path(self) -> str:
+        return self.config.DATABASE
 
     def connect(self):
-        conn = sqlite3.connect(self.config.DATABASE)
-        conn.create_function('haversine', 4, haversine)
+        conn = self._open()
         conn.enable_load_extension(True)
         conn.execute("SELECT load_extension('mod_spatialite')")
+        conn.enable_load_extension(False)
+        return self._tune(conn)
+
+    @staticmethod
+    def initialize(conn) -> None:
+        """Run once on the first connection of a new pool."""
+        migrate(conn)
+
+    def _open(self):
+        return sqlite3.connect(self.path, timeout=self.config.DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+
+    def _tune(self, conn):
+        conn.execute(f'PRAGMA busy_timeout = {int(self.config.DB_BUSY_TIMEOUT_MS)}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(self.config.DB_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA cache_size = -{int(self.config.DB_CACHE_SIZE_KB)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
         conn.row_factory = sqlite3.Row
         return conn
 
+    @property
+    def pool(self) -> ConnectionPool:
+        pool = self._pools.get(self.path)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(self.path)
+                if pool is None:
+                    pool = ConnectionPool(
+                        self.connect,
+                        size=self.config.DB_POOL_SIZE,
+                        timeout=self.config.DB_POOL_TIMEOUT,
+                        health_check_interval=self.config.DB_POOL_HEALTH_CHECK_INTERVAL,
+                    )
+                    with pool.connection() as conn:
+                        self.initialize(conn)
+                    self._pools[self.path] = pool
+        return pool
+
+    def pool_stats(self) -> dict:
+        return self.pool.stats()
+
+    def close(self) -> None:
+        with self._pools_lock:
+            pool = self._pools.pop(self.path, None)
+        if pool is not None:
+            pool.close()
+
+    @classmethod
+    def close_pools(cls):
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.close()
+            cls._pools.clear()
+
+    @classmethod
+    def _forget_pools(cls):
+        # A forked child must not use, or even close, the parent's connections; it opens its own
+        cls._pools = {}
+        cls._pools_lock = threading.Lock()
+
     @contextmanager
     def get_cursor(self):
-        conn = self.connect()
+        with self.pool.connection() as conn:
+            profile = current_profile()
+            if profile is not None:
+                # Only while a profiled request holds the connection; tracing costs on every statement
+                conn.set_trace_callback(profile.trace)
+            cur = MeteredCursor(conn.cursor(), self.slow_seconds, profile)
+            try:
+                yield conn, cur
+                conn.commit()
+            except sqlite3.Error:
+                logger.exception('Database error occurred')
+                conn.rollback()
+                raise
+            except Exception:
+                # Domain errors raised mid-transaction (e.g. ConflictError) roll back quietly
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+                if profile is not None:
+                    conn.set_trace_callback(None)
+
+
+class MeteredCursor:
+    """sqlite3.Cursor proxy that times each statement per family (see statement_family).
+
+    SQLite steps a SELECT lazily, so a statement's time is its execute plus
+    the fetches that follow it, recorded when the next statement starts or
+    the cursor closes. Statements slower than ``slow_seconds`` are logged with
+    their query plan.
+    """
+
+    __slots__ = ('_cursor', '_slow_seconds', '_profile', '_family', '_seconds', '_sql', '_parameters')
+
+    def __init__(self, cursor, slow_seconds=float('inf'), profile=None):
+        self._cursor = cursor
+        self._slow_seconds = slow_seconds
+        self._profile = profile
+        self._family = None
+        self._seconds = 0.0
+        self._sql = None
+        self._parameters = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sql, parameters=()):
+        return self._execute(self._cursor.execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The parameter sets may be a one-shot iterator, so the plan of a slow batch is not explained
+        return self._execute(self._cursor.executemany, sql, seq_of_parameters, None)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(self._cursor.fetchmany, self._cursor.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def close(self):
+        if self._family is not None:
+            self._record()
+        self._cursor.close()
+
+    def _execute(self, method, sql, parameters, plan_parameters):
+        if self._family is not None:
+            self._record()
+        self._family = statement_family(sql)
+        self._sql = sql
+        self._parameters = plan_parameters
+        self._timed(method, sql, parameters)
+        return self
+
+    def _timed(self, method, *args):
+        start = perf_counter()
         try:
-            yield conn, conn.cursor()
-            conn.commit()
-        except Exception as e:
-            logger.exception('Database error occurred')
-            conn.rollback()
-            raise e
+            return method(*args)
+        except sqlite3.Error:
+            DB_ERRORS.inc(self._family)
+            raise
         finally:
-            conn.close()
+            self._seconds += perf_counter() - start
+
+    def _record(self):
+        family, seconds = self._family, self._seconds
+        self._family = None
+        self._seconds = 0.0
+        DB_STATEMENT_SECONDS.observe(seconds, family)
+        entry = self._profile.finish_statement(family, seconds) if self._profile is not None else None
+        if seconds >= self._slow_seconds:
+            DB_SLOW_STATEMENTS.inc(family)
+            plan = self._query_plan()
+            sql = ' '.join(self._sql.split())
+            logger.warning('Slow SQL statement (%.1f ms, %s): %s\n%s', seconds * 1000, family, sql, plan)
+            if entry is not None:
+                entry['plan'] = plan
+
+    def _query_plan(self) -> str:
+        if self._parameters is None:
+            return 'QUERY PLAN not available for executemany'
+        try:
+            rows = self._cursor.connection.execute(f'EXPLAIN QUERY PLAN {self._sql}', self._parameters).fetchall()
+        except sqlite3.Error as e:
+            return f'QUERY PLAN not available: {e}'
+        # (id, parent, notused, detail); indent each step under its parent like the sqlite3 shell
+        depth = {0: 0}
+        lines = []
+        for row in rows:
+            depth[row[0]] = depth.get(row[1], 0) + 1
+            lines.append(f'{"  " * depth[row[0]]}{row[3]}')
+        return 'QUERY PLAN\n' + '\n'.join(lines)
+
+
+os.register_at_fork(after_in_child=DatabaseSqlite._forget_pools)
@@ -1,5 +1,14 @@
 import math
 
+RADIUS_EARTH_IN_KM = 6371
+# Half the circumference: a circle this large covers the whole globe
+MAX_DISTANCE_KM = math.pi * RADIUS_EARTH_IN_KM
+
+# Resolutions of the cluster grid stored per row (column cell_<level>). Level L
+# splits longitude into 2**L columns and latitude into 2**(L-1) rows, so cells are
+# 360 / 2**L degrees wide: from 22.5 degrees at level 4 down to ~600 m at level 16.
+CLUSTER_LEVELS = (4, 6, 8, 10, 12, 14, 16)
+
 
 def haversine(lat1, lon1, lat2, lon2):
     radius_earth_in_km = 6371  # raio da Terra em km
@@ -12,3 +21,37 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
     return radius_earth_in_km * c
+
+
+def grid_position(lat, lon, level):
+    """(row, col) of the level's grid cell containing the point."""
+    cols = 1 << level
+    rows = cols >> 1
+    row = min(int((lat + 90) / 180 * rows), rows - 1)
+    col = min(int((lon + 180) / 360 * cols), cols - 1)
+    return row, col
+
+
+def grid_cell(lat, lon, level):
+    """Cell id at ``level``: row-major, so each grid row is a contiguous id range."""
+    row, col = grid_position(lat, lon, level)
+    return (row << level) | col
+
+
+def grid_cells(lat, lon):
+    """Cell ids for every CLUSTER_LEVELS resolution, stored next to geom."""
+    return tuple(grid_cell(lat, lon, level) for level in CLUSTER_LEVELS)
+
+
+def grid_cell_count(bbox, level):
+    """Number of level cells a (min_lon, min_lat, max_lon, max_lat) bbox intersects."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    first_row, first_col = grid_position(min_lat, min_lon, level)
+    last_row, last_col = grid_position(max_lat, max_lon, level)
+    return (last_row - first_row + 1) * (last_col - first_col + 1)
+
+
+def precompute_coordinates(lat, lon):
+    """Values stored next to geom so SQL can evaluate haversine natively."""
+    lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+    return lat_rad, lon_rad, math.cos(lat_rad)
@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Dict
+
+from app.exceptions import UnprocessableEntityError
+from app.logger import logger
+from app.metrics import GEOCODER_SECONDS
+
+
+class GazetteerGeocoder:
+    """Geocodes from the local gazetteer, with the same interface as NominatimAPI.
+
+    Names the gazetteer does not know go to ``fallback`` (a NominatimAPI, with
+    its cache and rate limit). Without a fallback a miss is unprocessable, so
+    no request ever leaves the host.
+    """
+
+    def __init__(self, repository, fallback=None):
+        self.repository = repository
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._fallbacks = 0
+        self._misses = 0
+
+    def get_location(self, location_name: str) -> tuple[float, float]:
+        start = time.perf_counter()
+        location = self.repository.find(location_name)
+        GEOCODER_SECONDS.observe(time.perf_counter() - start, 'gazetteer', 'miss' if location is None else 'hit')
+        if location is not None:
+            with self._lock:
+                self._hits += 1
+            return location
+
+        if self.fallback is None:
+            with self._lock:
+                self._misses += 1
+            logger.error('No results found in the gazetteer for location: %s', location_name)
+            raise UnprocessableEntityError()
+
+        with self._lock:
+            self._fallbacks += 1
+        return self.fallback.get_location(location_name)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._fallbacks + self._misses
+            return {
+                'hits': self._hits,
+                'fallbacks': self._fallbacks,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+            }
@@ -1,30 +1,118 @@
-from functools import lru_cache
+import random
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from app.exceptions import UnprocessableEntityError
+from app.external.single_flight import SingleFlight
 from app.logger import logger
+from app.metrics import GEOCODER_SECONDS
+from app.utils import normalize_name
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Longest Retry-After honoured; a request thread should not sleep for minutes
+MAX_RETRY_AFTER_SECONDS = 10
+
+
+class _RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Keep-alive session whose pool holds ``pool_size`` connections to the Nominatim host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = 'location-api'
+    return session
 
 
 class NominatimAPI:
-    def __init__(self, config):
+    def __init__(self, config, cache=None, rate_limiter=None, session=None, single_flight=None):
         self.config = config
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.session = session or create_session(config.NOMINATIM_POOL_SIZE)
+        self.single_flight = single_flight or SingleFlight()
 
-    @lru_cache(maxsize=100)
     def get_location(self, location_name: str) -> tuple[float, float]:
+        # Concurrent lookups of the same name wait on a single cache read and upstream call
+        name_key = normalize_name(location_name)
+        return self.single_flight.do(name_key, lambda: self._get_location(name_key, location_name))
+
+    def _get_location(self, name_key: str, location_name: str) -> tuple[float, float]:
+        if self.cache is None:
+            return self._fetch_location(location_name)
+
+        cached = self.cache.get(name_key)
+        if cached is not None:
+            if not cached['found']:
+                raise UnprocessableEntityError()
+            return cached['lat'], cached['lon']
+
+        try:
+            lat, lon = self._fetch_location(location_name)
+        except UnprocessableEntityError:
+            self.cache.put(name_key, None, None)
+            raise
+        self.cache.put(name_key, lat, lon)
+        return lat, lon
+
+    def _fetch_location(self, location_name: str) -> tuple[float, float]:
+        retries = self.config.NOMINATIM_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                return self._request(location_name)
+            except _RetryableError as e:
+                if attempt == retries:
+                    logger.error('Request to Nominatim API failed after %d attempts: %s', attempt + 1, e)
+                    raise ValueError('Failed to fetch location')
+                # Full jitter, so clients that failed together do not retry together
+                delay = random.uniform(0, self.config.NOMINATIM_BACKOFF * 2**attempt)
+                if e.retry_after is not None:
+                    delay = max(delay, min(e.retry_after, MAX_RETRY_AFTER_SECONDS))
+                logger.warning('Request to Nominatim API failed (%s), retrying in %.2fs', e, delay)
+                time.sleep(delay)
+
+    def _request(self, location_name: str) -> tuple[float, float]:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        # Timed after the rate limiter, so the histogram shows upstream latency rather than queueing
+        start = time.perf_counter()
+        outcome = 'error'
         try:
-            response = requests.get(
+            response = self.session.get(
                 self.config.NOMINATIM_API,
                 params={'q': location_name, 'format': 'json', 'limit': 1},
-                headers={'User-Agent': 'location-api'},
-                timeout=30,
+                timeout=(self.config.NOMINATIM_CONNECT_TIMEOUT, self.config.NOMINATIM_READ_TIMEOUT),
             )
+            if response.status_code in RETRY_STATUSES:
+                outcome = 'retry'
+                raise _RetryableError(f'HTTP {response.status_code}', _retry_after(response))
             response.raise_for_status()
             results = response.json()
-            if not results:
-                logger.error(f'No results found for location: {location_name}')
-                raise UnprocessableEntityError()
-            return float(results[0]['lat']), float(results[0]['lon'])
+            outcome = 'ok' if results else 'not_found'
+        except (requests.ConnectionError, requests.Timeout) as e:
+            outcome = 'retry'
+            raise _RetryableError(str(e)) from e
         except requests.RequestException as e:
-            logger.error(f'Request to Nominatim API failed: {e}')
+            logger.error('Request to Nominatim API failed: %s', e)
             raise ValueError('Failed to fetch location')
+        finally:
+            GEOCODER_SECONDS.observe(time.perf_counter() - start, 'nominatim', outcome)
+
+        if not results:
+            logger.error('No results found for location: %s', location_name)
+            raise UnprocessableEntityError()
+        return float(results[0]['lat']), float(results[0]['lon'])
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,23 @@
+import time
+
+
+class SharedTokenBucket:
+    """Blocking token bucket: at most ``rate`` acquisitions per second, bursts up to ``capacity``.
+
+    The state lives in the database (RateLimitRepository), so every thread of
+    every worker process draws from the same bucket. A ``rate`` of 0 disables
+    the limit.
+    """
+
+    def __init__(self, repository, key: str, rate: float, capacity: float = 1):
+        self.repository = repository
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        wait = self.repository.reserve(self.key, self.rate, self.capacity) - time.time()
+        if wait > 0:
+            time.sleep(wait)
@@ -1,18 +1,127 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
+from .config import Config
 
-def setup_logger(name='app'):
+# Attributes every LogRecord has; anything else was passed through ``extra`` and is written as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+# Distinct messages tracked by the rate limit before it starts over
+MAX_RATE_LIMIT_KEYS = 10000
+
+_listeners = []
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, module, message, and any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most ``limit`` records per message template every ``interval`` seconds.
+
+    Records are keyed by their unformatted message, so "Location with ID %s not
+    found" is one key however many ids are probed. The first record of the next
+    window carries how many were dropped in ``suppressed``.
+    """
+
+    def __init__(self, limit: int, interval: float):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self._windows) >= MAX_RATE_LIMIT_KEYS:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _LazyQueueHandler(QueueHandler):
+    # QueueHandler.prepare() formats the whole record in the calling thread. Only the message is
+    # rendered here, so it shows the arguments as they were when logged and not by the time the
+    # listener writes it; the timestamp, JSON and traceback are left to the listener.
+    @staticmethod
+    def prepare(record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logger(name='app', level=None):
+    """Logger whose records are queued by the caller and written by a background thread."""
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(level or Config.LOG_LEVEL.upper())
 
     if not logger.handlers:
         handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        if Config.LOG_FORMAT == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+
+        records = queue.SimpleQueue()
+        queue_handler = _LazyQueueHandler(records)
+        if Config.LOG_RATE_LIMIT > 0:
+            queue_handler.addFilter(RateLimitFilter(Config.LOG_RATE_LIMIT, Config.LOG_RATE_INTERVAL))
+        logger.addHandler(queue_handler)
+
+        listener = QueueListener(records, handler)
+        listener.start()
+        _listeners.append(listener)
 
     return logger
 
 
+def _stop_listeners():
+    # Writes out whatever is still queued
+    for listener in _listeners:
+        listener.stop()
+
+
+def _restart_listeners():
+    # The writer threads do not survive fork(); each worker process needs its own
+    for i, listener in enumerate(_listeners):
+        _listeners[i] = QueueListener(listener.queue, *listener.handlers)
+        _listeners[i].start()
+
+
+atexit.register(_stop_listeners)
+os.register_at_fork(after_in_child=_restart_listeners)
+
 logger = setup_logger()
@@ -0,0 +1,213 @@
+import re
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, Tuple
+
+# Seconds; starts at 100 µs because most SQL statements and cache hits finish well under a millisecond
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|INDEX\s+\w+\s+ON)\s+(\w+)', re.IGNORECASE)
+# Statement text -> family; the SQL is mostly module constants, so this stays small
+_families: Dict[str, str] = {}
+MAX_FAMILIES = 1024
+
+
+class _ShardOwner:
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self):
+        self.shard = {}
+
+
+class _Metric:
+    """One metric family with a series per label tuple.
+
+    Every thread writes to its own shard, so recording takes no lock and two
+    threads never update the same slot; rendering merges the shards. When a
+    thread exits its shard is folded into a base aggregate, so per-request and
+    per-batch threads do not leave one shard each behind.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._local = threading.local()
+        self._shards = []
+        self._base = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.owner.shard
+        except AttributeError:
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self._shards.append(owner.shard)
+            # The thread-local drops ``owner`` when its thread exits
+            weakref.finalize(owner, self._retire, owner.shard).atexit = False
+            return owner.shard
+
+    def _retire(self, shard: dict) -> None:
+        with self._lock:
+            self._shards = [s for s in self._shards if s is not shard]
+            for labels, value in shard.items():
+                total = self._base.get(labels)
+                # A new value rather than in place, so a render holding the old one is not affected
+                self._base[labels] = value if total is None else self._combine(total, value)
+
+    @staticmethod
+    def _combine(total, value):
+        raise NotImplementedError
+
+    def _series(self) -> Iterator[Tuple[tuple, object]]:
+        with self._lock:
+            shards = list(self._shards)
+            base = list(self._base.items())
+        yield from base
+        for shard in shards:
+            yield from list(shard.items())
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    @staticmethod
+    def _combine(total, value):
+        return total + value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return sum(value for key, value in self._series() if key == labels)
+
+    def samples(self) -> Iterator[Tuple[str, tuple, tuple, float]]:
+        totals = {}
+        for labels, value in self._series():
+            totals[labels] = totals.get(labels, 0) + value
+        for labels, value in totals.items():
+            yield self.name, self.labels, labels, value
+
+
+class Histogram(_Metric):
+    """Latency histogram; buckets are only made cumulative when rendered."""
+
+    type = 'histogram'
+
+    def __init__(
+        self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    @staticmethod
+    def _combine(total, value):
+        return [a + b for a, b in zip(total, value)]
+
+    def observe(self, value: float, *labels) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # [count per bucket..., count above the last bucket, sum]
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        return sum(sum(series[:-1]) for key, series in self._series() if key == labels)
+
+    def samples(self) -> Iterator[Tuple[str, tuple, tuple, float]]:
+        merged = {}
+        for labels, series in self._series():
+            total = merged.get(labels)
+            merged[labels] = list(series) if total is None else self._combine(total, series)
+        label_names = self.labels + ('le',)
+        for labels, values in merged.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                yield f'{self.name}_bucket', label_names, labels + (_format_value(bound),), cumulative
+            yield f'{self.name}_sum', self.labels, labels, values[-1]
+            yield f'{self.name}_count', self.labels, labels, cumulative
+
+
+class Metrics:
+    """Process-wide metric families, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(name, help, labels, **kwargs))
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self, gauges: Dict[str, Dict[str, float]] = None) -> str:
+        """Every metric plus ``gauges``, a point-in-time ``{prefix: {name: value}}`` snapshot."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(_sample_line(*sample) for sample in metric.samples())
+        for prefix, values in (gauges or {}).items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# TYPE {prefix}_{name} gauge')
+                    lines.append(_sample_line(f'{prefix}_{name}', (), (), value))
+        return '\n'.join(lines) + '\n'
+
+
+def statement_family(sql: str) -> str:
+    """Bounded label for a SQL statement: its verb and first table, e.g. ``select_locations``."""
+    family = _families.get(sql)
+    if family is None:
+        words = sql.split(None, 1)
+        verb = words[0].lower() if words else 'empty'
+        table = _TABLE.search(sql)
+        family = f'{verb}_{table.group(1).lower()}' if table else verb
+        if len(_families) < MAX_FAMILIES:
+            _families[sql] = family
+    return family
+
+
+def _sample_line(name: str, label_names: Iterable[str], labels: tuple, value: float) -> str:
+    pairs = ','.join(f'{key}="{_escape(str(label))}"' for key, label in zip(label_names, labels))
+    return f'{name}{{{pairs}}} {_format_value(value)}' if pairs else f'{name} {_format_value(value)}'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'http_request_duration_seconds', 'Time to handle an API request', ('method', 'endpoint', 'status')
+)
+DB_STATEMENT_SECONDS = metrics.histogram(
+    'db_statement_duration_seconds', 'Time spent executing and fetching a SQL statement', ('statement',)
+)
+DB_ERRORS = metrics.counter('db_errors_total', 'SQL statements that raised sqlite3.Error', ('statement',))
+DB_SLOW_STATEMENTS = metrics.counter(
+    'db_slow_statements_total', 'SQL statements slower than SLOW_QUERY_MS', ('statement',)
+)
+GEOCODER_SECONDS = metrics.histogram(
+    'geocoder_request_duration_seconds', 'Time of each geocoding lookup or upstream attempt', ('backend', 'outcome')
+)
@@ -0,0 +1,116 @@
+import contextvars
+import cProfile
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+# Functions kept in a report, by cumulative time
+TOP_FUNCTIONS = 30
+
+_active: contextvars.ContextVar[Optional['Profile']] = contextvars.ContextVar('profile', default=None)
+# From Python 3.12 cProfile hooks sys.monitoring, which is process-wide: one profiled request at a time
+_cprofile_lock = threading.Lock()
+
+
+def current_profile() -> Optional['Profile']:
+    return _active.get()
+
+
+class Profile:
+    """What one profiled request did: its Python call profile and every SQL statement it ran.
+
+    Statements come from the connection's trace callback, with the bound values
+    expanded; MeteredCursor fills in how long each top-level one took.
+    """
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = time.time()
+        self.statements: List[Dict] = []
+        self._start = time.perf_counter()
+        self._current = None
+        self._profiler = None
+        self._token = None
+
+    def start(self) -> 'Profile':
+        if _cprofile_lock.acquire(blocking=False):
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._token = _active.set(self)
+        return self
+
+    def finish(self, status: int) -> Dict:
+        seconds = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            _cprofile_lock.release()
+        _active.reset(self._token)
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'reason': self.reason,
+            'started_at': self.started_at,
+            'ms': round(seconds * 1000, 3),
+            'statements': self.statements,
+            'functions': _top_functions(self._profiler) if self._profiler is not None else None,
+        }
+
+    def trace(self, sql: str) -> None:
+        # Statements run by triggers are reported as "-- TRIGGER ..." comments
+        if not sql.startswith('--'):
+            self._current = len(self.statements)
+        at_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        self.statements.append({'sql': sql, 'at_ms': at_ms, 'statement': None, 'ms': None})
+
+    def finish_statement(self, family: str, seconds: float) -> Optional[Dict]:
+        if self._current is None:
+            return None
+        entry = self.statements[self._current]
+        entry['statement'] = family
+        entry['ms'] = round(seconds * 1000, 3)
+        self._current = None
+        return entry
+
+
+class ProfileStore:
+    """The last ``size`` profile reports of this process."""
+
+    def __init__(self, size: int):
+        self._reports = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, report: Dict) -> None:
+        with self._lock:
+            self._reports.append(report)
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return next((report for report in self._reports if report['id'] == profile_id), None)
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            reports = list(self._reports)
+        keys = ('id', 'method', 'path', 'status', 'reason', 'started_at', 'ms')
+        return [{key: report[key] for key in keys} | {'statements': len(report['statements'])} for report in reports]
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[Dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows
+    ]
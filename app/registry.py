@@ -1,17 +1,163 @@
+import threading
+import time
+from typing import Dict
+
+from flask import current_app
+
 from .config import Config
+from .database.gazetteer import GazetteerDatabase
 from .database.sqlite import DatabaseSqlite
-from .external.nominatim_api import NominatimAPI
+from .external.gazetteer import GazetteerGeocoder
+from .external.nominatim_api import NominatimAPI, create_session
+from .external.rate_limiter import SharedTokenBucket
+from .logger import logger
+from .profiling import ProfileStore
+from .repositories.gazetteer_repository import GazetteerRepository
+from .repositories.geocode_cache_repository import GeocodeCacheRepository
+from .repositories.geocode_job_repository import GeocodeJobRepository
+from .repositories.location_memory_index import LocationMemoryIndex
 from .repositories.location_repository import LocationRepository
+from .repositories.rate_limit_repository import RateLimitRepository
+from .services.geocode_job_service import GeocodeJobService
 from .services.location_service import LocationService
+from .services.nearby_cache import NearbyResultCache
 
 
 class Registry:
-    def __init__(self):
-        self.config = Config()
+    """Dependencies shared by every request of one app (one per worker process).
 
-    def location(self) -> LocationService:
-        return LocationService(
-            LocationRepository(self.config, DatabaseSqlite(self.config)),
-            NominatimAPI(self.config),
-            self.config,
+    create_app() builds it once and stores it in ``app.extensions['registry']``;
+    controllers reach it through Registry.current(). startup() and shutdown()
+    are called by the server entry points, after forking, so no connection is
+    shared between processes.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.db = DatabaseSqlite(self.config)
+        self.gazetteer_db = GazetteerDatabase(self.config)
+        self._lock = threading.Lock()
+        self._geocode_cache = GeocodeCacheRepository(self.config, self.db)
+        # Kept in the database so every worker process shares Nominatim's quota
+        self._rate_limiter = SharedTokenBucket(
+            RateLimitRepository(self.config, self.db),
+            'nominatim',
+            self.config.NOMINATIM_RATE_LIMIT,
+            self.config.NOMINATIM_RATE_BURST,
         )
+        # Shared so lookups reuse keep-alive connections instead of a new TCP+TLS handshake each
+        self._http_session = create_session(self.config.NOMINATIM_POOL_SIZE)
+        self._nearby_cache = None
+        if self.config.NEARBY_CACHE_MAX_ROWS > 0:
+            self._nearby_cache = NearbyResultCache(
+                self.config.NEARBY_CACHE_MAX_ROWS,
+                self.config.NEARBY_CACHE_TTL,
+                self.config.NEARBY_CACHE_GRID_DEG,
+                self.location_repository().get_generation,
+            )
+        self._nearby_index = None
+        self._nearby_index_lock = threading.Lock()
+        self._location_service = None
+        self._geocode_jobs = None
+        self._profiles = ProfileStore(self.config.PROFILE_HISTORY)
+
+    @classmethod
+    def current(cls) -> 'Registry':
+        return current_app.extensions['registry']
+
+    def startup(self) -> None:
+        """Open the pool (loading SpatiaLite and applying migrations) and prime the caches."""
+        start = time.perf_counter()
+        self.db.pool.warm_up()
+        if self.config.GEOCODER != 'nominatim':
+            self.gazetteer_db.pool.warm_up()
+        self.nearby_index()
+        self.location()
+        if self.config.WRITE_MODE == 'async':
+            self.geocode_jobs().start()
+        seconds = time.perf_counter() - start
+        logger.info('Registry started in %.3fs with %d database connections', seconds, self.db.pool_stats()['open'])
+
+    def shutdown(self) -> None:
+        if self._geocode_jobs is not None:
+            self._geocode_jobs.stop()
+        self._http_session.close()
+        self.db.close()
+        self.gazetteer_db.close()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Pool and cache counters of this process, keyed by the prefix /metrics gives them."""
+        stats = {'db_pool': self.db.pool_stats(), 'geocode_cache': self.geocode_cache().stats()}
+        if self._nearby_cache is not None:
+            stats['nearby_cache'] = self._nearby_cache.stats()
+        if self._nearby_index is not None:
+            stats['nearby_index'] = {'locations': len(self._nearby_index)}
+        geocoder = self.location().nominatim_api
+        if isinstance(geocoder, GazetteerGeocoder):
+            stats['gazetteer'] = geocoder.stats()
+            stats['gazetteer_pool'] = self.gazetteer_db.pool_stats()
+        return stats
+
+    def location(self) -> LocationService:
+        if self._location_service is None:
+            with self._lock:
+                if self._location_service is None:
+                    self._location_service = LocationService(
+                        self.location_repository(),
+                        self.geocoder(),
+                        self.config,
+                        self.nearby_index(),
+                        self.nearby_cache(),
+                    )
+        return self._location_service
+
+    def geocode_jobs(self) -> GeocodeJobService:
+        location_service = self.location()
+        if self._geocode_jobs is None:
+            with self._lock:
+                if self._geocode_jobs is None:
+                    self._geocode_jobs = GeocodeJobService(
+                        GeocodeJobRepository(self.config, self.db), location_service, self.config
+                    )
+        return self._geocode_jobs
+
+    def geocoder(self):
+        """NominatimAPI or, when GEOCODER selects the gazetteer, a GazetteerGeocoder in front of it."""
+        nominatim = NominatimAPI(self.config, self.geocode_cache(), self.rate_limiter(), self.http_session())
+        if self.config.GEOCODER == 'nominatim':
+            return nominatim
+        fallback = nominatim if self.config.GEOCODER == 'gazetteer' else None
+        return GazetteerGeocoder(self.gazetteer_repository(), fallback)
+
+    def gazetteer_repository(self) -> GazetteerRepository:
+        return GazetteerRepository(self.config, self.gazetteer_db)
+
+    def location_repository(self) -> LocationRepository:
+        return LocationRepository(self.config, self.db)
+
+    def geocode_cache(self) -> GeocodeCacheRepository:
+        return self._geocode_cache
+
+    def rate_limiter(self) -> SharedTokenBucket:
+        return self._rate_limiter
+
+    def http_session(self):
+        return self._http_session
+
+    def profiles(self) -> ProfileStore:
+        return self._profiles
+
+    def nearby_cache(self):
+        return self._nearby_cache
+
+    def nearby_index(self):
+        if self.config.NEARBY_ENGINE != 'memory':
+            return None
+
+        if self._nearby_index is None:
+            with self._nearby_index_lock:
+                if self._nearby_index is None:
+                    index = LocationMemoryIndex()
+                    index.rebuild(self.location_repository().get_all_locations())
+                    self._nearby_index = index
+        return self._nearby_index
@@ -0,0 +1,126 @@
+import csv
+import time
+import unicodedata
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+from app.exceptions import BadRequestError
+from app.logger import logger
+from app.utils import MAX_LAT, MAX_LON, normalize_name
+
+FORMATS = ('tsv', 'csv')
+
+EXACT_SQL = 'SELECT lat, lon FROM places WHERE name_key = ? ORDER BY importance DESC LIMIT 1'
+
+MATCH_SQL = """
+    SELECT p.lat, p.lon, p.name_key
+    FROM places_fts
+    JOIN places p ON p.id = places_fts.rowid
+    WHERE places_fts MATCH ?
+    ORDER BY p.importance DESC, length(p.name_key)
+    LIMIT ?
+"""
+
+INSERT_SQL = 'INSERT INTO places (name, name_key, lat, lon, importance) VALUES (?, ?, ?, ?, ?)'
+
+# Trigram matching is by substring, so candidates are re-checked word by word
+MATCH_CANDIDATES = 20
+# The trigram tokenizer cannot match anything shorter
+MIN_MATCH_WORD = 3
+
+
+class GazetteerRepository:
+    """Local place names imported from an OSM extract (see ``cli.py gazetteer-import``).
+
+    A lookup first tries the exact name key, then the trigram index for names
+    containing every word of the query, preferring the most important place.
+    """
+
+    def __init__(self, config, db):
+        self.config = config
+        self.db = db
+
+    def find(self, name: str) -> Optional[Tuple[float, float]]:
+        name_key = search_key(name)
+        if not name_key:
+            return None
+
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(EXACT_SQL, (name_key,))
+            row = cur.fetchone()
+            query = _match_query(name_key)
+            if row is None and query:
+                cur.execute(MATCH_SQL, (query, MATCH_CANDIDATES))
+                words = set(name_key.split())
+                row = next((c for c in cur.fetchall() if words <= set(c['name_key'].split())), None)
+
+        return None if row is None else (row['lat'], row['lon'])
+
+    def import_places(self, stream: TextIO, fmt: str, chunk_size: int, replace: bool = False) -> Dict:
+        """Load a place file in one transaction and rebuild the trigram index.
+
+        Each of ``name``, ``alternative_names`` (comma-separated) and
+        ``display_name`` becomes a row with the place's coordinates.
+        """
+        start = time.perf_counter()
+        stats = {'imported': 0, 'rejected': 0}
+        with self.db.get_cursor() as (conn, cur):
+            if replace:
+                cur.execute('DELETE FROM places')
+            chunk = []
+            for row in _read_places(stream, fmt, stats):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    cur.executemany(INSERT_SQL, chunk)
+                    stats['imported'] += len(chunk)
+                    chunk = []
+            cur.executemany(INSERT_SQL, chunk)
+            stats['imported'] += len(chunk)
+            cur.execute("INSERT INTO places_fts (places_fts) VALUES ('rebuild')")
+
+        seconds = time.perf_counter() - start
+        stats['seconds'] = round(seconds, 3)
+        stats['rows_per_sec'] = round(stats['imported'] / seconds, 1) if seconds else 0.0
+        return stats
+
+    def count(self) -> int:
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute('SELECT COUNT(*) FROM places')
+            return cur.fetchone()[0]
+
+
+def search_key(name: str) -> str:
+    """normalize_name() without accents or punctuation, so "Sé" finds "Se" and "Av. Paulista" "av paulista"."""
+    decomposed = unicodedata.normalize('NFKD', normalize_name(name))
+    chars = (c if c.isalnum() else ' ' for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(''.join(chars).split())
+
+
+def _match_query(name_key: str) -> str:
+    return ' '.join(f'"{word}"' for word in name_key.split() if len(word) >= MIN_MATCH_WORD)
+
+
+def _read_places(stream: TextIO, fmt: str, stats: Dict) -> Iterator[tuple]:
+    if fmt not in FORMATS:
+        raise BadRequestError(f'Unsupported format {fmt!r}, expected one of {", ".join(FORMATS)}')
+    # OSMNames-style TSV dumps are unquoted
+    records = csv.DictReader(stream, delimiter='\t', quoting=csv.QUOTE_NONE) if fmt == 'tsv' else csv.DictReader(stream)
+    for record_number, record in enumerate(records, start=1):
+        try:
+            if not search_key(record.get('name') or ''):
+                raise ValueError('missing name')
+            lat, lon = float(record['lat']), float(record['lon'])
+            if not (-MAX_LAT <= lat <= MAX_LAT and -MAX_LON <= lon <= MAX_LON):
+                raise ValueError('coordinates out of range')
+            importance = float(record.get('importance') or 0)
+            names = [record['name'], *(record.get('alternative_names') or '').split(','), record.get('display_name')]
+        except (KeyError, ValueError, TypeError) as e:
+            stats['rejected'] += 1
+            logger.warning('Skipping invalid gazetteer row %d: %r', record_number, e)
+            continue
+
+        seen = set()
+        for name in names:
+            name_key = search_key(name or '')
+            if name_key and name_key not in seen:
+                seen.add(name_key)
+                yield name.strip(), name_key, lat, lon, importance
@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class GeocodeCacheRepository:
+    """Geocoding results shared by every thread and worker process through the database.
+
+    Entries are keyed by the normalized name. Found and not-found results have
+    separate TTLs, and the table is trimmed to GEOCODE_CACHE_MAX_ENTRIES by
+    least recent use.
+
+    A hit is a plain read. last_used_at is only refreshed once it is more than
+    TOUCH_AFTER seconds old, so hot names do not take the write lock on every
+    lookup and eviction order is accurate to that granularity.
+    """
+
+    EVICT_EVERY = 100
+    TOUCH_AFTER = 60
+
+    def __init__(self, config, db):
+        self.config = config
+        self.db = db
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    def get(self, name_key: str) -> Optional[Dict]:
+        now = time.time()
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(
+                'SELECT lat, lon, found, last_used_at FROM geocode_cache WHERE name_key = ? AND expires_at > ?',
+                (name_key, now),
+            )
+            row = cur.fetchone()
+            if row is not None and row['last_used_at'] < now - self.TOUCH_AFTER:
+                cur.execute('UPDATE geocode_cache SET last_used_at = ? WHERE name_key = ?', (now, name_key))
+
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            if row['found']:
+                self._hits += 1
+            else:
+                self._negative_hits += 1
+        return {'lat': row['lat'], 'lon': row['lon'], 'found': bool(row['found'])}
+
+    def put(self, name_key: str, lat: Optional[float], lon: Optional[float]) -> None:
+        found = lat is not None and lon is not None
+        now = time.time()
+        ttl = self.config.GEOCODE_CACHE_TTL if found else self.config.GEOCODE_CACHE_NEGATIVE_TTL
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(
+                'INSERT INTO geocode_cache (name_key, lat, lon, found, expires_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (name_key) DO UPDATE SET '
+                'lat = excluded.lat, lon = excluded.lon, found = excluded.found, '
+                'expires_at = excluded.expires_at, last_used_at = excluded.last_used_at',
+                (name_key, lat, lon, int(found), now + ttl, now),
+            )
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> None:
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute('DELETE FROM geocode_cache WHERE expires_at <= ?', (time.time(),))
+            cur.execute(
+                'DELETE FROM geocode_cache WHERE name_key IN ('
+                'SELECT name_key FROM geocode_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)',
+                (self.config.GEOCODE_CACHE_MAX_ENTRIES,),
+            )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._negative_hits + self._misses
+            return {
+                'hits': self._hits,
+                'negative_hits': self._negative_hits,
+                'misses': self._misses,
+                'hit_ratio': (self._hits + self._negative_hits) / lookups if lookups else 0.0,
+            }
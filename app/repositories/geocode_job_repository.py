@@ -0,0 +1,87 @@
+import json
+import time
+import uuid
+from typing import Dict, Optional
+
+JOB_COLUMNS = 'id, operation, location_id, name, status, attempts, result, error, error_status, created_at, updated_at'
+
+CLAIM_SQL = f"""
+    UPDATE geocode_jobs
+    SET status = 'running', attempts = attempts + 1, run_at = :lease_until, updated_at = :now
+    WHERE id = (
+        SELECT id FROM geocode_jobs
+        WHERE status IN ('pending', 'running') AND run_at <= :now
+        ORDER BY run_at
+        LIMIT 1
+    )
+    RETURNING {JOB_COLUMNS}
+"""
+
+
+class GeocodeJobRepository:
+    """Persistent queue of the creates and updates geocoded in the background.
+
+    A claimed job is 'running' with run_at moved JOB_LEASE seconds ahead. If
+    its worker dies (or the process restarts), the job is claimable again once
+    the lease runs out, so jobs survive restarts.
+    """
+
+    def __init__(self, config, db):
+        self.config = config
+        self.db = db
+
+    def create_job(self, operation: str, name: str, location_id: Optional[str] = None) -> Dict:
+        now = time.time()
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(
+                'INSERT INTO geocode_jobs (id, operation, location_id, name, status, run_at, created_at, updated_at) '
+                f"VALUES (?, ?, ?, ?, 'pending', ?, ?, ?) RETURNING {JOB_COLUMNS}",
+                (str(uuid.uuid4()), operation, location_id, name, now, now, now),
+            )
+            return _job(cur.fetchone())
+
+    def claim_job(self) -> Optional[Dict]:
+        now = time.time()
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(CLAIM_SQL, {'now': now, 'lease_until': now + self.config.JOB_LEASE})
+            row = cur.fetchone()
+        return _job(row) if row is not None else None
+
+    def complete_job(self, job_id: str, location: Dict) -> None:
+        self._finish(
+            "status = 'succeeded', location_id = ?, result = ?, error = NULL, error_status = NULL",
+            (location['id'], json.dumps(location)),
+            job_id,
+        )
+
+    def fail_job(self, job_id: str, error_status: int, error: str) -> None:
+        self._finish("status = 'failed', error = ?, error_status = ?", (error, error_status), job_id)
+
+    def retry_job(self, job_id: str, run_at: float, error: str) -> None:
+        self._finish("status = 'pending', run_at = ?, error = ?", (run_at, error), job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(f'SELECT {JOB_COLUMNS} FROM geocode_jobs WHERE id = ?', (job_id,))
+            row = cur.fetchone()
+        return _job(row) if row is not None else None
+
+    def delete_finished_jobs(self, before: float) -> int:
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(
+                "DELETE FROM geocode_jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?", (before,)
+            )
+            return cur.rowcount
+
+    def _finish(self, assignments: str, values: tuple, job_id: str) -> None:
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(
+                f'UPDATE geocode_jobs SET {assignments}, updated_at = ? WHERE id = ?',
+                (*values, time.time(), job_id),
+            )
+
+
+def _job(row) -> Dict:
+    job = dict(row)
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
@@ -0,0 +1,174 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from app.database.utils_sqlite import RADIUS_EARTH_IN_KM, haversine
+from app.repositories.location_repository import _bounding_box, _expanding_search
+
+
+class _Snapshot(NamedTuple):
+    ids: np.ndarray
+    names: np.ndarray
+    lats: np.ndarray
+    lons: np.ndarray
+    # Cleared in place when a row is removed or moved to the tail
+    alive: np.ndarray
+    # Rows written since the arrays were built, newest last; they shadow array rows with the same id
+    tail: Tuple[Tuple[str, str, float, float], ...]
+    tail_ids: FrozenSet[str]
+
+
+def _build_snapshot(rows: List[Tuple[str, str, float, float]]) -> _Snapshot:
+    rows = sorted(rows, key=lambda row: row[2])
+    ids = np.empty(len(rows), dtype=object)
+    names = np.empty(len(rows), dtype=object)
+    ids[:] = [row[0] for row in rows]
+    names[:] = [row[1] for row in rows]
+    return _Snapshot(
+        ids=ids,
+        names=names,
+        lats=np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows)),
+        lons=np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows)),
+        alive=np.ones(len(rows), dtype=bool),
+        tail=(),
+        tail_ids=frozenset(),
+    )
+
+
+class LocationMemoryIndex:
+    """Read-optimized copy of the locations table for nearby queries.
+
+    Coordinates live in contiguous NumPy arrays sorted by latitude, so a radius
+    query is a binary search on the latitude band followed by a vectorized
+    haversine that selects the candidates. Each returned distance is then the
+    scalar haversine(), the formula NEARBY_SQL evaluates, so both engines
+    return the same rows and distances.
+
+    Writes do not copy the arrays: a removed row is tombstoned in place and a
+    new or moved one is appended to a short tail that queries scan linearly.
+    Once the tail reaches COMPACT_AFTER rows the arrays are rebuilt with it
+    merged in. Readers never lock.
+
+    The snapshot is per process: writes made by other processes are only seen
+    after the next rebuild().
+    """
+
+    COMPACT_AFTER = 1024
+    # Relative slack on the vectorized radius test; the scalar distance decides
+    CANDIDATE_SLACK = 1e-9
+
+    def __init__(self):
+        self._snapshot = _build_snapshot([])
+        self._positions: Dict[str, int] = {}
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        snapshot = self._snapshot
+        return int(np.count_nonzero(snapshot.alive)) + len(snapshot.tail)
+
+    def rebuild(self, locations: Iterable[Dict]) -> None:
+        snapshot = _build_snapshot([(loc['id'], loc['name'], loc['lat'], loc['lon']) for loc in locations])
+        with self._write_lock:
+            self._publish(snapshot)
+
+    def upsert(self, location: Dict) -> None:
+        row = (location['id'], location['name'], location['lat'], location['lon'])
+        with self._write_lock:
+            snapshot = self._snapshot
+            tail = tuple(r for r in snapshot.tail if r[0] != row[0]) + (row,)
+            # The tail entry shadows the array row before it is tombstoned, so no reader misses it
+            self._snapshot = snapshot._replace(tail=tail, tail_ids=snapshot.tail_ids | {row[0]})
+            self._tombstone(row[0])
+            if len(tail) >= self.COMPACT_AFTER:
+                self._compact()
+
+    def remove(self, location_id: str) -> None:
+        with self._write_lock:
+            snapshot = self._snapshot
+            self._tombstone(location_id)
+            if location_id in snapshot.tail_ids:
+                self._snapshot = snapshot._replace(
+                    tail=tuple(r for r in snapshot.tail if r[0] != location_id),
+                    tail_ids=snapshot.tail_ids - {location_id},
+                )
+
+    def get_nearby_locations(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
+        snapshot = self._snapshot
+        min_lat, max_lat, min_lon, max_lon = _bounding_box(lat, lon, radius_km)
+
+        start = np.searchsorted(snapshot.lats, min_lat, side='left')
+        stop = np.searchsorted(snapshot.lats, max_lat, side='right')
+        lats = snapshot.lats[start:stop]
+        lons = snapshot.lons[start:stop]
+
+        in_box = np.flatnonzero((lons >= min_lon) & (lons <= max_lon) & snapshot.alive[start:stop])
+        distances = _haversine_vector(lat, lon, lats[in_box], lons[in_box])
+        rows = in_box[distances <= radius_km * (1 + self.CANDIDATE_SLACK)] + start
+        candidates = zip(
+            snapshot.ids[rows].tolist(),
+            snapshot.names[rows].tolist(),
+            snapshot.lats[rows].tolist(),
+            snapshot.lons[rows].tolist(),
+        )
+        if snapshot.tail:
+            candidates = [row for row in candidates if row[0] not in snapshot.tail_ids]
+            candidates += [
+                row for row in snapshot.tail if min_lat <= row[2] <= max_lat and min_lon <= row[3] <= max_lon
+            ]
+
+        results = []
+        for location_id, name, row_lat, row_lon in candidates:
+            distance_km = haversine(lat, lon, row_lat, row_lon)
+            if distance_km <= radius_km:
+                results.append({
+                    'id': location_id,
+                    'name': name,
+                    'lon': row_lon,
+                    'lat': row_lat,
+                    'distance_km': distance_km,
+                })
+        results.sort(key=lambda loc: (loc['distance_km'], loc['id']))
+        return results
+
+    def get_nearest_locations(self, lat: float, lon: float, k: int, initial_radius_km: float) -> List[Dict]:
+        return _expanding_search(lambda radius_km: self.get_nearby_locations(lat, lon, radius_km), k, initial_radius_km)
+
+    def _tombstone(self, location_id: str) -> None:
+        pos = self._positions.pop(location_id, None)
+        if pos is not None:
+            self._snapshot.alive[pos] = False
+
+    def _compact(self) -> None:
+        # The live rows are already sorted, so the tail is merged in with one batch insert
+        snapshot = self._snapshot
+        keep = np.flatnonzero(snapshot.alive)
+        tail = sorted(snapshot.tail, key=lambda row: row[2])
+        tail_lats = np.fromiter((row[2] for row in tail), dtype=np.float64, count=len(tail))
+        positions = np.searchsorted(snapshot.lats[keep], tail_lats, side='right')
+        tail_ids = np.empty(len(tail), dtype=object)
+        tail_names = np.empty(len(tail), dtype=object)
+        tail_ids[:] = [row[0] for row in tail]
+        tail_names[:] = [row[1] for row in tail]
+        merged = _Snapshot(
+            ids=np.insert(snapshot.ids[keep], positions, tail_ids),
+            names=np.insert(snapshot.names[keep], positions, tail_names),
+            lats=np.insert(snapshot.lats[keep], positions, tail_lats),
+            lons=np.insert(snapshot.lons[keep], positions, [row[3] for row in tail]),
+            alive=np.ones(len(keep) + len(tail), dtype=bool),
+            tail=(),
+            tail_ids=frozenset(),
+        )
+        self._publish(merged)
+
+    def _publish(self, snapshot: _Snapshot) -> None:
+        self._snapshot = snapshot
+        self._positions = {location_id: pos for pos, location_id in enumerate(snapshot.ids.tolist())}
+
+
+def _haversine_vector(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return RADIUS_EARTH_IN_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
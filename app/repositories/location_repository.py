@@ -1,6 +1,158 @@
+import json
 import math
+import sqlite3
 import uuid
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.database.utils_sqlite import (
+    CLUSTER_LEVELS,
+    MAX_DISTANCE_KM,
+    RADIUS_EARTH_IN_KM,
+    grid_cells,
+    grid_position,
+    precompute_coordinates,
+)
+from app.exceptions import ConflictError
+from app.utils import MAX_LAT, MAX_LON, normalize_name
+
+# Columns derived from the coordinates and written next to geom on every insert/update
+_DERIVED_COLUMNS = ('lat_rad', 'lon_rad', 'cos_lat', *(f'cell_{level}' for level in CLUSTER_LEVELS))
+
+INSERT_SQL = (
+    f'INSERT INTO locations (id, name, name_normalized, geom, {", ".join(_DERIVED_COLUMNS)}) '
+    f'VALUES (?, ?, ?, MakePoint(?, ?, 4326), {", ".join("?" * len(_DERIVED_COLUMNS))})'
+)
+
+# A name taken by another row (idx_locations_name_normalized) inserts nothing and returns no row
+CREATE_SQL = f'{INSERT_SQL} ON CONFLICT (name_normalized) DO NOTHING RETURNING id'
+
+UPDATE_SQL = (
+    f'UPDATE locations SET name = ?, name_normalized = ?, geom = MakePoint(?, ?, 4326), '
+    f'{", ".join(f"{column} = ?" for column in _DERIVED_COLUMNS)} WHERE id = ? RETURNING id'
+)
+
+# Candidates come from the SpatiaLite R*Tree (idx_locations_geom), so only the
+# rows inside the bounding box are read. The distance is the same haversine as
+# utils_sqlite.haversine, evaluated natively over the precomputed
+# lat_rad/lon_rad/cos_lat columns instead of calling back into Python per row.
+NEARBY_SQL = """
+    SELECT id, name, lon, lat, distance_km
+    FROM (
+        SELECT id, name, lon, lat, 6371 * (2 * atan2(sqrt(a), sqrt(1 - a))) AS distance_km
+        FROM (
+            SELECT id, name, X(geom) as lon, Y(geom) as lat,
+                pow(sin((lat_rad - :lat_rad) / 2), 2)
+                + :cos_lat * cos_lat * pow(sin((lon_rad - :lon_rad) / 2), 2) AS a
+            FROM locations
+            WHERE ROWID IN (
+                SELECT pkid FROM idx_locations_geom
+                WHERE xmin <= :max_lon AND xmax >= :min_lon AND ymin <= :max_lat AND ymax >= :min_lat
+            )
+        )
+    )
+    WHERE distance_km <= :radius_km
+        AND distance_km > :min_distance_km
+        AND (distance_km, id) > (:after_distance_km, :after_id)
+    ORDER BY distance_km, id
+    LIMIT :limit
+"""
+
+# Batch form of NEARBY_SQL for queries whose bounding boxes overlap: the R*Tree
+# is searched once for the union box and each candidate row is read once, then
+# joined to every query (a VALUES list) whose own box it falls in. The distance
+# expression is the one in NEARBY_SQL, so results match query for query.
+NEARBY_BATCH_SQL = """
+    WITH queries (query_index, lat_rad, lon_rad, cos_lat, min_lat, max_lat, min_lon, max_lon, radius_km) AS (
+        VALUES {values}
+    ),
+    candidates AS MATERIALIZED (
+        SELECT id, name, X(geom) AS lon, Y(geom) AS lat, lat_rad, lon_rad, cos_lat
+        FROM locations
+        WHERE ROWID IN (
+            SELECT pkid FROM idx_locations_geom
+            WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+        )
+    )
+    SELECT query_index, id, name, lon, lat, distance_km
+    FROM (
+        SELECT query_index, id, name, lon, lat, radius_km, 6371 * (2 * atan2(sqrt(a), sqrt(1 - a))) AS distance_km
+        FROM (
+            SELECT q.query_index, c.id, c.name, c.lon, c.lat, q.radius_km,
+                pow(sin((c.lat_rad - q.lat_rad) / 2), 2)
+                + q.cos_lat * c.cos_lat * pow(sin((c.lon_rad - q.lon_rad) / 2), 2) AS a
+            FROM candidates c
+            JOIN queries q
+                ON c.lat BETWEEN q.min_lat AND q.max_lat AND c.lon BETWEEN q.min_lon AND q.max_lon
+        )
+    )
+    WHERE distance_km <= radius_km
+    ORDER BY query_index, distance_km, id
+"""
+
+# Slack added to each query's box in the batch join, so rounding at the box edge
+# can never drop a row that NEARBY_SQL (filtered by distance only) would return.
+_BOX_SLACK_DEG = 1e-9
+
+# Floor for the first radius of a growing search: doubling a zero radius
+# (e.g. NEAREST_INITIAL_RADIUS_KM=0) would never reach the target.
+_MIN_INITIAL_RADIUS_KM = 0.001
+
+LIST_SQL = """
+    SELECT id, name, X(geom) AS lon, Y(geom) AS lat
+    FROM locations
+    WHERE id > :after_id
+    ORDER BY id
+    LIMIT :limit
+"""
+
+
+# Both within queries take their candidates from the R*Tree, which stores boxes
+# rounded outwards to 32-bit floats, and then check every candidate exactly.
+# Pages are keyset on id like LIST_SQL; the sort only covers the candidates.
+WITHIN_BOX_SQL = """
+    SELECT id, name, lon, lat
+    FROM (
+        SELECT id, name, X(geom) AS lon, Y(geom) AS lat
+        FROM locations
+        WHERE id > :after_id AND ROWID IN (
+            SELECT pkid FROM idx_locations_geom
+            WHERE xmin <= :max_lon AND xmax >= :min_lon AND ymin <= :max_lat AND ymax >= :min_lat
+        )
+    )
+    WHERE lon BETWEEN :min_lon AND :max_lon AND lat BETWEEN :min_lat AND :max_lat
+    ORDER BY id
+    LIMIT :limit
+"""
+
+# The polygon is parsed once into a materialized row instead of once per candidate.
+WITHIN_POLYGON_SQL = """
+    WITH area AS MATERIALIZED (
+        SELECT SetSRID(GeomFromGeoJSON(:geometry), 4326) AS geom
+    )
+    SELECT l.id, l.name, X(l.geom) AS lon, Y(l.geom) AS lat
+    FROM locations l, area
+    WHERE l.id > :after_id AND l.ROWID IN (
+        SELECT pkid FROM idx_locations_geom
+        WHERE xmin <= :max_lon AND xmax >= :min_lon AND ymin <= :max_lat AND ymax >= :min_lat
+    )
+    AND ST_Within(l.geom, area.geom)
+    ORDER BY l.id
+    LIMIT :limit
+"""
+
+
+# One index range per grid row crossed by the bbox; the GROUP BY reads only the
+# covering idx_locations_cell_<level> index. {column} is a cell_<level> column.
+CLUSTERS_SQL = """
+    WITH ranges (first_cell, last_cell) AS (
+        VALUES {values}
+    )
+    SELECT l.{column} AS cell, COUNT(*) AS count, AVG(l.lat_rad) AS lat_rad, AVG(l.lon_rad) AS lon_rad
+    FROM ranges r
+    JOIN locations l ON l.{column} BETWEEN r.first_cell AND r.last_cell
+    GROUP BY l.{column}
+"""
 
 
 class LocationRepository:
@@ -8,15 +160,67 @@ class LocationRepository:
         self.config = config
         self.db = db
 
-    def create_location(self, name: str, lat: float, lon: float) -> Dict:
-        location_id = str(uuid.uuid4())
+    def create_location(self, name: str, lat: float, lon: float, location_id: Optional[str] = None) -> Dict:
+        """Insert in one statement; raises ConflictError when the normalized name is taken."""
+        location = {'id': location_id or str(uuid.uuid4()), 'name': name, 'lat': lat, 'lon': lon}
         with self.db.get_cursor() as (conn, cur):
-            cur.execute(
-                'INSERT INTO locations (id, name, geom) VALUES (?, ?, MakePoint(?, ?, 4326))',
-                (location_id, name, lon, lat),
-            )
+            cur.execute(CREATE_SQL, _insert_values(location))
+            if not cur.fetchall():
+                raise ConflictError('Location already exists')
+        return location
+
+    def create_locations(self, locations: List[Tuple[str, float, float]]) -> List[Optional[Dict]]:
+        """Insert many locations in a single transaction.
+
+        Returns one item per input, None where the normalized name was already taken.
+        """
+        created = []
+        with self.db.get_cursor() as (conn, cur):
+            for name, lat, lon in locations:
+                location = {'id': str(uuid.uuid4()), 'name': name, 'lat': lat, 'lon': lon}
+                cur.execute(CREATE_SQL, _insert_values(location))
+                created.append(location if cur.fetchall() else None)
+        return created
+
+    def import_locations(self, rows: Iterable[Dict], chunk_size: int, defer_index: bool = False) -> int:
+        """Insert rows that already carry coordinates, committing every ``chunk_size`` rows.
 
-            return {'id': location_id, 'name': name, 'lat': lat, 'lon': lon}
+        Rows whose id already exists are skipped. If a chunk fails, its rows are rolled
+        back and the chunks committed before it are kept. With ``defer_index`` the
+        SpatiaLite index triggers are disabled during the load and the R*Tree is rebuilt
+        once at the end, which is much faster for large loads but leaves nearby queries
+        blind to the table while it runs, so it is meant for offline imports.
+        """
+        imported = 0
+        rows = iter(rows)
+        with self.db.get_cursor() as (conn, cur):
+            if defer_index:
+                cur.execute("SELECT DisableSpatialIndex('locations', 'geom')")
+            try:
+                while chunk := list(islice(rows, chunk_size)):
+                    cur.executemany(
+                        INSERT_SQL.replace('INSERT', 'INSERT OR IGNORE', 1),
+                        (_insert_values({**row, 'id': row['id'] or str(uuid.uuid4())}) for row in chunk),
+                    )
+                    imported += cur.rowcount
+                    conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                if defer_index:
+                    cur.execute('DROP TABLE IF EXISTS idx_locations_geom')
+                    cur.execute("SELECT CreateSpatialIndex('locations', 'geom')")
+                    conn.commit()
+        return imported
+
+    def iter_locations(self, batch_size: int) -> Iterator[Dict]:
+        """Stream every location, holding one pooled connection until the generator is closed."""
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute('SELECT id, name, X(geom) AS lon, Y(geom) AS lat FROM locations')
+            while batch := cur.fetchmany(batch_size):
+                for row in batch:
+                    yield dict(row)
 
     def get_location_by_id(self, location_id: str) -> Optional[Dict]:
         with self.db.get_cursor() as (conn, cur):
@@ -32,35 +236,152 @@ class LocationRepository:
     def get_location_by_name(self, name: str) -> Optional[Dict]:
         with self.db.get_cursor() as (conn, cur):
             cur.execute(
-                'SELECT id, name, X(geom) AS lon, Y(geom) AS lat FROM locations WHERE name = ?',
-                (name,),
+                'SELECT id, name, X(geom) AS lon, Y(geom) AS lat FROM locations WHERE name_normalized = ?',
+                (normalize_name(name),),
             )
             row = cur.fetchone()
             if row:
                 return dict(row)
             return None
 
-    def get_nearby_locations(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
-        min_lat, max_lat, min_lon, max_lon = _bounding_box(lat, lon, radius_km)
+    def get_locations_by_names(self, names: List[str]) -> List[Dict]:
+        if not names:
+            return []
+        placeholders = ', '.join('?' * len(names))
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(
+                'SELECT id, name, X(geom) AS lon, Y(geom) AS lat FROM locations '
+                f'WHERE name_normalized IN ({placeholders})',
+                [normalize_name(name) for name in names],
+            )
+            return [dict(row) for row in cur.fetchall()]
 
-        spatial_sql = """
-            SELECT id, name, X(geom) as lon, Y(geom) as lat, haversine(?, ?, Y(geom), X(geom)) as distance_km
-            FROM locations
-            WHERE Y(geom) BETWEEN ? AND ? AND X(geom) BETWEEN ? AND ? AND haversine(?, ?, Y(geom), X(geom)) <= ?
-            ORDER BY distance_km
+    def list_locations(self, after_id: Optional[str], limit: int) -> List[Dict]:
+        """Keyset page ordered by id; served by the primary key index, so cost does not grow with depth."""
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(LIST_SQL, {'after_id': after_id or '', 'limit': limit})
+            return [dict(row) for row in cur.fetchall()]
+
+    def get_all_locations(self) -> List[Dict]:
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute('SELECT id, name, X(geom) AS lon, Y(geom) AS lat FROM locations')
+            return [dict(row) for row in cur.fetchall()]
+
+    def get_nearby_locations(
+        self, lat: float, lon: float, radius_km: float, after: Optional[Tuple[float, str]] = None, limit: int = -1
+    ) -> List[Dict]:
+        """Locations ordered by (distance_km, id), starting after the ``after`` key when given."""
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(NEARBY_SQL, _nearby_params(lat, lon, radius_km, limit, after=after))
+            return [dict(row) for row in cur.fetchall()]
+
+    def iter_nearby_locations(
+        self, lat: float, lon: float, radius_km: float, initial_radius_km: float, batch_size: int
+    ) -> Iterator[Dict]:
+        """Stream get_nearby_locations' rows, holding one pooled connection until the generator is closed.
+
+        The circle is walked in rings whose radius doubles from initial_radius_km,
+        so SQLite only sorts one ring at a time and the first rows are sent after
+        sorting the small inner ring, whatever the total number of results.
+        """
+        inner_km = -1.0
+        outer_km = min(max(initial_radius_km, _MIN_INITIAL_RADIUS_KM), radius_km)
+        with self.db.get_cursor() as (conn, cur):
+            while inner_km < radius_km:
+                params = _nearby_params(lat, lon, outer_km)
+                params['min_distance_km'] = inner_km
+                cur.execute(NEARBY_SQL, params)
+                while batch := cur.fetchmany(batch_size):
+                    for row in batch:
+                        yield dict(row)
+                inner_km, outer_km = outer_km, min(outer_km * 2, radius_km)
+
+    def get_nearby_locations_batch(self, queries: List[Tuple[float, float, float]]) -> List[List[Dict]]:
+        """Results of many (lat, lon, radius_km) queries, in order, from a single connection.
+
+        Queries are grouped by overlapping bounding boxes and each group runs as
+        one NEARBY_BATCH_SQL statement, so shared candidates are fetched once.
         """
+        boxes = [_bounding_box(lat, lon, radius_km) for lat, lon, radius_km in queries]
+        results = [[] for _ in queries]
+        with self.db.get_cursor() as (conn, cur):
+            for indexes, (min_lat, max_lat, min_lon, max_lon) in _group_overlapping(boxes):
+                values = []
+                for i in indexes:
+                    lat, lon, radius_km = queries[i]
+                    q_min_lat, q_max_lat, q_min_lon, q_max_lon = boxes[i]
+                    values.extend((
+                        i,
+                        *precompute_coordinates(lat, lon),
+                        q_min_lat - _BOX_SLACK_DEG,
+                        q_max_lat + _BOX_SLACK_DEG,
+                        q_min_lon - _BOX_SLACK_DEG,
+                        q_max_lon + _BOX_SLACK_DEG,
+                        radius_km,
+                    ))
+                sql = NEARBY_BATCH_SQL.format(values=', '.join(['(?, ?, ?, ?, ?, ?, ?, ?, ?)'] * len(indexes)))
+                cur.execute(sql, (*values, max_lon, min_lon, max_lat, min_lat))
+                for row in cur.fetchall():
+                    location = dict(row)
+                    results[location.pop('query_index')].append(location)
+        return results
 
+    def get_locations_within_box(
+        self, bbox: Tuple[float, float, float, float], after_id: Optional[str], limit: int
+    ) -> List[Dict]:
         with self.db.get_cursor() as (conn, cur):
-            cur.execute(spatial_sql, (lat, lon, min_lat, max_lat, min_lon, max_lon, lat, lon, radius_km))
+            cur.execute(WITHIN_BOX_SQL, {**_box_params(bbox), 'after_id': after_id or '', 'limit': limit})
             return [dict(row) for row in cur.fetchall()]
 
-    def update_location(self, location_id: str, name: str, lat: float, lon: float) -> Optional[Dict]:
+    def get_locations_within_polygon(
+        self, geometry: Dict, bbox: Tuple[float, float, float, float], after_id: Optional[str], limit: int
+    ) -> List[Dict]:
+        """Locations inside a GeoJSON (Multi)Polygon; ``bbox`` is the polygon's own extent."""
         with self.db.get_cursor() as (conn, cur):
             cur.execute(
-                'UPDATE locations SET name = ?, geom = MakePoint(?, ?, 4326) WHERE id = ?',
-                (name, lon, lat, location_id),
+                WITHIN_POLYGON_SQL,
+                {**_box_params(bbox), 'geometry': json.dumps(geometry), 'after_id': after_id or '', 'limit': limit},
             )
-            if cur.rowcount > 0:
+            return [dict(row) for row in cur.fetchall()]
+
+    def get_clusters(self, bbox: Tuple[float, float, float, float], level: int) -> List[Dict]:
+        """Count and centroid of the locations in each level cell that intersects the bbox.
+
+        Cells are returned whole, so edge cells also count points just outside the bbox.
+        """
+        ranges = _cell_ranges(bbox, level)
+        sql = CLUSTERS_SQL.format(values=', '.join(['(?, ?)'] * len(ranges)), column=f'cell_{level}')
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(sql, [cell for cell_range in ranges for cell in cell_range])
+            return [
+                {
+                    'cell': row['cell'],
+                    'count': row['count'],
+                    'lat': math.degrees(row['lat_rad']),
+                    'lon': math.degrees(row['lon_rad']),
+                }
+                for row in cur.fetchall()
+            ]
+
+    def get_nearest_locations(self, lat: float, lon: float, k: int, initial_radius_km: float) -> List[Dict]:
+        """The k closest locations, growing the R*Tree window until the k-th one is final."""
+        with self.db.get_cursor() as (conn, cur):
+
+            def search(radius_km):
+                cur.execute(NEARBY_SQL, _nearby_params(lat, lon, radius_km, limit=k))
+                return [dict(row) for row in cur.fetchall()]
+
+            return _expanding_search(search, k, initial_radius_km)
+
+    def update_location(self, location_id: str, name: str, lat: float, lon: float) -> Optional[Dict]:
+        """Update in one statement: None when the id does not exist, ConflictError when the name is taken."""
+        with self.db.get_cursor() as (conn, cur):
+            try:
+                cur.execute(UPDATE_SQL, (name, normalize_name(name), lon, lat, *_derived_values(lat, lon), location_id))
+                rows = cur.fetchall()
+            except sqlite3.IntegrityError as e:
+                raise ConflictError('Location already exists') from e
+            if rows:
                 return {'id': location_id, 'name': name, 'lat': lat, 'lon': lon}
             return None
 
@@ -69,14 +390,117 @@ class LocationRepository:
             cur.execute('DELETE FROM locations WHERE id = ?', (location_id,))
             return cur.rowcount > 0
 
+    def get_generation(self) -> int:
+        """Counter the database bumps on every committed write to locations, from any process."""
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute('SELECT generation FROM locations_generation')
+            return cur.fetchone()[0]
+
+
+def _insert_values(location):
+    lat, lon = location['lat'], location['lon']
+    return (location['id'], location['name'], normalize_name(location['name']), lon, lat, *_derived_values(lat, lon))
+
+
+def _derived_values(lat, lon):
+    return (*precompute_coordinates(lat, lon), *grid_cells(lat, lon))
+
+
+def _cell_ranges(bbox, level):
+    """(first_cell, last_cell) id range of each grid row crossed by the bbox."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    first_row, first_col = grid_position(min_lat, min_lon, level)
+    last_row, last_col = grid_position(max_lat, max_lon, level)
+    return [((row << level) | first_col, (row << level) | last_col) for row in range(first_row, last_row + 1)]
+
+
+def _box_params(bbox):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return {'min_lon': min_lon, 'min_lat': min_lat, 'max_lon': max_lon, 'max_lat': max_lat}
+
+
+def _nearby_params(lat, lon, radius_km, limit=-1, after=None):
+    min_lat, max_lat, min_lon, max_lon = _bounding_box(lat, lon, radius_km)
+    lat_rad, lon_rad, cos_lat = precompute_coordinates(lat, lon)
+    return {
+        'lat_rad': lat_rad,
+        'lon_rad': lon_rad,
+        'cos_lat': cos_lat,
+        'min_lat': min_lat,
+        'max_lat': max_lat,
+        'min_lon': min_lon,
+        'max_lon': max_lon,
+        'radius_km': radius_km,
+        'min_distance_km': -1.0,
+        'after_distance_km': after[0] if after else -1.0,
+        'after_id': after[1] if after else '',
+        'limit': limit,
+    }
+
+
+def _expanding_search(search, k, initial_radius_km):
+    """Run ``search(radius_km)`` over growing radii until it returns k rows.
+
+    Once k rows lie within the radius, every location outside it is farther than
+    the k-th one, so the answer is final. Past MAX_DISTANCE_KM the circle covers
+    the globe and whatever exists is returned.
+    """
+    radius_km = min(max(initial_radius_km, _MIN_INITIAL_RADIUS_KM), MAX_DISTANCE_KM)
+    while True:
+        rows = search(radius_km)
+        if len(rows) >= k or radius_km >= MAX_DISTANCE_KM:
+            return rows[:k]
+        # Aim for the radius that should hold k rows at the density seen so far
+        growth = math.sqrt(k / len(rows)) * 1.25 if rows else 4
+        radius_km = min(radius_km * max(growth, 2), MAX_DISTANCE_KM)
+
+
+def _group_overlapping(boxes):
+    """Group (min_lat, max_lat, min_lon, max_lon) boxes that are worth fetching together.
+
+    Boxes are swept by latitude and a box joins the current group when it overlaps
+    the group's union box and the union grows by less than the box's own area, so a
+    long chain of small boxes (a route) is not merged into one huge rectangle.
+    Yields (box indexes, union box).
+    """
+
+    def area(box):
+        return (box[1] - box[0]) * (box[3] - box[2])
+
+    group, union = [], None
+    for i in sorted(range(len(boxes)), key=lambda i: boxes[i][0]):
+        box = boxes[i]
+        if union is not None:
+            merged = (min(union[0], box[0]), max(union[1], box[1]), min(union[2], box[2]), max(union[3], box[3]))
+            overlaps = box[0] <= union[1] and box[2] <= union[3] and box[3] >= union[2]
+            if overlaps and area(merged) <= area(union) + area(box):
+                group.append(i)
+                union = merged
+                continue
+            yield group, union
+        group, union = [i], box
+    if group:
+        yield group, union
+
 
 def _bounding_box(lat, lon, radius_km):
-    radius_deg_lat = radius_km / 111  # ~111 km por grau latitude
-    radius_deg_lon = radius_km / (111 * math.cos(math.radians(lat)))
+    """Lat/lon box that contains every point within radius_km of (lat, lon).
+
+    The longitude span is the exact one of a spherical cap; boxes that reach a
+    pole or cross the antimeridian fall back to the full longitude range.
+    """
+    radius_rad = radius_km / RADIUS_EARTH_IN_KM
+    radius_deg_lat = math.degrees(radius_rad)
 
     min_lat = lat - radius_deg_lat
     max_lat = lat + radius_deg_lat
+    if min_lat <= -MAX_LAT or max_lat >= MAX_LAT:
+        return max(min_lat, -MAX_LAT), min(max_lat, MAX_LAT), -MAX_LON, MAX_LON
+
+    radius_deg_lon = math.degrees(math.asin(min(1, math.sin(radius_rad) / math.cos(math.radians(lat)))))
     min_lon = lon - radius_deg_lon
     max_lon = lon + radius_deg_lon
+    if min_lon < -MAX_LON or max_lon > MAX_LON:
+        return min_lat, max_lat, -MAX_LON, MAX_LON
 
     return min_lat, max_lat, min_lon, max_lon
@@ -0,0 +1,31 @@
+import time
+
+RESERVE_SQL = """
+    INSERT INTO rate_limits (key, next_at) VALUES (:key, :now - :burst + :interval)
+    ON CONFLICT (key) DO UPDATE SET next_at = MAX(next_at, :now - :burst) + :interval
+    RETURNING next_at - :interval AS slot
+"""
+
+
+class RateLimitRepository:
+    """Request slots of a rate-limited service, shared by every worker process through the database.
+
+    Each row keeps the time the next request may start. Reserving a slot is a
+    single UPSERT, so SQLite's write lock serializes it across processes and no
+    two callers ever get the same slot.
+    """
+
+    def __init__(self, config, db):
+        self.config = config
+        self.db = db
+
+    def reserve(self, key: str, rate: float, capacity: float) -> float:
+        """Take the next slot of ``key`` and return the time.time() at which it starts.
+
+        At most ``rate`` slots per second; up to ``capacity`` of them may start
+        at once after an idle period.
+        """
+        params = {'key': key, 'now': time.time(), 'interval': 1 / rate, 'burst': (capacity - 1) / rate}
+        with self.db.get_cursor() as (conn, cur):
+            cur.execute(RESERVE_SQL, params)
+            return cur.fetchone()['slot']
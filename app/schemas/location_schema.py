@@ -1,4 +1,14 @@
-from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, List, Literal, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from pydantic_core import PydanticCustomError
+
+from app.utils import MAX_LAT, MAX_LON
+
+# GeoJSON position: [lon, lat] with an optional altitude, which is ignored
+Position = Annotated[List[float], Field(min_length=2, max_length=3)]
+LinearRing = Annotated[List[Position], Field(min_length=4)]
+Bbox = Tuple[float, float, float, float]
 
 
 class LocationIn(BaseModel):
@@ -19,5 +29,159 @@ class LocationNearbyIn(BaseModel):
     radius_km: float = Field(default=10, gt=0, description='Radius must be greater than zero')
 
 
+class LocationNearbyBatchIn(BaseModel):
+    queries: List[LocationNearbyIn] = Field(..., min_length=1, description='Nearby queries to run together')
+
+
+class LocationNearestIn(BaseModel):
+    lat: float = Field(..., ge=-90, le=90, description='Latitude between -90 and 90')
+    lon: float = Field(..., ge=-180, le=180, description='Longitude between -180 and 180')
+    k: int = Field(default=10, ge=1, le=100, description='Number of locations, between 1 and 100')
+
+
 class LocationNearbyOut(LocationOut):
     distance_km: float = Field(..., description='Distance in kilometers from the reference point')
+
+
+class LocationNearbyBatchItemOut(LocationNearbyIn):
+    locations: List[LocationNearbyOut] = Field(..., description='Locations within radius_km, closest first')
+
+
+class LocationPageIn(BaseModel):
+    limit: Optional[int] = Field(default=None, ge=1, description='Page size, capped by the server')
+    cursor: Optional[str] = Field(default=None, min_length=1, description='next_cursor of the previous page')
+
+
+class LocationImportIn(BaseModel):
+    chunk_size: Optional[int] = Field(default=None, ge=1, description='Rows committed per transaction')
+
+
+class LocationPageOut(BaseModel):
+    items: List[LocationOut] = Field(..., description='Locations in this page')
+    next_cursor: Optional[str] = Field(default=None, description='Cursor of the next page, null on the last one')
+
+
+class LocationNearbyPageIn(LocationPageIn, LocationNearbyIn):
+    stream: bool = Field(default=False, description='Stream every result as a chunked JSON array')
+
+    @model_validator(mode='after')
+    def check_stream(self):
+        if self.stream and (self.limit is not None or self.cursor is not None):
+            raise PydanticCustomError('stream', 'stream cannot be combined with limit or cursor')
+        return self
+
+
+class LocationNearbyPageOut(BaseModel):
+    items: List[LocationNearbyOut] = Field(..., description='Locations in this page, closest first')
+    next_cursor: Optional[str] = Field(default=None, description='Cursor of the next page, null on the last one')
+
+
+class LocationBatchIn(BaseModel):
+    names: List[Annotated[str, Field(min_length=1)]] = Field(..., min_length=1, description='Names of the locations')
+
+
+class LocationBatchItemOut(BaseModel):
+    name: str = Field(..., description='Name of the location')
+    status: int = Field(..., description='HTTP status of this item')
+    location: Optional[LocationOut] = Field(default=None, description='Created location')
+    error: Optional[str] = Field(default=None, description='Error message')
+
+
+class GeocodeJobOut(BaseModel):
+    id: str = Field(..., description='Job ID')
+    operation: Literal['create', 'update'] = Field(..., description='Write the job performs')
+    status: Literal['pending', 'running', 'succeeded', 'failed'] = Field(..., description='Job status')
+    name: str = Field(..., description='Name being geocoded')
+    location_id: Optional[str] = Field(default=None, description='Location updated, or created once succeeded')
+    attempts: int = Field(..., description='Attempts started so far')
+    location: Optional[LocationOut] = Field(default=None, description='Location written by the job')
+    error: Optional[str] = Field(default=None, description='Last error message')
+    error_status: Optional[int] = Field(default=None, description='HTTP status the synchronous call would return')
+    created_at: float = Field(..., description='Unix time the job was submitted')
+    updated_at: float = Field(..., description='Unix time of the last status change')
+
+
+class GeoJSONPolygon(BaseModel):
+    type: Literal['Polygon']
+    coordinates: Annotated[List[LinearRing], Field(min_length=1)]
+
+    def rings(self) -> List[List[Position]]:
+        return self.coordinates
+
+
+class GeoJSONMultiPolygon(BaseModel):
+    type: Literal['MultiPolygon']
+    coordinates: Annotated[List[Annotated[List[LinearRing], Field(min_length=1)]], Field(min_length=1)]
+
+    def rings(self) -> List[List[Position]]:
+        return [ring for polygon in self.coordinates for ring in polygon]
+
+
+class LocationBboxIn(BaseModel):
+    bbox: Bbox = Field(..., description='min_lon,min_lat,max_lon,max_lat')
+
+    @field_validator('bbox', mode='before')
+    @classmethod
+    def split_bbox(cls, value):
+        if isinstance(value, str):
+            return tuple(part.strip() for part in value.split(','))
+        return value
+
+    @field_validator('bbox')
+    @classmethod
+    def check_bbox(cls, value: Bbox) -> Bbox:
+        min_lon, min_lat, max_lon, max_lat = value
+        if not (-MAX_LON <= min_lon <= max_lon <= MAX_LON and -MAX_LAT <= min_lat <= max_lat <= MAX_LAT):
+            raise PydanticCustomError(
+                'bbox', 'bbox must be min_lon,min_lat,max_lon,max_lat within -180..180 and -90..90'
+            )
+        return value
+
+
+class LocationWithinBoxIn(LocationPageIn, LocationBboxIn):
+    pass
+
+
+class LocationClustersIn(LocationBboxIn):
+    zoom: int = Field(..., ge=0, le=22, description='Map zoom level, between 0 and 22')
+
+
+class LocationClusterOut(BaseModel):
+    cell: int = Field(..., description='Grid cell ID at the response level')
+    count: int = Field(..., description='Number of locations in the cell')
+    lat: float = Field(..., description='Latitude of the centroid of the cell locations')
+    lon: float = Field(..., description='Longitude of the centroid of the cell locations')
+
+
+class LocationClustersOut(BaseModel):
+    level: int = Field(..., description='Grid level: cells are 360 / 2**level degrees wide')
+    clusters: List[LocationClusterOut] = Field(..., description='Non-empty cells intersecting the bbox')
+
+
+class LocationWithinPolygonIn(LocationPageIn):
+    geometry: Union[GeoJSONPolygon, GeoJSONMultiPolygon] = Field(
+        ..., discriminator='type', description='GeoJSON Polygon or MultiPolygon in WGS 84'
+    )
+
+    @model_validator(mode='after')
+    def check_rings(self):
+        for ring in self.geometry.rings():
+            if ring[0] != ring[-1]:
+                raise PydanticCustomError('polygon_ring', 'Polygon rings must be closed')
+            for lon, lat, *_ in ring:
+                if not (-MAX_LON <= lon <= MAX_LON and -MAX_LAT <= lat <= MAX_LAT):
+                    raise PydanticCustomError('position', 'Positions must be [lon, lat] within -180..180 and -90..90')
+        return self
+
+    @property
+    def bbox(self) -> Bbox:
+        lons = [position[0] for ring in self.geometry.rings() for position in ring]
+        lats = [position[1] for ring in self.geometry.rings() for position in ring]
+        return min(lons), min(lats), max(lons), max(lats)
+
+
+class LocationImportRow(BaseModel):
+    id: Optional[str] = Field(default=None, min_length=1, description='Location ID, generated when missing')
+    name: str = Field(..., min_length=1, description='Name of the location')
+    lat: float = Field(..., ge=-90, le=90, description='Latitude between -90 and 90')
+    lon: float = Field(..., ge=-180, le=180, description='Longitude between -180 and 180')
@@ -0,0 +1,156 @@
+import http
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.exceptions import ConflictError, NotFoundError, UnprocessableEntityError
+from app.logger import logger
+from app.schemas.location_schema import GeocodeJobOut, LocationOut
+
+# Finished jobs older than JOB_RETENTION are deleted after every this many jobs
+PURGE_EVERY = 100
+
+
+class GeocodeJobService:
+    """Creates and updates locations in the background (WRITE_MODE=async).
+
+    The request only records a job; JOB_WORKERS threads per process claim jobs
+    from the geocode_jobs table and run them through LocationService, so the
+    outcome is the same as the synchronous call: 404, 409 and 422 fail the job
+    with that status, and anything else (Nominatim unreachable, database busy)
+    is retried with exponential backoff up to JOB_MAX_ATTEMPTS.
+
+    A create job inserts its location with the job's id. If the worker dies
+    after the insert but before the job is marked done, the retry conflicts
+    with that row, finds it by id and succeeds instead of failing with 409.
+    Updates are idempotent and simply run again.
+    """
+
+    def __init__(self, job_repository, location_service, config):
+        self.repo = job_repository
+        self.location_service = location_service
+        self.config = config
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._finished = 0
+
+    def submit_create(self, name: str) -> GeocodeJobOut:
+        self.location_service.check_name_available(name)
+        return self._submit('create', name)
+
+    def submit_update(self, location_id: str, name: str) -> GeocodeJobOut:
+        self.location_service.get_location_by_id(location_id)
+        self.location_service.check_name_available(name, location_id)
+        return self._submit('update', name, location_id)
+
+    def get_job(self, job_id: str) -> GeocodeJobOut:
+        job = self.repo.get_job(job_id)
+        if job is None:
+            logger.error('Geocoding job %s not found', job_id)
+            raise NotFoundError('Job not found')
+        return _job_out(job)
+
+    def run_next_job(self) -> bool:
+        job = self.repo.claim_job()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def run_job(self, job: Dict) -> None:
+        if job['attempts'] > self.config.JOB_MAX_ATTEMPTS:
+            # Claimed again after its lease ran out, e.g. the process died while running it
+            self._fail(job, http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server')
+            return
+
+        try:
+            if job['operation'] == 'create':
+                location = self.location_service.create_location(job['name'], job['id'])
+            else:
+                location = self.location_service.update_location(job['location_id'], job['name'])
+        except ConflictError:
+            location = self._created_by(job)
+            if location is None:
+                self._fail(job, http.HTTPStatus.CONFLICT, 'Location already exists')
+                return
+        except UnprocessableEntityError:
+            self._fail(job, http.HTTPStatus.UNPROCESSABLE_ENTITY, 'Failed to search for name')
+            return
+        except NotFoundError:
+            self._fail(job, http.HTTPStatus.NOT_FOUND, 'Location not found')
+            return
+        except Exception as e:
+            if job['attempts'] >= self.config.JOB_MAX_ATTEMPTS:
+                logger.exception('Geocoding job %s failed after %d attempts', job['id'], job['attempts'])
+                self._fail(job, http.HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server')
+                return
+            # Half fixed, half random, so jobs that failed together spread out without retrying at once
+            backoff = self.config.JOB_BACKOFF * 2 ** (job['attempts'] - 1)
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            logger.warning('Geocoding job %s failed (%s), retrying in %.2fs', job['id'], e, delay)
+            self.repo.retry_job(job['id'], time.time() + delay, str(e))
+            return
+        self.repo.complete_job(job['id'], location.model_dump())
+        self._job_finished()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        for i in range(self.config.JOB_WORKERS):
+            thread = threading.Thread(target=self._work, name=f'geocode-job-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Lets running jobs finish; a job still running after ``timeout`` is retried when its lease expires."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def _submit(self, operation: str, name: str, location_id: Optional[str] = None) -> GeocodeJobOut:
+        job = self.repo.create_job(operation, name, location_id)
+        with self._wakeup:
+            self._wakeup.notify()
+        return _job_out(job)
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = self.run_next_job()
+            except Exception:
+                logger.exception('Geocoding job worker failed')
+                ran = False
+            if not ran:
+                # Jobs submitted by other processes, and retries coming due, are found by polling
+                with self._wakeup:
+                    if not self._stopping.is_set():
+                        self._wakeup.wait(self.config.JOB_POLL_INTERVAL)
+
+    def _created_by(self, job: Dict) -> Optional[LocationOut]:
+        """The location an earlier attempt of this create job inserted, if any."""
+        if job['operation'] != 'create' or job['attempts'] == 1:
+            return None
+        try:
+            return self.location_service.get_location_by_id(job['id'])
+        except NotFoundError:
+            return None
+
+    def _fail(self, job: Dict, status: int, error: str) -> None:
+        self.repo.fail_job(job['id'], int(status), error)
+        self._job_finished()
+
+    def _job_finished(self) -> None:
+        with self._lock:
+            self._finished += 1
+            purge = self._finished % PURGE_EVERY == 0
+        if purge:
+            self.repo.delete_finished_jobs(time.time() - self.config.JOB_RETENTION)
+
+
+def _job_out(job: Dict) -> GeocodeJobOut:
+    return GeocodeJobOut(**job, location=job['result'])
@@ -1,61 +1,291 @@
-from typing import List, Optional
+import http
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, TextIO
 
-from app.exceptions import ConflictError, NotFoundError, UnprocessableEntityError
+from app.database.utils_sqlite import CLUSTER_LEVELS, grid_cell_count
+from app.exceptions import BadRequestError, ConflictError, NotFoundError, UnprocessableEntityError
 from app.logger import logger
-from app.schemas.location_schema import LocationIn, LocationNearbyOut, LocationOut
+from app.schemas.location_schema import (
+    LocationBatchItemOut,
+    LocationClustersIn,
+    LocationClustersOut,
+    LocationIn,
+    LocationNearbyBatchItemOut,
+    LocationNearbyIn,
+    LocationNearbyOut,
+    LocationNearbyPageIn,
+    LocationNearbyPageOut,
+    LocationOut,
+    LocationPageOut,
+    LocationWithinBoxIn,
+    LocationWithinPolygonIn,
+)
+from app.services.location_transfer import TransferStats, check_format, read_rows, write_rows
+from app.utils import decode_cursor, encode_cursor, normalize_name
 
 
 class LocationService:
-    def __init__(self, location_repository, nominatim_api, config) -> None:
+    def __init__(self, location_repository, nominatim_api, config, nearby_index=None, nearby_cache=None) -> None:
         self.repo = location_repository
         self.nominatim_api = nominatim_api
         self.config = config
+        self.nearby_index = nearby_index
+        self.nearby_cache = nearby_cache
 
-    def create_location(self, name: LocationIn):
-        name_exists = self.repo.get_location_by_name(name)
-        if name_exists:
-            logger.error(f'Location with name {name} already exists')
-            raise ConflictError('Location already exists')
-
-        lat, lon = self.nominatim_api.get_location(name)
-        if not lat or not lon:
-            logger.error(f'Failed to get coordinates for location: {name}')
-            raise UnprocessableEntityError('Name not found')
-        location = self.repo.create_location(name, lat, lon)
+    def create_location(self, name: LocationIn, location_id: Optional[str] = None):
+        # The unique index on name_normalized decides conflicts at insert time
+        lat, lon = self._geocode(name)
+        try:
+            location = self.repo.create_location(name, lat, lon, location_id=location_id)
+        except ConflictError:
+            logger.error('Location with name %s already exists', name)
+            raise
+        if self.nearby_index is not None:
+            self.nearby_index.upsert(location)
+        self._invalidate_nearby_cache()
         return LocationOut(**location)
 
+    def create_locations(self, names: List[str]) -> List[LocationBatchItemOut]:
+        if len(names) > self.config.BATCH_MAX_ITEMS:
+            raise BadRequestError(f'At most {self.config.BATCH_MAX_ITEMS} names per batch')
+
+        # Skips geocoding names that are known to conflict; the insert still has the final say
+        taken = {normalize_name(loc['name']) for loc in self.repo.get_locations_by_names(list(dict.fromkeys(names)))}
+        results = {}
+        pending = {}
+        for i, name in enumerate(names):
+            key = normalize_name(name)
+            if key in taken:
+                results[i] = _conflict(name)
+            else:
+                pending[i] = name
+                taken.add(key)
+
+        # Nominatim's rate limit is enforced by the shared limiter inside NominatimAPI,
+        # the pool only bounds how many lookups wait on it at once.
+        with ThreadPoolExecutor(max_workers=self.config.GEOCODE_WORKERS) as executor:
+            futures = {i: executor.submit(self._geocode, name) for i, name in pending.items()}
+
+        geocoded = []
+        for i, future in futures.items():
+            name = pending[i]
+            try:
+                lat, lon = future.result()
+            except UnprocessableEntityError:
+                results[i] = LocationBatchItemOut(
+                    name=name, status=http.HTTPStatus.UNPROCESSABLE_ENTITY, error='Failed to search for name'
+                )
+            except Exception:
+                logger.exception('Failed to geocode location: %s', name)
+                results[i] = LocationBatchItemOut(
+                    name=name, status=http.HTTPStatus.INTERNAL_SERVER_ERROR, error='Internal server'
+                )
+            else:
+                geocoded.append((i, name, lat, lon))
+
+        if geocoded:
+            created = self.repo.create_locations([(name, lat, lon) for _, name, lat, lon in geocoded])
+            for (i, name, *_), location in zip(geocoded, created):
+                if location is None:
+                    results[i] = _conflict(name)
+                    continue
+                if self.nearby_index is not None:
+                    self.nearby_index.upsert(location)
+                results[i] = LocationBatchItemOut(
+                    name=location['name'], status=http.HTTPStatus.CREATED, location=LocationOut(**location)
+                )
+            self._invalidate_nearby_cache()
+
+        return [results[i] for i in range(len(names))]
+
+    def import_locations(self, stream: TextIO, fmt: str, chunk_size: int, defer_index: bool = False) -> Dict:
+        """Load rows with known coordinates straight into the table, bypassing Nominatim."""
+        check_format(fmt)
+        stats = TransferStats()
+        start = time.perf_counter()
+        rows = (row.model_dump() for row in read_rows(stream, fmt, stats))
+        imported = self.repo.import_locations(rows, chunk_size, defer_index)
+        seconds = time.perf_counter() - start
+
+        if self.nearby_index is not None:
+            self.nearby_index.rebuild(self.repo.get_all_locations())
+        self._invalidate_nearby_cache()
+
+        return {
+            'imported': imported,
+            'skipped': stats.rows - imported,
+            'rejected': stats.rejected,
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(imported / seconds, 1) if seconds else 0.0,
+        }
+
+    def export_locations(self, fmt: str, stats: Optional[TransferStats] = None) -> Iterator[str]:
+        check_format(fmt)
+        return write_rows(self.repo.iter_locations(self.config.EXPORT_BATCH_SIZE), fmt, stats)
+
+    def check_name_available(self, name: str, location_id: Optional[str] = None) -> None:
+        """Fails fast when another location has the name; the insert or update still has the final say."""
+        existing = self.repo.get_location_by_name(name)
+        if existing is not None and existing['id'] != location_id:
+            logger.error('Location with name %s already exists', name)
+            raise ConflictError()
+
     def get_location_by_id(self, location_id: str) -> LocationOut:
         location = self.repo.get_location_by_id(location_id)
         if not location:
-            logger.error(f'Location with ID {location_id} not found')
+            logger.error('Location with ID %s not found', location_id)
             raise NotFoundError()
         return LocationOut(**location)
 
+    def list_locations(self, cursor: Optional[str] = None, limit: Optional[int] = None) -> LocationPageOut:
+        return self._page(self.repo.list_locations, cursor, limit)
+
+    def get_locations_within_box(self, query: LocationWithinBoxIn) -> LocationPageOut:
+        return self._page(
+            lambda after_id, limit: self.repo.get_locations_within_box(query.bbox, after_id, limit),
+            query.cursor,
+            query.limit,
+        )
+
+    def get_locations_within_polygon(self, query: LocationWithinPolygonIn) -> LocationPageOut:
+        geometry = query.geometry.model_dump()
+        return self._page(
+            lambda after_id, limit: self.repo.get_locations_within_polygon(geometry, query.bbox, after_id, limit),
+            query.cursor,
+            query.limit,
+        )
+
     def get_nearby_locations(self, lat: float, lon: float, radius_km: float) -> List[LocationNearbyOut]:
-        locations = self.repo.get_nearby_locations(lat, lon, radius_km)
-        return [LocationNearbyOut(**loc) for loc in locations]
+        return [LocationNearbyOut(**loc) for loc in self.get_nearby_rows(lat, lon, radius_km)]
+
+    def get_nearby_rows(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
+        """Rows with id, name, lat, lon and distance_km, for callers that encode them directly."""
+        source = self.nearby_index if self.nearby_index is not None else self.repo
+        if self.nearby_cache is not None:
+            return self.nearby_cache.get_nearby_locations(lat, lon, radius_km, source.get_nearby_locations)
+        return source.get_nearby_locations(lat, lon, radius_km)
+
+    def get_nearby_page(self, query: LocationNearbyPageIn) -> LocationNearbyPageOut:
+        """Keyset page on (distance_km, id); the result cache is skipped so a page never loads the whole radius."""
+        limit = self._page_limit(query.limit)
+        after = None
+        if query.cursor:
+            position = decode_cursor(query.cursor)
+            after = (position.get('distance_km'), position.get('id'))
+            distance_km, location_id = after
+            is_number = isinstance(distance_km, (int, float)) and not isinstance(distance_km, bool)
+            if not is_number or not isinstance(location_id, str):
+                raise BadRequestError('Invalid cursor')
+
+        if self.nearby_index is not None:
+            locations = self.nearby_index.get_nearby_locations(query.lat, query.lon, query.radius_km)
+            if after is not None:
+                locations = [loc for loc in locations if (loc['distance_km'], loc['id']) > after]
+            locations = locations[: limit + 1]
+        else:
+            locations = self.repo.get_nearby_locations(query.lat, query.lon, query.radius_km, after, limit + 1)
+
+        next_cursor = None
+        if len(locations) > limit:
+            last = locations[limit - 1]
+            next_cursor = encode_cursor({'distance_km': last['distance_km'], 'id': last['id']})
+        return LocationNearbyPageOut(
+            items=[LocationNearbyOut(**loc) for loc in locations[:limit]], next_cursor=next_cursor
+        )
+
+    def iter_nearby_rows(self, lat: float, lon: float, radius_km: float) -> Iterator[Dict]:
+        """Same rows as get_nearby_rows, produced lazily while the response is being written."""
+        if self.nearby_index is not None:
+            return iter(self.nearby_index.get_nearby_locations(lat, lon, radius_km))
+        return self.repo.iter_nearby_locations(
+            lat, lon, radius_km, self.config.NEAREST_INITIAL_RADIUS_KM, self.config.NEARBY_STREAM_BATCH_SIZE
+        )
+
+    def get_nearby_locations_batch(self, queries: List[LocationNearbyIn]) -> List[LocationNearbyBatchItemOut]:
+        if len(queries) > self.config.BATCH_MAX_ITEMS:
+            raise BadRequestError(f'At most {self.config.BATCH_MAX_ITEMS} queries per batch')
+
+        if self.nearby_index is not None:
+            results = [self.nearby_index.get_nearby_locations(q.lat, q.lon, q.radius_km) for q in queries]
+        else:
+            results = self.repo.get_nearby_locations_batch([(q.lat, q.lon, q.radius_km) for q in queries])
+        return [
+            LocationNearbyBatchItemOut(**query.model_dump(), locations=[LocationNearbyOut(**loc) for loc in locations])
+            for query, locations in zip(queries, results)
+        ]
+
+    def get_clusters(self, query: LocationClustersIn) -> LocationClustersOut:
+        # About 8x8 cells per 256px map tile, coarser when the bbox would span too many cells
+        target = query.zoom + 3
+        levels = [level for level in CLUSTER_LEVELS if level <= target] or [CLUSTER_LEVELS[0]]
+        while len(levels) > 1 and grid_cell_count(query.bbox, levels[-1]) > self.config.CLUSTERS_MAX_CELLS:
+            levels.pop()
+        level = levels[-1]
+        return LocationClustersOut(level=level, clusters=self.repo.get_clusters(query.bbox, level))
+
+    def get_nearest_locations(self, lat: float, lon: float, k: int) -> List[LocationNearbyOut]:
+        return [LocationNearbyOut(**loc) for loc in self.get_nearest_rows(lat, lon, k)]
+
+    def get_nearest_rows(self, lat: float, lon: float, k: int) -> List[Dict]:
+        source = self.nearby_index if self.nearby_index is not None else self.repo
+        return source.get_nearest_locations(lat, lon, k, self.config.NEAREST_INITIAL_RADIUS_KM)
 
     def update_location(self, location_id: str, name: str) -> Optional[LocationOut]:
-        location_exists = self.repo.get_location_by_id(location_id)
-        if not location_exists:
-            logger.error(f'Location with name {name} or id {location_id} not found')
+        lat, lon = self._geocode(name)
+        try:
+            location = self.repo.update_location(location_id, name, lat, lon)
+        except ConflictError:
+            logger.error('Location with name %s already exists', name)
+            raise
+        if location is None:
+            logger.error('Location with name %s or id %s not found', name, location_id)
             raise NotFoundError('Location not found exists')
 
-        name_exists = self.repo.get_location_by_name(name)
-        if name_exists and name_exists.get('id') != location_id:
-            logger.error(f'Location with name {name} already exists')
-            raise ConflictError('Location already exists')
+        if self.nearby_index is not None:
+            self.nearby_index.upsert(location)
+        self._invalidate_nearby_cache()
+        return LocationOut(**location)
+
+    def delete_location(self, location_id: str) -> bool:
+        deleted = self.repo.delete_location(location_id)
+        if not deleted:
+            logger.error('Location with ID %s not found', location_id)
+            raise NotFoundError('Location not found')
+
+        if self.nearby_index is not None:
+            self.nearby_index.remove(location_id)
+        self._invalidate_nearby_cache()
+        return deleted
+
+    def _invalidate_nearby_cache(self) -> None:
+        if self.nearby_cache is not None:
+            self.nearby_cache.invalidate()
+
+    def _page(self, fetch, cursor: Optional[str], limit: Optional[int]) -> LocationPageOut:
+        """Keyset page on id: ``fetch(after_id, limit)`` returns rows ordered by id."""
+        limit = self._page_limit(limit)
+        after_id = None
+        if cursor:
+            after_id = decode_cursor(cursor).get('id')
+            if not isinstance(after_id, str):
+                raise BadRequestError('Invalid cursor')
+
+        # One extra row tells whether there is a next page without a COUNT
+        locations = fetch(after_id, limit + 1)
+        next_cursor = encode_cursor({'id': locations[limit - 1]['id']}) if len(locations) > limit else None
+        return LocationPageOut(items=[LocationOut(**loc) for loc in locations[:limit]], next_cursor=next_cursor)
 
+    def _page_limit(self, limit: Optional[int]) -> int:
+        return min(limit or self.config.PAGE_DEFAULT_LIMIT, self.config.PAGE_MAX_LIMIT)
+
+    def _geocode(self, name: str) -> tuple[float, float]:
         lat, lon = self.nominatim_api.get_location(name)
         if not lat or not lon:
-            logger.error(f'Failed to get coordinates for location: {name}')
+            logger.error('Failed to get coordinates for location: %s', name)
             raise UnprocessableEntityError('Name not found')
-        location = self.repo.update_location(location_id, name, lat, lon)
-        return LocationOut(**location)
+        return lat, lon
 
-    def delete_location(self, location_id: str) -> bool:
-        location_exists = self.repo.get_location_by_id(location_id)
-        if not location_exists:
-            logger.error(f'Location with ID {location_id} not found')
-            raise NotFoundError('Location not found')
-        return self.repo.delete_location(location_id)
+
+def _conflict(name: str) -> LocationBatchItemOut:
+    return LocationBatchItemOut(name=name, status=http.HTTPStatus.CONFLICT, error='Location already exists')
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+from pydantic import ValidationError
+
+from app.exceptions import BadRequestError
+from app.logger import logger
+from app.schemas.location_schema import LocationImportRow
+
+FORMATS = ('ndjson', 'csv')
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CSV_FIELDS = ('id', 'name', 'lat', 'lon')
+
+
+class TransferStats:
+    def __init__(self):
+        self.rows = 0
+        self.rejected = 0
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise BadRequestError(f'Unsupported format {fmt!r}, expected one of {", ".join(FORMATS)}')
+    return fmt
+
+
+def read_rows(stream: TextIO, fmt: str, stats: TransferStats) -> Iterator[LocationImportRow]:
+    """Lazily parse an NDJSON or CSV stream, skipping (and counting) invalid rows."""
+    records = _read_ndjson(stream) if check_format(fmt) == 'ndjson' else csv.DictReader(stream)
+    for record_number, record in enumerate(records, start=1):
+        try:
+            if record is None:
+                raise ValueError('invalid JSON')
+            row = LocationImportRow(**{key: value for key, value in record.items() if value not in {None, ''}})
+        except (ValidationError, ValueError, TypeError, AttributeError) as e:
+            stats.rejected += 1
+            logger.warning('Skipping invalid import row %d: %s', record_number, e)
+        else:
+            stats.rows += 1
+            yield row
+
+
+def write_rows(
+    rows: Iterable[Dict], fmt: str, stats: Optional[TransferStats] = None, rows_per_chunk: int = 500
+) -> Iterator[str]:
+    """Serialize rows lazily, yielding one string per ``rows_per_chunk`` rows."""
+    check_format(fmt)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    if fmt == 'csv':
+        writer.writeheader()
+
+    for count, row in enumerate(rows, start=1):
+        if fmt == 'ndjson':
+            buffer.write(json.dumps({field: row[field] for field in CSV_FIELDS}) + '\n')
+        else:
+            writer.writerow(row)
+        if stats is not None:
+            stats.rows += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _read_ndjson(stream: TextIO) -> Iterator[Dict]:
+    for line in stream:
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            yield json.loads(text)
+        except json.JSONDecodeError:
+            yield None
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.database.utils_sqlite import haversine
+
+# Rounding slack, in km, added to the cell's reach so the superset never misses an edge row
+_SLACK_EPSILON_KM = 1e-6
+
+
+class NearbyResultCache:
+    """Bounded LRU cache of nearby candidates for grid cells.
+
+    A query is snapped to the centre of a ``grid_deg`` cell. The cached entry
+    holds every location within ``radius_km`` plus the cell's half-diagonal of
+    that centre, which is a superset of the answer for any point in the cell;
+    the exact distances are recomputed for the requested point on every hit.
+
+    Entries are tagged with ``generation()``, a counter the database bumps in
+    the transaction of every write to locations (see migration 6), and only
+    served while it is unchanged, so writes from any process invalidate them.
+    Large radii load many rows per entry, so the bound is ``max_rows``
+    candidate rows in total rather than a number of entries.
+    """
+
+    def __init__(self, max_rows: int, ttl: float, grid_deg: float, generation: Callable[[], int]):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.grid_deg = grid_deg
+        self._read_generation = generation
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._rows = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def get_nearby_locations(
+        self, lat: float, lon: float, radius_km: float, load: Callable[[float, float, float], List[Dict]]
+    ) -> List[Dict]:
+        """Locations within radius_km of (lat, lon); ``load(lat, lon, radius_km)`` fills misses."""
+        key, (center_lat, center_lon), reach_km = self._cell(lat, lon, radius_km)
+        # Read before loading, so a write that lands while loading makes this entry stale
+        generation = self._read_generation()
+        candidates = self._get(key, generation)
+        if candidates is None:
+            candidates = load(center_lat, center_lon, radius_km + reach_km)
+            self._put(key, candidates, generation)
+
+        results = []
+        for loc in candidates:
+            distance_km = haversine(lat, lon, loc['lat'], loc['lon'])
+            if distance_km <= radius_km:
+                results.append({**loc, 'distance_km': distance_km})
+        results.sort(key=lambda loc: (loc['distance_km'], loc['id']))
+        return results
+
+    def invalidate(self) -> None:
+        """Drop every entry now; they would be found stale on their next lookup anyway."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'rows': self._rows,
+                'generation': self._generation,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale,
+                'evictions': self._evictions,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+            }
+
+    def _cell(self, lat: float, lon: float, radius_km: float) -> Tuple[Tuple, Tuple[float, float], float]:
+        row, col = round(lat / self.grid_deg), round(lon / self.grid_deg)
+        center_lat, center_lon = row * self.grid_deg, col * self.grid_deg
+        half = self.grid_deg / 2
+        reach_km = max(
+            haversine(center_lat, center_lon, max(-90.0, min(90.0, center_lat + dlat)), center_lon + dlon)
+            for dlat in (-half, half)
+            for dlon in (-half, half)
+        )
+        return (row, col, radius_km), (center_lat, center_lon), reach_km + _SLACK_EPSILON_KM
+
+    def _get(self, key, generation: int) -> Optional[List[Dict]]:
+        with self._lock:
+            if generation != self._generation:
+                # Every entry predates this generation
+                self._stale += len(self._entries)
+                self._clear()
+                self._generation = generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                candidates, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return candidates
+                self._remove(key)
+                self._stale += 1
+            self._misses += 1
+            return None
+
+    def _put(self, key, candidates: List[Dict], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation or len(candidates) > self.max_rows:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (candidates, time.monotonic() + self.ttl)
+            self._rows += len(candidates)
+            while self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key) -> None:
+        candidates, _ = self._entries.pop(key)
+        self._rows -= len(candidates)
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._rows = 0
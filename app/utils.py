@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+import unicodedata
+
+from app.exceptions import BadRequestError
+
+# Valid coordinates are within -MAX_LAT..MAX_LAT and -MAX_LON..MAX_LON degrees
+MAX_LAT = 90
+MAX_LON = 180
+
+
+def normalize_name(name: str) -> str:
+    """Canonical form of a place name: NFKC, case-folded, single spaces."""
+    return ' '.join(unicodedata.normalize('NFKC', name).casefold().split())
+
+
+def encode_cursor(position: dict) -> str:
+    """Opaque pagination token for a keyset position."""
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise BadRequestError('Invalid cursor') from e
+    if not isinstance(position, dict):
+        raise BadRequestError('Invalid cursor')
+    return position
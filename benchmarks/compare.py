@@ -0,0 +1,42 @@
+"""Compare two benchmarks.run result files, scenario by scenario.
+
+python -m benchmarks.compare baseline.json candidate.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+
+
+def load(path: Path):
+    report = json.loads(path.read_text(encoding='utf-8'))
+    return {(row['dataset'], row['transport'], row['scenario']): row for row in report['results']}
+
+
+def change(old, new):
+    if not old:
+        return '     n/a'
+    return f'{(new - old) / old * 100:+7.1f}%'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline', type=Path)
+    parser.add_argument('candidate', type=Path)
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    print(f'{"dataset":>24} {"transport":>9} {"scenario":>30}  ' + '  '.join(f'{metric:>31}' for metric in METRICS))
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        cells = [f'{old[metric]:>9} -> {new[metric]:>9} {change(old[metric], new[metric])}' for metric in METRICS]
+        print(f'{key[0]:>24} {key[1]:>9} {key[2]:>30}  ' + '  '.join(cells))
+
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f'only in {"baseline" if key in baseline else "candidate"}: {" ".join(key)}')
+
+
+if __name__ == '__main__':
+    main()
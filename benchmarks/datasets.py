@@ -0,0 +1,101 @@
+"""Synthetic SpatiaLite databases for the benchmarks.
+
+The schema is the one scritps/init_db_spatial.sh creates, read from the script
+itself, followed by the app's migrations. Files are cached by size,
+distribution and seed, so later runs reuse them.
+"""
+
+import math
+import os
+import random
+import re
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+from app.config import Config
+from app.database.sqlite import DatabaseSqlite
+from app.repositories.location_repository import LocationRepository
+
+DISTRIBUTIONS = ('uniform', 'clustered')
+INIT_SCRIPT = Path(__file__).resolve().parent.parent / 'scritps' / 'init_db_spatial.sh'
+
+# Clustered datasets put points around this many "cities", with a spread of a few km to tens of km
+CLUSTER_COUNT = 64
+CLUSTER_SIGMA_DEG = (0.02, 0.3)
+
+
+def init_sql() -> str:
+    """The SQL of init_db_spatial.sh's heredoc, without the sqlite3 shell's .load line."""
+    script = INIT_SCRIPT.read_text(encoding='utf-8')
+    body = re.search(r'<<EOF\n(.*?)\nEOF', script, re.DOTALL).group(1)
+    return '\n'.join(line for line in body.splitlines() if not line.startswith('.'))
+
+
+def generate_points(size: int, distribution: str, seed: int) -> Iterator[Tuple[float, float]]:
+    """(lat, lon) pairs; uniform is uniform by area over the whole globe."""
+    rng = random.Random(seed)
+    if distribution == 'uniform':
+        for _ in range(size):
+            yield math.degrees(math.asin(rng.uniform(-1, 1))), rng.uniform(-180, 180)
+        return
+
+    centres = [
+        (math.degrees(math.asin(rng.uniform(-0.9, 0.9))), rng.uniform(-180, 180), rng.uniform(*CLUSTER_SIGMA_DEG))
+        for _ in range(CLUSTER_COUNT)
+    ]
+    for _ in range(size):
+        lat, lon, sigma = rng.choice(centres)
+        yield (
+            max(-90.0, min(90.0, rng.gauss(lat, sigma))),
+            (rng.gauss(lon, sigma) + 180) % 360 - 180,
+        )
+
+
+def dataset_rows(size: int, distribution: str, seed: int) -> Iterator[Dict]:
+    for i, (lat, lon) in enumerate(generate_points(size, distribution, seed)):
+        name = f'Bench {distribution} {seed} {i}'
+        yield {'id': dataset_id(distribution, seed, i), 'name': name, 'lat': lat, 'lon': lon}
+
+
+def dataset_id(distribution: str, seed: int, index: int) -> str:
+    return f'{distribution}-{seed}-{index:08d}'
+
+
+def dataset_path(directory: Path, size: int, distribution: str, seed: int) -> Path:
+    return directory / f'{distribution}-{size}-{seed}.db'
+
+
+def build_database(directory: Path, size: int, distribution: str, seed: int = 1, chunk_size: int = 50000) -> Path:
+    """Create (or reuse) a database with ``size`` points; returns its path."""
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f'Unknown distribution {distribution!r}, expected one of {", ".join(DISTRIBUTIONS)}')
+
+    path = dataset_path(directory, size, distribution, seed)
+    if path.exists():
+        return path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix('.partial')
+    if partial.exists():
+        os.remove(partial)
+
+    config = type('DatasetConfig', (Config,), {'DATABASE': str(partial)})()
+    db = DatabaseSqlite(config)
+    conn = db.connect()
+    try:
+        conn.executescript(init_sql())
+        conn.commit()
+    finally:
+        conn.close()
+
+    try:
+        LocationRepository(config, db).import_locations(
+            dataset_rows(size, distribution, seed), chunk_size, defer_index=True
+        )
+        with db.get_cursor() as (conn, cur):
+            cur.execute('ANALYZE')
+    finally:
+        db.close()
+
+    os.replace(partial, path)
+    return path
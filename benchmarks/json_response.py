@@ -0,0 +1,88 @@
+"""Compare the /nearby response paths: Pydantic models + stdlib json against rows + orjson.
+
+python -m benchmarks.json_response --rows 10000 --repeat 20
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from unittest.mock import Mock, patch
+
+import orjson
+
+from app.config import Config
+from app.registry import Registry
+from app.schemas.location_schema import LocationNearbyOut
+from app.services.location_service import LocationService
+from main import create_app
+
+
+def make_rows(count, seed=1):
+    rng = random.Random(seed)
+    rows = [
+        {
+            'id': f'{i:08x}-0000-4000-8000-000000000000',
+            'name': f'Place {i}',
+            'lon': rng.uniform(-46.8, -46.4),
+            'lat': rng.uniform(-23.7, -23.4),
+            'distance_km': rng.uniform(0, 50),
+        }
+        for i in range(count)
+    ]
+    rows.sort(key=lambda row: row['distance_km'])
+    return rows
+
+
+def model_stdlib(rows):
+    return json.dumps([LocationNearbyOut(**row).model_dump() for row in rows]) + '\n'
+
+
+def model_orjson(rows):
+    return orjson.dumps([LocationNearbyOut(**row).model_dump() for row in rows], option=orjson.OPT_APPEND_NEWLINE)
+
+
+def rows_orjson(rows):
+    return orjson.dumps(rows, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(samples), 3), 'min_ms': round(min(samples), 3)}
+
+
+def run(count, repeat):
+    rows = make_rows(count)
+    results = {fn.__name__: timed(lambda fn=fn: fn(rows), repeat) for fn in (model_stdlib, model_orjson, rows_orjson)}
+
+    # End to end through Flask, with the repository answering from memory
+    repo = Mock()
+    repo.get_nearby_locations.return_value = rows
+    service = LocationService(repo, Mock(), Config())
+    app = create_app(Registry())
+    path = '/api/v1/locations/nearby'
+    with patch.object(Registry, 'location', return_value=service), app.test_client() as client:
+        for mode in ('model', 'fast'):
+            with patch.object(Config, 'RESPONSE_MODE', mode):
+                results[f'http_{mode}'] = timed(lambda: client.get(f'{path}?lat=-23.55&lon=-46.63'), repeat)
+
+    return {'rows': count, 'repeat': repeat, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+    json.dump(run(args.rows, args.repeat), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Cost of recording one metric event: a histogram observation and a metered SQL statement.
+
+python -m benchmarks.metrics_overhead --events 200000 --threads 4
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+
+from app.database.sqlite import MeteredCursor
+from app.metrics import Metrics
+
+
+def per_event_ns(fn, events):
+    start = time.perf_counter()
+    fn(events)
+    return (time.perf_counter() - start) / events * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    histogram = Metrics().histogram('bench_seconds', 'Benchmark', ('family',))
+
+    def observe(events):
+        for _ in range(events):
+            histogram.observe(0.0003, 'select_locations')
+
+    print(f'histogram.observe, 1 thread: {per_event_ns(observe, args.events):8.0f} ns/event')
+
+    threads = [threading.Thread(target=observe, args=(args.events,)) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    print(f'histogram.observe, {args.threads} threads: {seconds / (args.events * args.threads) * 1e9:8.0f} ns/event')
+
+    conn = sqlite3.connect(':memory:')
+    plain, metered = conn.cursor(), MeteredCursor(conn.cursor())
+
+    def query(cursor):
+        def run(events):
+            for _ in range(events):
+                cursor.execute('SELECT 1 FROM sqlite_master WHERE name = ?', ('x',)).fetchone()
+
+        return run
+
+    baseline = per_event_ns(query(plain), args.events)
+    with_metrics = per_event_ns(query(metered), args.events)
+    print(
+        f'SELECT + fetchone: {baseline:8.0f} ns plain, {with_metrics:8.0f} ns metered '
+        f'({with_metrics - baseline:+.0f} ns/statement)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Local stand-in for Nominatim's /search, so create/update never leave the machine."""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def coordinates(query: str):
+    """Deterministic (lat, lon) for any query, spread over the globe."""
+    digest = hashlib.blake2b(query.encode('utf-8'), digest_size=8).digest()
+    lat = int.from_bytes(digest[:4], 'big') / 2**32 * 170 - 85
+    lon = int.from_bytes(digest[4:], 'big') / 2**32 * 360 - 180
+    return lat, lon
+
+
+class NominatimStub:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; without this, delayed ACKs add ~40 ms per lookup
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+                with stub._lock:
+                    stub.requests += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                lat, lon = coordinates(query)
+                body = json.dumps([{'lat': str(lat), 'lon': str(lon)}]).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/search'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
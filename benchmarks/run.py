@@ -0,0 +1,420 @@
+"""Latency and throughput of the HTTP API on synthetic datasets.
+
+    python -m benchmarks.run --sizes 10000 100000 --distributions uniform clustered \\
+        --transports client wsgi gunicorn --requests 500 --concurrency 8 --output results.json
+
+Each dataset gets its own app built with create_app(), pointed at the dataset
+and at a local Nominatim stub. Every scenario is timed per operation, and the
+results (p50/p95/p99 latency and throughput) are written as JSON. Compare two
+runs with ``python -m benchmarks.compare old.json new.json``.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple
+
+import requests
+from werkzeug.serving import make_server
+
+from app.config import Config
+from app.database.utils_sqlite import MAX_DISTANCE_KM
+from app.registry import Registry
+from benchmarks.datasets import DISTRIBUTIONS, build_database, dataset_id
+from benchmarks.nominatim_stub import NominatimStub
+from benchmarks.stats import summarize
+from main import create_app
+
+BASE = '/api/v1/locations'
+ROOT = Path(__file__).parent.parent
+NEARBY_RADII_KM = (1, 10, 50)
+NEAREST_K = 10
+BATCH_QUERIES = 20
+
+SCENARIOS = (
+    'create',
+    'get_by_id',
+    *(f'nearby_{radius}km' for radius in NEARBY_RADII_KM),
+    f'nearest_k{NEAREST_K}',
+    f'nearest_k{NEAREST_K}_repeated_radius',
+    f'nearby_batch_{BATCH_QUERIES}',
+    f'nearby_sequential_{BATCH_QUERIES}',
+    'update',
+    'delete',
+)
+
+
+class ClientTransport:
+    """In-process requests through Flask's test client, one client per thread."""
+
+    name = 'client'
+
+    def __init__(self, app, concurrency):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+    def close(self):
+        pass
+
+
+class WsgiTransport:
+    """Real HTTP requests to the app served by werkzeug's threaded WSGI server, as ``python main.py`` does."""
+
+    name = 'wsgi'
+
+    def __init__(self, app, concurrency):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def request(self, method, path, body=None):
+        response = self.session.request(method, self.url + path, json=body)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+    def close(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GunicornTransport(WsgiTransport):
+    """Real HTTP requests to ``gunicorn 'main:create_app()'`` (gunicorn.conf.py) run in a subprocess.
+
+    The server builds its own app from the environment, so the benchmark's
+    Config overrides are passed as environment variables; ``--set
+    SERVER_WORKERS=4`` sizes it.
+    """
+
+    name = 'gunicorn'
+    startup_timeout = 60
+
+    def __init__(self, app, concurrency):
+        config = app.extensions['registry'].config
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        env = {key: str(value) for key, value in vars(type(config)).items() if key.isupper()}
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'main:create_app()'],
+            cwd=ROOT,
+            env={**os.environ, **env, 'HOST': '127.0.0.1', 'PORT': str(port)},
+            stdout=subprocess.DEVNULL,
+        )
+        self.url = f'http://127.0.0.1:{port}'
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self._wait_until_ready()
+
+    def _wait_until_ready(self):
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {self.process.returncode}')
+            try:
+                if self.session.get(f'{self.url}/metrics', timeout=1).ok:
+                    return
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.1)
+        self.close()
+        raise RuntimeError(f'gunicorn did not answer within {self.startup_timeout}s')
+
+    def close(self):
+        self.session.close()
+        # SIGTERM is a graceful stop: workers drain their requests and close their pools
+        self.process.terminate()
+        self.process.wait(timeout=self.startup_timeout)
+
+
+TRANSPORTS = {transport.name: transport for transport in (ClientTransport, WsgiTransport, GunicornTransport)}
+
+
+def bench_config(database, nominatim_url, overrides):
+    attributes = {
+        'DATABASE': str(database),
+        'NOMINATIM_API': nominatim_url,
+        # The stub has no usage policy to respect
+        'NOMINATIM_RATE_LIMIT': 1e6,
+        'NOMINATIM_RATE_BURST': 1e6,
+        **overrides,
+    }
+    return type('BenchConfig', (Config,), attributes)()
+
+
+def parse_overrides(pairs):
+    """KEY=VALUE pairs cast to the type of the Config attribute they replace."""
+    overrides = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        if not key.isupper() or not hasattr(Config, key):
+            raise SystemExit(f'Unknown Config attribute {key!r}')
+        default = getattr(Config, key)
+        overrides[key] = type(default)(value) if isinstance(default, (int, float)) else value
+    return overrides
+
+
+class Dataset(NamedTuple):
+    path: Path
+    size: int
+    distribution: str
+    seed: int
+
+
+class Workload:
+    """Operations for every scenario; each operation is one timed unit."""
+
+    def __init__(self, transport, registry, dataset, count, rng):
+        self.transport = transport
+        self.rng = rng
+        self.run_id = f'{int(time.time() * 1000):x}'
+        self.created = []
+        self._created_lock = threading.Lock()
+        self._names = itertools.count()
+
+        repo = registry.location_repository()
+        self.ids = [dataset_id(dataset.distribution, dataset.seed, rng.randrange(dataset.size)) for _ in range(count)]
+        self.points = []
+        for location_id in rng.sample(self.ids, min(len(self.ids), 200)):
+            location = repo.get_location_by_id(location_id)
+            self.points.append((location['lat'], location['lon']))
+
+    def operations(self, scenario, count):
+        if scenario.startswith('nearby_') and scenario.endswith('km'):
+            radius = float(scenario[len('nearby_') : -len('km')])
+            return [partial(self.nearby, point, radius) for point in self.query_points(count)]
+        per_point = {
+            f'nearest_k{NEAREST_K}': self.nearest,
+            f'nearest_k{NEAREST_K}_repeated_radius': self.repeated_radius,
+        }
+        per_route = {
+            f'nearby_batch_{BATCH_QUERIES}': self.nearby_batch,
+            f'nearby_sequential_{BATCH_QUERIES}': self.nearby_sequential,
+        }
+        per_id = {
+            'get_by_id': (self.get, self.ids),
+            'update': (self.update, self.created),
+            'delete': (self.delete, self.created),
+        }
+
+        if scenario == 'create':
+            return [self.create] * count
+        if scenario in per_point:
+            return [partial(per_point[scenario], point) for point in self.query_points(count)]
+        if scenario in per_route:
+            return [partial(per_route[scenario], points) for points in self.route_points(count)]
+        if scenario in per_id:
+            operation, ids = per_id[scenario]
+            return [partial(operation, location_id) for location_id in ids[:count]]
+        raise ValueError(f'Unknown scenario {scenario!r}')
+
+    def call(self, method, path, body=None, expect=200):
+        status, payload = self.transport.request(method, path, body)
+        if status != expect:
+            raise RuntimeError(f'{method} {path} returned {status}: {payload}')
+        return payload
+
+    def create(self):
+        location = self.call('POST', f'{BASE}/', {'name': f'bench {self.run_id} {next(self._names)}'}, expect=201)
+        with self._created_lock:
+            self.created.append(location['id'])
+
+    def get(self, location_id):
+        return self.call('GET', f'{BASE}/{location_id}')
+
+    def update(self, location_id):
+        self.call('PUT', f'{BASE}/{location_id}', {'name': f'bench {self.run_id} {next(self._names)}'})
+
+    def delete(self, location_id):
+        self.call('DELETE', f'{BASE}/{location_id}', expect=204)
+        with self._created_lock:
+            self.created.remove(location_id)
+
+    def nearby(self, point, radius_km):
+        return self.call('GET', f'{BASE}/nearby?lat={point[0]}&lon={point[1]}&radius_km={radius_km}')
+
+    def nearest(self, point):
+        return self.call('GET', f'{BASE}/nearest?lat={point[0]}&lon={point[1]}&k={NEAREST_K}')
+
+    def nearby_sequential(self, points):
+        return [self.nearby(point, NEARBY_RADII_KM[0]) for point in points]
+
+    def nearby_batch(self, points):
+        queries = [{'lat': lat, 'lon': lon, 'radius_km': NEARBY_RADII_KM[0]} for lat, lon in points]
+        return self.call('POST', f'{BASE}/nearby/batch', {'queries': queries})
+
+    def repeated_radius(self, point):
+        """The client-side approach /nearest replaces: retry /nearby with a doubled radius until k rows."""
+        radius_km = 1.0
+        while True:
+            locations = self.nearby(point, radius_km)
+            if len(locations) >= NEAREST_K or radius_km >= MAX_DISTANCE_KM:
+                return locations[:NEAREST_K]
+            radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
+
+    def query_points(self, count):
+        # Near existing points, so clustered datasets are queried where the data is dense
+        points = []
+        for lat, lon in (self.rng.choice(self.points) for _ in range(count)):
+            query_lat = max(-90.0, min(90.0, lat + self.rng.uniform(-0.05, 0.05)))
+            points.append((query_lat, (lon + self.rng.uniform(-0.05, 0.05) + 180) % 360 - 180))
+        return points
+
+    def route_points(self, count):
+        """Groups of points about 1 km apart along a parallel, like a route looked up in one request."""
+        routes = []
+        for lat, lon in (self.rng.choice(self.points) for _ in range(count)):
+            route_lat = max(-80.0, min(80.0, lat))
+            step_deg = 0.009 / math.cos(math.radians(route_lat))
+            routes.append([(route_lat, (lon + step * step_deg + 180) % 360 - 180) for step in range(BATCH_QUERIES)])
+        return routes
+
+
+def measure(operations, concurrency):
+    samples = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(operation):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            samples.append(elapsed_ms)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, operations))
+    return summarize(samples, time.perf_counter() - start, errors)
+
+
+def run_dataset(args, dataset, transport_name, overrides, stub):
+    config = bench_config(dataset.path, stub.url, overrides)
+    registry = Registry(config)
+    app = create_app(registry)
+    registry.startup()
+    transport = TRANSPORTS[transport_name](app, args.concurrency)
+    results = []
+    try:
+        workload = Workload(transport, registry, dataset, args.requests, random.Random(args.seed))
+        for scenario in args.scenarios:
+            # Writes run one at a time: SQLite serializes them and the ids they use depend on order
+            concurrency = 1 if scenario in {'create', 'update', 'delete'} else args.concurrency
+            for operation in workload.operations(scenario, args.warmup):
+                operation()
+            # Deletes remove every location the run created, so the dataset is left as it was
+            count = len(workload.created) if scenario == 'delete' else args.requests
+            summary = measure(workload.operations(scenario, count), concurrency)
+            results.append({
+                'dataset': dataset.path.stem,
+                'size': dataset.size,
+                'distribution': dataset.distribution,
+                'transport': transport_name,
+                'scenario': scenario,
+                'concurrency': concurrency,
+                **summary,
+            })
+            print(
+                f'{dataset.path.stem:>24} {transport_name:>6} {scenario:>30}  p50 {summary["p50_ms"]:9.3f} ms  '
+                f'p95 {summary["p95_ms"]:9.3f} ms  p99 {summary["p99_ms"]:9.3f} ms  '
+                f'{summary["throughput_rps"]:9.1f} ops/s  errors {summary["errors"]}',
+                file=sys.stderr,
+            )
+    finally:
+        transport.close()
+        registry.shutdown()
+    return results
+
+
+def metadata(args, overrides):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'args': {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        'config': overrides,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000])
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument('--transports', nargs='+', choices=sorted(TRANSPORTS), default=['client', 'wsgi'])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='Operations per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed operations before each scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='Threads issuing read operations')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', type=Path, default=Path(__file__).parent / 'data')
+    parser.add_argument('--nominatim-delay', type=float, default=0.0, help='Seconds the stub waits per lookup')
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE')
+    parser.add_argument('--output', type=Path, help='JSON results file (default: stdout)')
+    args = parser.parse_args(argv)
+    overrides = parse_overrides(args.overrides)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    results = []
+    with NominatimStub(delay=args.nominatim_delay) as stub:
+        for size in args.sizes:
+            for distribution in args.distributions:
+                start = time.perf_counter()
+                database = build_database(args.data_dir, size, distribution, args.seed)
+                print(f'{database.name} ready in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+                dataset = Dataset(database, size, distribution, args.seed)
+                for transport_name in args.transports:
+                    results.extend(run_dataset(args, dataset, transport_name, overrides, stub))
+
+    report = {'meta': metadata(args, overrides), 'results': results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
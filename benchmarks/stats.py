@@ -0,0 +1,24 @@
+import math
+from typing import Dict, List
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples_ms: List[float], wall_seconds: float, errors: int = 0) -> Dict:
+    samples = sorted(samples_ms)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3) if samples else 0.0,
+        'max_ms': round(samples[-1], 3) if samples else 0.0,
+        'throughput_rps': round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0,
+    }
@@ -0,0 +1,85 @@
+import argparse
+import sys
+import time
+
+from app.registry import Registry
+from app.services.location_transfer import TransferStats
+
+
+def import_locations(args, registry):
+    location_service = registry.location()
+    with open(args.file, encoding='utf-8', newline='') as stream:
+        stats = location_service.import_locations(stream, args.format, args.chunk_size, defer_index=args.defer_index)
+    print(
+        f'Imported {stats["imported"]} rows ({stats["skipped"]} skipped, {stats["rejected"]} rejected) '
+        f'in {stats["seconds"]}s, {stats["rows_per_sec"]} rows/sec',
+        file=sys.stderr,
+    )
+
+
+def import_gazetteer(args, registry):
+    with open(args.file, encoding='utf-8', newline='') as stream:
+        stats = registry.gazetteer_repository().import_places(stream, args.format, args.chunk_size, args.replace)
+    print(
+        f'Imported {stats["imported"]} names ({stats["rejected"]} rejected) '
+        f'in {stats["seconds"]}s, {stats["rows_per_sec"]} rows/sec',
+        file=sys.stderr,
+    )
+
+
+def export_locations(args, registry):
+    location_service = registry.location()
+    stats = TransferStats()
+    start = time.perf_counter()
+    output = sys.stdout if args.file == '-' else open(args.file, 'w', encoding='utf-8', newline='')
+    try:
+        for chunk in location_service.export_locations(args.format, stats):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    seconds = time.perf_counter() - start
+    print(f'Exported {stats.rows} rows in {seconds:.3f}s, {stats.rows / seconds:.1f} rows/sec', file=sys.stderr)
+
+
+def main(argv=None):
+    registry = Registry()
+    config = registry.config
+    parser = argparse.ArgumentParser(description='Bulk import/export of locations and gazetteer import')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Load rows with id (optional), name, lat and lon')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    import_parser.add_argument('--chunk-size', type=int, default=config.IMPORT_CHUNK_SIZE)
+    import_parser.add_argument(
+        '--defer-index',
+        action='store_true',
+        help='Rebuild the spatial index at the end instead of on every row; only while the API is not serving',
+    )
+    import_parser.set_defaults(handler=import_locations)
+
+    export_parser = subparsers.add_parser('export', help='Write every location to a file ("-" for stdout)')
+    export_parser.add_argument('file')
+    export_parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    export_parser.set_defaults(handler=export_locations)
+
+    gazetteer_parser = subparsers.add_parser(
+        'gazetteer-import', help='Load an OSM place file (name, lat, lon, importance) into GAZETTEER_DATABASE'
+    )
+    gazetteer_parser.add_argument('file')
+    gazetteer_parser.add_argument('--format', choices=('tsv', 'csv'), default='tsv')
+    gazetteer_parser.add_argument('--chunk-size', type=int, default=config.IMPORT_CHUNK_SIZE)
+    gazetteer_parser.add_argument('--replace', action='store_true', help='Delete the places already imported first')
+    gazetteer_parser.set_defaults(handler=import_gazetteer)
+
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args, registry)
+    finally:
+        registry.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Production server settings, read by gunicorn from the working directory:
+
+    gunicorn 'main:create_app()'
+
+The app is built once in the master (preload_app), so the code, Flask-RESTX
+models and Swagger spec are imported before forking and shared copy-on-write.
+Connections are opened only after the fork: each worker runs registry.startup()
+before it accepts requests, and registry.shutdown() once it has drained them.
+
+NEARBY_ENGINE=memory answers /nearby from a snapshot that only sees the writes
+of its own process, so it refuses to start with more than one worker.
+"""
+
+from app.config import Config
+
+bind = f'{Config.HOST or "0.0.0.0"}:{Config.PORT or 5000}'
+workers = Config.SERVER_WORKERS
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+preload_app = True
+accesslog = None
+
+
+def on_starting(server):
+    # server.cfg also reflects command-line overrides such as --workers
+    if server.cfg.workers > 1 and Config.NEARBY_ENGINE == 'memory':
+        raise RuntimeError('NEARBY_ENGINE=memory requires a single worker (SERVER_WORKERS=1)')
+
+
+def post_worker_init(worker):
+    # The SQLite pool, the SpatiaLite extension and the nearby index are per process
+    worker.wsgi.extensions['registry'].startup()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker after its in-flight requests finished or graceful_timeout ran out
+    worker.wsgi.extensions['registry'].shutdown()
@@ -3,6 +3,10 @@ from flask_restx import Api
 
 from app.config import Config
 from app.controllers.location import location_ns
+from app.controllers.metrics import metrics_bp
+from app.controllers.profiling import profiling_bp
+from app.controllers.representations import output_json
+from app.registry import Registry
 
 api = Api(
     version='1.0',
@@ -11,17 +15,30 @@ api = Api(
     doc='/api/v1/docs',
     prefix='/api/v1',
 )
+api.representation('application/json')(output_json)
 
 
-def create_app():
+def create_app(registry=None):
     app = Flask(__name__)
     api.init_app(app)
 
     api.add_namespace(location_ns, '/locations')
+    app.register_blueprint(metrics_bp)
+
+    # Built once per app; opening connections is left to registry.startup(),
+    # which servers call in each worker process
+    registry = app.extensions['registry'] = registry or Registry()
+    if registry.config.PROFILE_TOKEN or registry.config.PROFILE_SAMPLE_RATE > 0:
+        app.register_blueprint(profiling_bp)
 
     return app
 
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
+    registry = app.extensions['registry']
+    registry.startup()
+    try:
+        app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
+    finally:
+        registry.shutdown()
@@ -1,10 +1,16 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock, patch
+
 import pytest
-from unittest.mock import patch, MagicMock, Mock
 
+from app.database.sqlite import DatabaseSqlite
 from app.external.nominatim_api import NominatimAPI
-from main import create_app
+from app.registry import Registry
 from app.repositories.location_repository import LocationRepository
 from app.services.location_service import LocationService
+from main import create_app
 
 
 @pytest.fixture
@@ -17,8 +23,7 @@ def client():
 @pytest.fixture
 def mock_service():
     mock = MagicMock()
-    with patch("app.controllers.location.Registry") as mock_registry:
-        mock_registry.return_value.location.return_value = mock
+    with patch.object(Registry, "location", return_value=mock):
         yield mock
 
 
@@ -35,11 +40,23 @@ def mock_nominatim():
 def nominatim_config():
     mock = MagicMock()
     mock.NOMINATIM_API = "https://nominatim.openstreetmap.org/search"
+    mock.NOMINATIM_CONNECT_TIMEOUT = 1
+    mock.NOMINATIM_READ_TIMEOUT = 1
+    mock.NOMINATIM_RETRIES = 2
+    mock.NOMINATIM_BACKOFF = 0.01
+    mock.NOMINATIM_POOL_SIZE = 2
     return mock
 
 @pytest.fixture
-def nominatim_service(nominatim_config):
-    return NominatimAPI(nominatim_config)
+def nominatim_service(nominatim_config, mock_session):
+    return NominatimAPI(nominatim_config, session=mock_session)
+
+
+@pytest.fixture
+def mock_session():
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    return session
 
 @pytest.fixture
 def config():
@@ -63,4 +80,73 @@ def mock_db():
 def repository(mock_db):
     config = MagicMock()
     db, _ = mock_db
-    return LocationRepository(config, db)
\ No newline at end of file
+    return LocationRepository(config, db)
+
+# SpatiaLite is not always loadable (e.g. CI images without mod_spatialite), so the
+# SQL tests run on plain SQLite with the same layout scritps/init_db_spatial.sh
+# creates: a locations table, a ROWID-keyed R*Tree and the triggers that keep it
+# in sync. Only the handful of geometry functions the repository uses are provided.
+def _point_in_polygon(geom, area):
+    # Even-odd rule over every ring, so holes and disjoint MultiPolygon parts work
+    x, y = (float(v) for v in geom.split())
+    geometry = json.loads(area)
+    polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+    inside = False
+    for ring in (ring for polygon in polygons for ring in polygon):
+        for (x1, y1, *_), (x2, y2, *_) in zip(ring, ring[1:]):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return int(inside)
+
+
+def _spatial_functions(conn):
+    conn.create_function("MakePoint", 3, lambda x, y, srid: f"{x!r} {y!r}", deterministic=True)
+    conn.create_function("X", 1, lambda geom: float(geom.split()[0]), deterministic=True)
+    conn.create_function("Y", 1, lambda geom: float(geom.split()[1]), deterministic=True)
+    conn.create_function("GeomFromGeoJSON", 1, lambda geojson: geojson, deterministic=True)
+    conn.create_function("SetSRID", 2, lambda geom, srid: geom, deterministic=True)
+    conn.create_function("ST_Within", 2, _point_in_polygon, deterministic=True)
+
+
+@pytest.fixture
+def spatial_db(tmp_path):
+    config = SimpleNamespace(
+        DATABASE=str(tmp_path / "locations.db"),
+        DB_POOL_SIZE=2,
+        DB_POOL_TIMEOUT=1,
+        DB_POOL_HEALTH_CHECK_INTERVAL=30,
+        SLOW_QUERY_MS=0,
+    )
+
+    def connect(self):
+        conn = sqlite3.connect(self.config.DATABASE, check_same_thread=False)
+        _spatial_functions(conn)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with patch.object(DatabaseSqlite, "connect", connect):
+        db = DatabaseSqlite(config)
+        conn = db.connect()
+        conn.executescript("""
+            CREATE TABLE locations (id TEXT PRIMARY KEY, name TEXT NOT NULL, geom BLOB);
+            CREATE VIRTUAL TABLE idx_locations_geom USING rtree(pkid, xmin, xmax, ymin, ymax);
+            CREATE TRIGGER gii_locations_geom AFTER INSERT ON locations BEGIN
+                INSERT INTO idx_locations_geom VALUES (NEW.ROWID, X(NEW.geom), X(NEW.geom), Y(NEW.geom), Y(NEW.geom));
+            END;
+            CREATE TRIGGER giu_locations_geom AFTER UPDATE OF geom ON locations BEGIN
+                UPDATE idx_locations_geom
+                SET xmin = X(NEW.geom), xmax = X(NEW.geom), ymin = Y(NEW.geom), ymax = Y(NEW.geom)
+                WHERE pkid = NEW.ROWID;
+            END;
+            CREATE TRIGGER gid_locations_geom AFTER DELETE ON locations BEGIN
+                DELETE FROM idx_locations_geom WHERE pkid = OLD.ROWID;
+            END;
+        """)
+        conn.close()
+        yield db
+    DatabaseSqlite.close_pools()
+
+
+@pytest.fixture
+def spatial_repository(spatial_db):
+    return LocationRepository(spatial_db.config, spatial_db)
@@ -1,6 +1,11 @@
 import http
-from unittest.mock import MagicMock
-from app.exceptions import ConflictError, NotFoundError
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from app.config import Config
+from app.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.registry import Registry
+from app.services.location_service import LocationService
 
 
 BASE_URL = "/api/v1/locations/"
@@ -97,3 +102,353 @@ def test_get_nearby_locations_success(client, mock_service):
     assert response.status_code == http.HTTPStatus.OK
     assert isinstance(response.json, list)
     assert len(response.json) == 2
+
+
+def test_get_nearby_locations_page(client, mock_service):
+    mock_service.get_nearby_page.return_value.model_dump.return_value = {
+        "items": [{"id": "1", "name": "Place A", "lat": 10.0, "lon": 20.0, "distance_km": 1.2}],
+        "next_cursor": "abc",
+    }
+
+    response = client.get(f"{BASE_URL}nearby?lat=10.0&lon=20.0&radius_km=5.0&limit=1")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json["next_cursor"] == "abc"
+    query = mock_service.get_nearby_page.call_args.args[0]
+    assert (query.lat, query.lon, query.radius_km, query.limit, query.cursor) == (10.0, 20.0, 5.0, 1, None)
+    mock_service.get_nearby_locations.assert_not_called()
+
+
+def test_get_nearby_locations_invalid_cursor(client, mock_service):
+    mock_service.get_nearby_page.side_effect = BadRequestError("Invalid cursor")
+
+    response = client.get(f"{BASE_URL}nearby?lat=10.0&lon=20.0&cursor=bad")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert response.json["details"] == "Invalid cursor"
+
+
+def test_get_nearby_locations_stream(client, mock_service, monkeypatch):
+    monkeypatch.setattr(Config, "NEARBY_STREAM_BATCH_SIZE", 2)
+    rows = [{"id": str(i), "name": f"Place {i}", "lat": 10.0, "lon": 20.0, "distance_km": i / 10} for i in range(5)]
+    mock_service.iter_nearby_rows.return_value = iter(rows)
+
+    response = client.get(f"{BASE_URL}nearby?lat=10.0&lon=20.0&stream=true")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.is_streamed
+    assert response.content_type == "application/json"
+    assert response.json == rows
+    mock_service.iter_nearby_rows.assert_called_once_with(10.0, 20.0, 10)
+
+
+def test_get_nearby_locations_stream_rejects_limit(client, mock_service):
+    response = client.get(f"{BASE_URL}nearby?lat=10.0&lon=20.0&stream=true&limit=5")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.iter_nearby_rows.assert_not_called()
+
+
+@pytest.mark.parametrize("path", ["nearby?lat=10.0&lon=20.0&radius_km=5.0", "nearest?lat=10.0&lon=20.0&k=2"])
+def test_fast_response_mode_returns_the_same_json(client, monkeypatch, path):
+    rows = [
+        {"id": "1", "name": "Sé", "lon": 20.0, "lat": 10.0, "distance_km": 1e-05},
+        {"id": "2", "name": "Place B", "lon": 20.1, "lat": 10.1, "distance_km": 3.4},
+    ]
+    repo = Mock()
+    repo.get_nearby_locations.return_value = rows
+    repo.get_nearest_locations.return_value = rows
+    service = LocationService(repo, Mock(), Config())
+
+    with patch.object(Registry, "location", return_value=service):
+        monkeypatch.setattr(Config, "RESPONSE_MODE", "model")
+        model = client.get(f"{BASE_URL}{path}")
+        monkeypatch.setattr(Config, "RESPONSE_MODE", "fast")
+        fast = client.get(f"{BASE_URL}{path}")
+
+    assert fast.status_code == model.status_code == http.HTTPStatus.OK
+    assert fast.content_type == model.content_type == "application/json"
+    assert fast.json == model.json
+
+
+def test_batch_create_locations_success(client, mock_service):
+    mock_service.create_locations.return_value = [
+        MagicMock(model_dump=MagicMock(return_value={
+            "name": "Av. Paulista", "status": 201, "location": make_location_response(), "error": None
+        })),
+        MagicMock(model_dump=MagicMock(return_value={
+            "name": "Duplicate", "status": 409, "location": None, "error": "Location already exists"
+        })),
+    ]
+
+    response = client.post(f"{BASE_URL}batch", json={"names": ["Av. Paulista", "Duplicate"]})
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert [item["status"] for item in response.json] == [201, 409]
+    mock_service.create_locations.assert_called_once_with(["Av. Paulista", "Duplicate"])
+
+
+def test_batch_create_locations_invalid_payload(client, mock_service):
+    response = client.post(f"{BASE_URL}batch", json={"names": []})
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.create_locations.assert_not_called()
+
+
+def test_batch_create_locations_too_many(client, mock_service):
+    mock_service.create_locations.side_effect = BadRequestError("At most 1 names per batch")
+
+    response = client.post(f"{BASE_URL}batch", json={"names": ["A", "B"]})
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_import_locations_success(client, mock_service):
+    mock_service.import_locations.return_value = {
+        "imported": 2, "skipped": 0, "rejected": 0, "seconds": 0.01, "rows_per_sec": 200.0
+    }
+
+    response = client.post(f"{BASE_URL}import?format=ndjson&chunk_size=10", data=b'{"name": "A"}\n')
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json["imported"] == 2
+    _, fmt, chunk_size = mock_service.import_locations.call_args.args
+    assert (fmt, chunk_size) == ("ndjson", 10)
+
+
+@pytest.mark.parametrize("chunk_size", ["0", "-1", "many"])
+def test_import_locations_invalid_chunk_size(client, mock_service, chunk_size):
+    response = client.post(f"{BASE_URL}import?chunk_size={chunk_size}", data=b'{"name": "A"}\n')
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.import_locations.assert_not_called()
+
+
+def test_import_locations_unsupported_format(client, mock_service):
+    mock_service.import_locations.side_effect = BadRequestError("Unsupported format")
+
+    response = client.post(f"{BASE_URL}import?format=xml", data=b"")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_export_locations_streams_rows(client, mock_service):
+    mock_service.export_locations.return_value = iter(["id,name,lat,lon\r\n", "1,A,1.0,2.0\r\n"])
+
+    response = client.get(f"{BASE_URL}export?format=csv")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.mimetype == "text/csv"
+    assert response.data == b"id,name,lat,lon\r\n1,A,1.0,2.0\r\n"
+
+
+def test_list_locations_success(client, mock_service):
+    mock_service.list_locations.return_value.model_dump.return_value = {
+        "items": [make_location_response()], "next_cursor": "abc"
+    }
+
+    response = client.get(f"{BASE_URL}?limit=1&cursor=xyz")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json["next_cursor"] == "abc"
+    mock_service.list_locations.assert_called_once_with("xyz", 1)
+
+
+def test_list_locations_invalid_limit(client, mock_service):
+    response = client.get(f"{BASE_URL}?limit=0")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.list_locations.assert_not_called()
+
+
+def test_get_nearest_locations_success(client, mock_service):
+    mock_service.get_nearest_locations.return_value = [
+        MagicMock(model_dump=MagicMock(return_value={
+            "id": "1", "name": "Place A", "lat": 10.0, "lon": 20.0, "distance_km": 1.2
+        })),
+    ]
+
+    response = client.get(f"{BASE_URL}nearest?lat=10.0&lon=20.0&k=1")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json[0]["distance_km"] == 1.2
+    mock_service.get_nearest_locations.assert_called_once_with(10.0, 20.0, 1)
+
+
+def test_get_nearest_locations_invalid_k(client, mock_service):
+    response = client.get(f"{BASE_URL}nearest?lat=10.0&lon=20.0&k=0")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.get_nearest_locations.assert_not_called()
+
+
+def test_post_nearby_batch_success(client, mock_service):
+    mock_service.get_nearby_locations_batch.return_value = [
+        MagicMock(model_dump=MagicMock(return_value={
+            "lat": 10.0, "lon": 20.0, "radius_km": 5.0, "locations": []
+        })),
+    ]
+
+    response = client.post(f"{BASE_URL}nearby/batch", json={"queries": [{"lat": 10.0, "lon": 20.0, "radius_km": 5}]})
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json == [{"lat": 10.0, "lon": 20.0, "radius_km": 5.0, "locations": []}]
+    queries = mock_service.get_nearby_locations_batch.call_args.args[0]
+    assert [(q.lat, q.lon, q.radius_km) for q in queries] == [(10.0, 20.0, 5.0)]
+
+
+def test_post_nearby_batch_invalid_query(client, mock_service):
+    response = client.post(f"{BASE_URL}nearby/batch", json={"queries": [{"lat": 10.0, "lon": 200.0}]})
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert response.json["details"][0]["loc"] == ["queries", 0, "lon"]
+    mock_service.get_nearby_locations_batch.assert_not_called()
+
+
+def test_post_nearby_batch_too_many_queries(client, mock_service):
+    mock_service.get_nearby_locations_batch.side_effect = BadRequestError("At most 1 queries per batch")
+
+    response = client.post(f"{BASE_URL}nearby/batch", json={"queries": [{"lat": 1, "lon": 1}, {"lat": 2, "lon": 2}]})
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_get_within_bbox_success(client, mock_service):
+    mock_service.get_locations_within_box.return_value.model_dump.return_value = {"items": [], "next_cursor": None}
+
+    response = client.get(f"{BASE_URL}within?bbox=-46.8,-23.7,-46.4,-23.4&limit=20")
+
+    assert response.status_code == http.HTTPStatus.OK
+    query = mock_service.get_locations_within_box.call_args.args[0]
+    assert query.bbox == (-46.8, -23.7, -46.4, -23.4)
+    assert query.limit == 20
+
+
+@pytest.mark.parametrize("bbox", ["1,2,3", "3,0,1,1", "0,0,1,a", "0,-91,1,1"])
+def test_get_within_invalid_bbox(client, mock_service, bbox):
+    response = client.get(f"{BASE_URL}within?bbox={bbox}")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.get_locations_within_box.assert_not_called()
+
+
+def test_post_within_polygon_success(client, mock_service):
+    mock_service.get_locations_within_polygon.return_value.model_dump.return_value = {
+        "items": [{"id": "1", "name": "A", "lat": 0.5, "lon": 0.5}],
+        "next_cursor": "abc",
+    }
+    geometry = {"type": "MultiPolygon", "coordinates": [[[[0, 0], [1, 0], [1, 1], [0, 0]]]]}
+
+    response = client.post(f"{BASE_URL}within", json={"geometry": geometry, "limit": 1})
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json["next_cursor"] == "abc"
+    query = mock_service.get_locations_within_polygon.call_args.args[0]
+    assert query.bbox == (0.0, 0.0, 1.0, 1.0)
+
+
+@pytest.mark.parametrize(
+    "geometry",
+    [
+        {"type": "Point", "coordinates": [0, 0]},
+        {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1]]]},
+        {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [0, 0]]]},
+        {"type": "Polygon", "coordinates": [[[0, 0], [200, 0], [1, 1], [0, 0]]]},
+    ],
+)
+def test_post_within_invalid_polygon(client, mock_service, geometry):
+    response = client.post(f"{BASE_URL}within", json={"geometry": geometry})
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.get_locations_within_polygon.assert_not_called()
+
+
+def test_get_clusters_success(client, mock_service):
+    mock_service.get_clusters.return_value.model_dump.return_value = {
+        "level": 8,
+        "clusters": [{"cell": 1, "count": 3, "lat": 1.0, "lon": 2.0}],
+    }
+
+    response = client.get(f"{BASE_URL}clusters?bbox=-47,-24,-46,-23&zoom=5")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json["clusters"][0]["count"] == 3
+    query = mock_service.get_clusters.call_args.args[0]
+    assert (query.bbox, query.zoom) == ((-47.0, -24.0, -46.0, -23.0), 5)
+
+
+@pytest.mark.parametrize("params", ["bbox=-47,-24,-46,-23", "bbox=-47,-24,-46,-23&zoom=23", "zoom=5"])
+def test_get_clusters_invalid_fields(client, mock_service, params):
+    response = client.get(f"{BASE_URL}clusters?{params}")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    mock_service.get_clusters.assert_not_called()
+
+
+@pytest.fixture
+def mock_jobs():
+    mock = MagicMock()
+    with patch.object(Config, "WRITE_MODE", "async"), patch.object(Registry, "geocode_jobs", return_value=mock):
+        yield mock
+
+
+def make_job_response(status="pending", **fields):
+    return {"id": "job-1", "operation": "create", "status": status, "name": "Av. Paulista", **fields}
+
+
+def test_create_location_async_returns_job(client, mock_service, mock_jobs):
+    mock_jobs.submit_create.return_value.id = "job-1"
+    mock_jobs.submit_create.return_value.model_dump.return_value = make_job_response()
+
+    response = client.post(BASE_URL, json={"name": "Av. Paulista"})
+
+    assert response.status_code == http.HTTPStatus.ACCEPTED
+    assert response.json["status"] == "pending"
+    assert response.headers["Location"].endswith(f"{BASE_URL}jobs/job-1")
+    mock_jobs.submit_create.assert_called_once_with("Av. Paulista")
+    mock_service.create_location.assert_not_called()
+
+
+def test_create_location_async_conflict_is_immediate(client, mock_service, mock_jobs):
+    mock_jobs.submit_create.side_effect = ConflictError()
+
+    response = client.post(BASE_URL, json={"name": "Duplicate Name"})
+
+    assert response.status_code == http.HTTPStatus.CONFLICT
+
+
+def test_update_location_async_unknown_id(client, mock_service, mock_jobs):
+    mock_jobs.submit_update.side_effect = NotFoundError()
+
+    response = client.put(f"{BASE_URL}999", json={"name": "Updated Name"})
+
+    assert response.status_code == http.HTTPStatus.NOT_FOUND
+
+
+def test_update_location_async_returns_job(client, mock_service, mock_jobs):
+    mock_jobs.submit_update.return_value.id = "job-2"
+    mock_jobs.submit_update.return_value.model_dump.return_value = make_job_response(operation="update")
+
+    response = client.put(f"{BASE_URL}123", json={"name": "Updated Name"})
+
+    assert response.status_code == http.HTTPStatus.ACCEPTED
+    mock_jobs.submit_update.assert_called_once_with("123", "Updated Name")
+
+
+def test_get_job(client, mock_service, mock_jobs):
+    mock_jobs.get_job.return_value.model_dump.return_value = make_job_response(
+        status="failed", error="Failed to search for name", error_status=422
+    )
+
+    response = client.get(f"{BASE_URL}jobs/job-1")
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json["error_status"] == 422
+
+
+def test_get_job_not_found(client, mock_service, mock_jobs):
+    mock_jobs.get_job.side_effect = NotFoundError()
+
+    response = client.get(f"{BASE_URL}jobs/unknown")
+
+    assert response.status_code == http.HTTPStatus.NOT_FOUND
@@ -0,0 +1,22 @@
+from unittest.mock import patch
+
+from app.registry import Registry
+from main import create_app
+
+
+def test_metrics_endpoint_reports_requests_by_route(mock_service):
+    mock_service.get_location_by_id.return_value = None
+    stats = {"db_pool": {"open": 2, "in_use": 0}, "nearby_cache": {"hit_ratio": 0.25}}
+    app = create_app()
+
+    with app.test_client() as client, patch.object(Registry, "stats", return_value=stats):
+        client.get("/api/v1/locations/0e9a6b0e-5d7c-4bde-9f6a-5e0f6a4c2b11")
+        response = client.get("/metrics")
+
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    series = 'method="GET",endpoint="/api/v1/locations/<string:id>",status="404"'
+    assert f"http_request_duration_seconds_count{{{series}}}" in text
+    assert "db_pool_open 2\n" in text
+    assert "nearby_cache_hit_ratio 0.25\n" in text
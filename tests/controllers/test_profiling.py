@@ -0,0 +1,64 @@
+import pytest
+
+from app.config import Config
+from app.registry import Registry
+from main import create_app
+
+LOCATION_ID = "0e9a6b0e-5d7c-4bde-9f6a-5e0f6a4c2b11"
+
+
+def make_client(**settings):
+    class ProfilingConfig(Config):
+        PROFILE_TOKEN = ""
+        PROFILE_SAMPLE_RATE = 0.0
+
+    for name, value in settings.items():
+        setattr(ProfilingConfig, name, value)
+    return create_app(Registry(ProfilingConfig())).test_client()
+
+
+@pytest.fixture
+def client(mock_service):
+    mock_service.get_location_by_id.return_value = {"id": LOCATION_ID, "name": "A", "lat": 1.0, "lon": 2.0}
+    return make_client(PROFILE_TOKEN="secret")
+
+
+def test_token_header_profiles_the_request(client):
+    response = client.get(f"/api/v1/locations/{LOCATION_ID}", headers={"X-Profile-Token": "secret"})
+    profile_id = response.headers["X-Profile-Id"]
+
+    listing = client.get("/debug/profiles", headers={"X-Profile-Token": "secret"})
+    report = client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile-Token": "secret"})
+
+    assert [summary["id"] for summary in listing.get_json()] == [profile_id]
+    assert report.get_json()["path"] == f"/api/v1/locations/{LOCATION_ID}"
+    assert report.get_json()["reason"] == "token"
+    assert report.get_json()["functions"]
+
+
+def test_requests_without_the_token_are_not_profiled(client):
+    response = client.get(f"/api/v1/locations/{LOCATION_ID}", headers={"X-Profile-Token": "wrong"})
+
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/debug/profiles").status_code == 403
+    assert client.get("/debug/profiles/unknown", headers={"X-Profile-Token": "secret"}).status_code == 404
+
+
+def test_sample_rate_profiles_without_a_token(mock_service):
+    mock_service.get_location_by_id.return_value = None
+    client = make_client(PROFILE_SAMPLE_RATE=1.0)
+
+    response = client.get(f"/api/v1/locations/{LOCATION_ID}")
+
+    assert "X-Profile-Id" in response.headers
+    assert client.get("/debug/profiles").status_code == 403
+
+
+def test_profiling_off_registers_nothing(mock_service):
+    mock_service.get_location_by_id.return_value = None
+    client = make_client()
+
+    response = client.get(f"/api/v1/locations/{LOCATION_ID}", headers={"X-Profile-Token": ""})
+
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/debug/profiles").status_code == 404
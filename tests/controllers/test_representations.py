@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from app.controllers.representations import iter_json_array, output_json
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [{"id": "1", "name": "São Paulo – Sé", "lat": -23.55, "lon": -46.63, "distance_km": 1e-05}],
+        {"error": "Invalid fields", "details": [{"loc": ["lat"], "input": "abc", "ctx": {"ge": -90}}]},
+        {"level": 4, "clusters": [{"cell": 3, "count": 2, "lat": 1e16, "lon": -0.0}]},
+        {1: "non-str key", "bbox": (1.0, 2.0, 3.0, 4.0), "next_cursor": None, "ok": True},
+        [],
+    ],
+)
+def test_output_json_matches_the_stdlib_encoder(app, data):
+    with app.app_context():
+        response = output_json(data, 200)
+
+    assert json.loads(response.get_data()) == json.loads(json.dumps(data))
+    assert response.get_data().endswith(b"\n")
+
+
+def test_output_json_encodes_numpy_scalars(app):
+    with app.app_context():
+        response = output_json({"lat": np.float64(1.5)}, 200)
+
+    assert json.loads(response.get_data()) == {"lat": 1.5}
+
+
+def test_output_json_indents_in_debug(app):
+    app.debug = True
+    with app.app_context():
+        response = output_json({"id": "1"}, 201, headers={"X-Test": "1"})
+
+    assert response.status_code == 201
+    assert response.headers["X-Test"] == "1"
+    assert response.get_data() == b'{\n  "id": "1"\n}\n'
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 4, 7])
+def test_iter_json_array_yields_one_chunk_per_batch(count):
+    rows = [{"id": str(i), "distance_km": i / 3} for i in range(count)]
+
+    chunks = list(iter_json_array(iter(rows), rows_per_chunk=3))
+
+    assert json.loads(b"".join(chunks)) == rows
+    assert len(chunks) == 2 + -(-count // 3)
@@ -0,0 +1,61 @@
+import sqlite3
+
+from app.database.migrations import MIGRATIONS, migrate
+from app.database.utils_sqlite import CLUSTER_LEVELS, grid_cells, precompute_coordinates
+
+
+def test_migrations_backfill_precomputed_coordinates(spatial_db):
+    conn = spatial_db.connect()
+    conn.execute("INSERT INTO locations (id, name, geom) VALUES ('1', 'A', MakePoint(-46.63, -23.55, 4326))")
+    conn.commit()
+
+    migrate(conn)
+
+    row = conn.execute("SELECT lat_rad, lon_rad, cos_lat FROM locations WHERE id = '1'").fetchone()
+    assert tuple(row) == precompute_coordinates(-23.55, -46.63)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_migrations_backfill_cluster_cells(spatial_db):
+    conn = spatial_db.connect()
+    conn.execute("INSERT INTO locations (id, name, geom) VALUES ('1', 'A', MakePoint(-46.63, -23.55, 4326))")
+    conn.commit()
+
+    migrate(conn)
+
+    columns = ", ".join(f"cell_{level}" for level in CLUSTER_LEVELS)
+    row = conn.execute(f"SELECT {columns} FROM locations WHERE id = '1'").fetchone()
+    assert tuple(row) == grid_cells(-23.55, -46.63)
+
+
+def test_migrate_is_idempotent(spatial_db):
+    conn = spatial_db.connect()
+
+    migrate(conn)
+    migrate(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_migrate_skips_uninitialized_database(tmp_path):
+    conn = sqlite3.connect(tmp_path / "empty.db")
+
+    migrate(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+
+
+def test_migrations_backfill_normalized_name_keeping_the_oldest_duplicate(spatial_db):
+    conn = spatial_db.connect()
+    conn.executemany(
+        "INSERT INTO locations (id, name, geom) VALUES (?, ?, MakePoint(0, 0, 4326))",
+        [("1", "Av  Paulista"), ("2", "av paulista"), ("3", "Sé")],
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute("SELECT id, name_normalized FROM locations ORDER BY id").fetchall()
+    assert [tuple(row) for row in rows] == [("1", "av paulista"), ("2", None), ("3", "sé")]
+    index = conn.execute("PRAGMA index_info('idx_locations_name_normalized')").fetchall()
+    assert [row[2] for row in index] == ["name_normalized"]
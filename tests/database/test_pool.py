@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app.database.pool import ConnectionPool, PoolTimeoutError
+
+
+def make_pool(size=2, timeout=0.05, health_check_interval=30):
+    return ConnectionPool(
+        lambda: sqlite3.connect(':memory:', check_same_thread=False),
+        size=size,
+        timeout=timeout,
+        health_check_interval=health_check_interval,
+    )
+
+
+def test_connection_is_reused():
+    pool = make_pool()
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert pool.stats()['created'] == 1
+
+
+def test_pool_never_exceeds_size():
+    pool = make_pool(size=2)
+    conns = [pool.acquire(), pool.acquire()]
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+
+    stats = pool.stats()
+    assert stats['open'] == 2
+    assert stats['timeouts'] == 1
+    for conn in conns:
+        pool.release(conn)
+
+
+def test_waiter_gets_released_connection():
+    pool = make_pool(size=1, timeout=2)
+    conn = pool.acquire()
+    result = {}
+
+    def worker():
+        result['conn'] = pool.acquire()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    pool.release(conn)
+    thread.join()
+
+    assert result['conn'] is conn
+    assert pool.stats()['waits'] == 1
+
+
+def test_unhealthy_connection_is_replaced():
+    pool = make_pool(size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.close()
+            raise RuntimeError('boom')
+
+    with pool.connection() as replacement:
+        assert replacement.execute('SELECT 1').fetchone() == (1,)
+
+    stats = pool.stats()
+    assert replacement is not conn
+    assert stats['health_check_failures'] == 1
+    assert stats['discarded'] == 1
+    assert stats['open'] == 1
+
+
+def test_idle_connection_is_checked_before_reuse():
+    pool = make_pool(size=1, health_check_interval=0)
+    conn = pool.acquire()
+    conn.close()
+    pool.release(conn)
+
+    with pool.connection() as replacement:
+        assert replacement is not conn
+
+
+def test_warm_up_opens_all_connections():
+    pool = make_pool(size=3)
+
+    pool.warm_up()
+
+    assert pool.stats()['idle'] == 3
+
+
+def test_closed_pool_rejects_acquire():
+    pool = make_pool()
+    pool.close()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.database.sqlite import DatabaseSqlite
+from app.metrics import DB_ERRORS, DB_SLOW_STATEMENTS, DB_STATEMENT_SECONDS
+from app.profiling import Profile
+
+
+@pytest.fixture
+def db():
+    config = SimpleNamespace(
+        DATABASE='test-pool.db',
+        DB_POOL_SIZE=2,
+        DB_POOL_TIMEOUT=0.05,
+        DB_POOL_HEALTH_CHECK_INTERVAL=30,
+        SLOW_QUERY_MS=0,
+    )
+    with patch.object(DatabaseSqlite, 'connect', lambda self: sqlite3.connect(':memory:', check_same_thread=False)):
+        yield DatabaseSqlite(config)
+    DatabaseSqlite.close_pools()
+
+
+def test_get_cursor_reuses_pooled_connection(db):
+    with db.get_cursor() as (first, _):
+        pass
+    with db.get_cursor() as (second, _):
+        pass
+
+    assert first is second
+    assert db.pool_stats()['created'] == 1
+
+
+def test_pool_is_shared_between_instances(db):
+    other = DatabaseSqlite(db.config)
+
+    assert other.pool is db.pool
+
+
+def test_forked_child_opens_its_own_pool(db):
+    parent_pool = db.pool
+
+    pid = os.fork()
+    if pid == 0:
+        # The inherited pool is neither used nor closed; the parent still owns its connections
+        os._exit(0 if db.pool is not parent_pool and db.pool_stats()['created'] == 1 else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert db.pool is parent_pool
+
+
+def test_get_cursor_rolls_back_on_error(db):
+    with db.get_cursor() as (conn, cur):
+        cur.execute('CREATE TABLE t (x INTEGER)')
+
+    with pytest.raises(sqlite3.IntegrityError), db.get_cursor() as (conn, cur):
+        cur.execute('INSERT INTO t VALUES (1)')
+        raise sqlite3.IntegrityError()
+
+    with db.get_cursor() as (conn, cur):
+        assert cur.execute('SELECT COUNT(*) FROM t').fetchone() == (0,)
+
+
+def test_get_cursor_times_statements_by_family(db):
+    before = DB_STATEMENT_SECONDS.count('select_sqlite_master')
+
+    with db.get_cursor() as (conn, cur):
+        cur.execute('SELECT name FROM sqlite_master')
+        cur.fetchall()
+        cur.execute('SELECT type FROM sqlite_master').fetchone()
+
+    assert DB_STATEMENT_SECONDS.count('select_sqlite_master') == before + 2
+
+
+def test_get_cursor_counts_failed_statements(db):
+    before = DB_ERRORS.value('select_missing')
+
+    with pytest.raises(sqlite3.OperationalError), db.get_cursor() as (conn, cur):
+        cur.execute('SELECT * FROM missing')
+
+    assert DB_ERRORS.value('select_missing') == before + 1
+
+
+def test_slow_statements_are_logged_with_their_query_plan(db, caplog):
+    db.slow_seconds = 0.0
+    with db.get_cursor() as (conn, cur):
+        cur.execute('CREATE TABLE t (x INTEGER PRIMARY KEY)')
+        cur.execute('SELECT x FROM t WHERE x = ?', (1,)).fetchone()
+
+    messages = [record.getMessage() for record in caplog.records if 'Slow SQL statement' in record.getMessage()]
+    assert 'SEARCH t USING INTEGER PRIMARY KEY (rowid=?)' in messages[-1]
+    assert DB_SLOW_STATEMENTS.value('select_t') >= 1
+
+
+def test_profiled_cursor_traces_statements(db):
+    profile = Profile('GET', '/', 'token').start()
+    with db.get_cursor() as (conn, cur):
+        cur.execute('SELECT ?', (42,)).fetchone()
+    report = profile.finish(200)
+    with db.get_cursor() as (conn, cur):
+        cur.execute('SELECT 1')
+
+    assert [(entry['sql'], entry['statement']) for entry in report['statements']] == [('SELECT 42', 'select')]
+    assert report['statements'][0]['ms'] >= 0
@@ -0,0 +1,31 @@
+import pytest
+
+from app.database.utils_sqlite import CLUSTER_LEVELS, grid_cell, grid_cell_count, grid_cells, grid_position
+
+
+@pytest.mark.parametrize(
+    ("lat", "lon", "expected"),
+    [(-90.0, -180.0, (0, 0)), (90.0, 180.0, (7, 15)), (0.0, 0.0, (4, 8)), (-0.1, -0.1, (3, 7))],
+)
+def test_grid_position_covers_the_whole_map(lat, lon, expected):
+    assert grid_position(lat, lon, 4) == expected
+
+
+def test_grid_cell_is_row_major():
+    assert grid_cell(0.0, 0.0, 4) == (4 << 4) | 8
+    assert grid_cell(0.0, 0.0, 4) + 1 == grid_cell(0.0, 22.5, 4)
+
+
+def test_grid_cells_nest_across_levels():
+    cells = grid_cells(-23.55, -46.63)
+
+    assert len(cells) == len(CLUSTER_LEVELS)
+    for (coarse, coarse_cell), (fine, fine_cell) in zip(zip(CLUSTER_LEVELS, cells), zip(CLUSTER_LEVELS[1:], cells[1:])):
+        shift = fine - coarse
+        row, col = fine_cell >> fine, fine_cell & ((1 << fine) - 1)
+        assert ((row >> shift) << coarse) | (col >> shift) == coarse_cell
+
+
+def test_grid_cell_count():
+    assert grid_cell_count((-180.0, -90.0, 180.0, 90.0), 4) == 128
+    assert grid_cell_count((0.0, 0.0, 1.0, 1.0), 4) == 1
@@ -0,0 +1,37 @@
+from unittest.mock import Mock
+
+import pytest
+
+from app.exceptions import UnprocessableEntityError
+from app.external.gazetteer import GazetteerGeocoder
+
+
+def test_hit_does_not_call_the_fallback():
+    repository, fallback = Mock(), Mock()
+    repository.find.return_value = (-23.56, -46.65)
+    geocoder = GazetteerGeocoder(repository, fallback)
+
+    assert geocoder.get_location("Av. Paulista") == (-23.56, -46.65)
+    fallback.get_location.assert_not_called()
+    assert geocoder.stats()["hits"] == 1
+
+
+def test_miss_falls_back_to_the_remote_geocoder():
+    repository, fallback = Mock(), Mock()
+    repository.find.return_value = None
+    fallback.get_location.return_value = (1.0, 2.0)
+    geocoder = GazetteerGeocoder(repository, fallback)
+
+    assert geocoder.get_location("Somewhere") == (1.0, 2.0)
+    fallback.get_location.assert_called_once_with("Somewhere")
+    assert geocoder.stats()["fallbacks"] == 1
+
+
+def test_miss_without_fallback_is_unprocessable():
+    repository = Mock()
+    repository.find.return_value = None
+    geocoder = GazetteerGeocoder(repository)
+
+    with pytest.raises(UnprocessableEntityError):
+        geocoder.get_location("Somewhere")
+    assert geocoder.stats() == {"hits": 0, "fallbacks": 0, "misses": 1, "hit_ratio": 0.0}
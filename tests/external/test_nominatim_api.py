@@ -1,40 +1,228 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlparse
+
 import pytest
-from unittest.mock import patch, MagicMock
 import requests
 
 from app.exceptions import UnprocessableEntityError
+from app.external.nominatim_api import NominatimAPI, create_session
+from app.external.single_flight import SingleFlight
+from app.metrics import GEOCODER_SECONDS
+
+
+class NominatimStub:
+    """Local HTTP server answering /search like Nominatim, with scripted failures."""
+
+    def __init__(self):
+        self.places = {"av paulista": ("10.0", "20.0")}
+        self.failures = []  # (status, headers) returned before the real answer
+        self.delay = 0.0
+        self.queries = []
+        self.client_ports = set()
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)["q"][0]
+                with stub._lock:
+                    stub.queries.append(query)
+                    stub.client_ports.add(self.client_address[1])
+                    failure = stub.failures.pop(0) if stub.failures else None
+                time.sleep(stub.delay)
+                if failure is not None:
+                    status, headers = failure
+                    self._send(status, b"", headers)
+                    return
+                place = stub.places.get(" ".join(query.lower().split()))
+                body = [{"lat": place[0], "lon": place[1]}] if place else []
+                self._send(200, json.dumps(body).encode(), {"Content-Type": "application/json"})
+
+            def _send(self, status, body, headers):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+
+
+@pytest.fixture
+def stub():
+    stub = NominatimStub()
+    thread = threading.Thread(target=stub.server.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def stub_service(stub, nominatim_config):
+    nominatim_config.NOMINATIM_API = stub.url
+    session = create_session(nominatim_config.NOMINATIM_POOL_SIZE)
+    yield NominatimAPI(nominatim_config, session=session)
+    session.close()
 
 
-@patch("app.external.nominatim_api.requests.get")
-def test_get_location_success(mock_get, nominatim_service):
-    mock_response = MagicMock()
-    mock_response.json.return_value = [{"lat": "10.0", "lon": "20.0"}]
-    mock_response.raise_for_status.return_value = None
-    mock_get.return_value = mock_response
+def test_get_location_success(nominatim_service, mock_session):
+    mock_session.get.return_value.json.return_value = [{"lat": "10.0", "lon": "20.0"}]
 
     lat, lon = nominatim_service.get_location("Av Paulista")
 
     assert lat == 10.0
     assert lon == 20.0
-    mock_get.assert_called_once()
+    mock_session.get.assert_called_once()
+    assert mock_session.get.call_args.kwargs["timeout"] == (1, 1)
 
 
-@patch("app.external.nominatim_api.requests.get")
-def test_get_location_request_exception(mock_get, nominatim_service):
-    mock_get.side_effect = requests.RequestException("Timeout")
+def test_get_location_request_exception(nominatim_service, mock_session):
+    mock_session.get.side_effect = requests.Timeout("Timeout")
 
     with pytest.raises(ValueError) as exc:
         nominatim_service.get_location("Av Paulista")
 
     assert "Failed to fetch location" in str(exc.value)
+    assert mock_session.get.call_count == 3
 
 
-@patch("app.external.nominatim_api.requests.get")
-def test_get_location_not_found(mock_get, nominatim_service):
-    mock_response = MagicMock()
-    mock_response.json.return_value = []
-    mock_response.raise_for_status.return_value = None
-    mock_get.return_value = mock_response
+def test_get_location_not_found(nominatim_service, mock_session):
+    mock_session.get.return_value.json.return_value = []
 
     with pytest.raises(UnprocessableEntityError):
         nominatim_service.get_location("Invalid Place")
+
+
+def test_get_location_cache_hit_skips_request(nominatim_config, mock_session):
+    cache = MagicMock()
+    cache.get.return_value = {"lat": 10.0, "lon": 20.0, "found": True}
+    service = NominatimAPI(nominatim_config, cache, session=mock_session)
+
+    assert service.get_location("  Av.   PAULISTA ") == (10.0, 20.0)
+    cache.get.assert_called_once_with("av. paulista")
+    mock_session.get.assert_not_called()
+
+
+def test_get_location_negative_cache_hit(nominatim_config, mock_session):
+    cache = MagicMock()
+    cache.get.return_value = {"lat": None, "lon": None, "found": False}
+    service = NominatimAPI(nominatim_config, cache, session=mock_session)
+
+    with pytest.raises(UnprocessableEntityError):
+        service.get_location("Invalid Place")
+    mock_session.get.assert_not_called()
+
+
+def test_get_location_cache_miss_stores_results(nominatim_config, mock_session):
+    cache = MagicMock()
+    cache.get.return_value = None
+    mock_session.get.return_value.json.side_effect = [[{"lat": "10.0", "lon": "20.0"}], []]
+    service = NominatimAPI(nominatim_config, cache, session=mock_session)
+
+    service.get_location("Av Paulista")
+    with pytest.raises(UnprocessableEntityError):
+        service.get_location("Invalid Place")
+
+    cache.put.assert_any_call("av paulista", 10.0, 20.0)
+    cache.put.assert_any_call("invalid place", None, None)
+
+
+def test_get_location_request_failure_is_not_cached(nominatim_config, mock_session):
+    cache = MagicMock()
+    cache.get.return_value = None
+    mock_session.get.side_effect = requests.ConnectionError("Refused")
+    service = NominatimAPI(nominatim_config, cache, session=mock_session)
+
+    with pytest.raises(ValueError):
+        service.get_location("Av Paulista")
+    cache.put.assert_not_called()
+
+
+def test_stub_lookups_reuse_one_connection(stub, stub_service):
+    for _ in range(5):
+        assert stub_service.get_location("Av Paulista") == (10.0, 20.0)
+
+    assert len(stub.queries) == 5
+    assert len(stub.client_ports) == 1
+
+
+def test_stub_retries_server_errors(stub, stub_service):
+    stub.failures = [(503, {}), (429, {"Retry-After": "0"})]
+
+    assert stub_service.get_location("Av Paulista") == (10.0, 20.0)
+    assert len(stub.queries) == 3
+
+
+def test_stub_attempts_are_timed_by_outcome(stub, stub_service):
+    stub.failures = [(503, {})]
+    before = {outcome: GEOCODER_SECONDS.count("nominatim", outcome) for outcome in ("ok", "retry", "not_found")}
+
+    stub_service.get_location("Av Paulista")
+    with pytest.raises(UnprocessableEntityError):
+        stub_service.get_location("Nowhere")
+
+    assert GEOCODER_SECONDS.count("nominatim", "ok") == before["ok"] + 1
+    assert GEOCODER_SECONDS.count("nominatim", "retry") == before["retry"] + 1
+    assert GEOCODER_SECONDS.count("nominatim", "not_found") == before["not_found"] + 1
+
+
+def test_stub_gives_up_after_bounded_retries(stub, stub_service):
+    stub.failures = [(502, {})] * 5
+
+    with pytest.raises(ValueError):
+        stub_service.get_location("Av Paulista")
+    assert len(stub.queries) == 3
+
+
+def test_stub_client_errors_are_not_retried(stub, stub_service):
+    stub.failures = [(400, {})]
+
+    with pytest.raises(ValueError):
+        stub_service.get_location("Av Paulista")
+    assert len(stub.queries) == 1
+
+
+def test_stub_read_timeout_is_retried(stub, stub_service, nominatim_config):
+    nominatim_config.NOMINATIM_READ_TIMEOUT = 0.05
+    nominatim_config.NOMINATIM_RETRIES = 1
+    stub.delay = 0.2
+
+    with pytest.raises(ValueError):
+        stub_service.get_location("Av Paulista")
+    assert len(stub.queries) == 2
+
+
+def test_stub_concurrent_lookups_share_one_request(stub, nominatim_config):
+    nominatim_config.NOMINATIM_API = stub.url
+    stub.delay = 0.2
+    single_flight = SingleFlight()
+    session = create_session(nominatim_config.NOMINATIM_POOL_SIZE)
+    results = []
+
+    def lookup(name):
+        # Separate clients still coalesce when they share a SingleFlight
+        results.append(NominatimAPI(nominatim_config, session=session, single_flight=single_flight).get_location(name))
+
+    threads = [threading.Thread(target=lookup, args=(name,)) for name in ["Av Paulista", "AV  PAULISTA"] * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session.close()
+
+    assert results == [(10.0, 20.0)] * 8
+    assert len(stub.queries) == 1
+    assert single_flight.coalesced == 7
@@ -0,0 +1,56 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.external.rate_limiter import SharedTokenBucket
+from app.repositories.rate_limit_repository import RateLimitRepository
+
+
+@pytest.fixture
+def make_bucket(spatial_db):
+    def make(rate, capacity=1):
+        # A repository of its own per bucket, as each worker process builds one
+        return SharedTokenBucket(RateLimitRepository(spatial_db.config, spatial_db), "nominatim", rate, capacity)
+
+    return make
+
+
+def test_burst_is_not_delayed(make_bucket):
+    bucket = make_bucket(rate=1, capacity=3)
+
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_acquire_waits_for_refill(make_bucket):
+    bucket = make_bucket(rate=20)
+
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_buckets_of_different_processes_share_the_rate(make_bucket):
+    first, second = make_bucket(rate=10), make_bucket(rate=10)
+
+    start = time.monotonic()
+    for _ in range(2):
+        first.acquire()
+        second.acquire()
+
+    assert time.monotonic() - start >= 0.29
+
+
+def test_zero_rate_disables_the_limit():
+    repository = Mock()
+    bucket = SharedTokenBucket(repository, "nominatim", rate=0)
+
+    bucket.acquire()
+
+    repository.reserve.assert_not_called()
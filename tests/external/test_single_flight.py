@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from app.external.single_flight import SingleFlight
+
+
+def run_concurrently(single_flight, key, fn, count):
+    results = []
+
+    def call():
+        try:
+            results.append(single_flight.do(key, fn))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return "result"
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    results = run_concurrently(single_flight, "key", fn, 5)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert single_flight.coalesced == 4
+
+
+def test_waiters_get_the_leader_exception():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    error = ValueError("boom")
+
+    def fn():
+        release.wait(1)
+        raise error
+
+    threading.Timer(0.1, release.set).start()
+    results = run_concurrently(single_flight, "key", fn, 3)
+
+    assert results == [error] * 3
+
+
+def test_finished_calls_are_not_reused():
+    single_flight = SingleFlight()
+    values = iter([1, 2])
+
+    assert single_flight.do("key", lambda: next(values)) == 1
+    assert single_flight.do("key", lambda: next(values)) == 2
+    with pytest.raises(StopIteration):
+        single_flight.do("key", lambda: next(values))
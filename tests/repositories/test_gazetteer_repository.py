@@ -0,0 +1,93 @@
+import io
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.gazetteer import GazetteerDatabase
+from app.database.sqlite import DatabaseSqlite
+from app.exceptions import BadRequestError
+from app.repositories.gazetteer_repository import GazetteerRepository, search_key
+
+FIXTURE = Path(__file__).parent.parent / "fixtures" / "gazetteer.tsv"
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    config = SimpleNamespace(
+        GAZETTEER_DATABASE=str(tmp_path / "gazetteer.db"),
+        DB_POOL_SIZE=2,
+        DB_POOL_TIMEOUT=1,
+        DB_POOL_HEALTH_CHECK_INTERVAL=30,
+        DB_BUSY_TIMEOUT_MS=1000,
+        DB_MMAP_SIZE=0,
+        DB_CACHE_SIZE_KB=1024,
+        SLOW_QUERY_MS=0,
+    )
+    repository = GazetteerRepository(config, GazetteerDatabase(config))
+    with open(FIXTURE, encoding="utf-8", newline="") as stream:
+        repository.import_places(stream, "tsv", chunk_size=2)
+    yield repository
+    DatabaseSqlite.close_pools()
+
+
+def test_import_counts_every_name_and_rejects_invalid_rows(gazetteer):
+    with open(FIXTURE, encoding="utf-8", newline="") as stream:
+        stats = gazetteer.import_places(stream, "tsv", chunk_size=100, replace=True)
+
+    assert stats["imported"] == 12
+    assert stats["rejected"] == 1
+    assert gazetteer.count() == 12
+
+
+def test_import_appends_unless_replacing(gazetteer):
+    stream = io.StringIO("name,lat,lon\nPinheiros,-23.567,-46.702\n")
+
+    gazetteer.import_places(stream, "csv", chunk_size=100)
+
+    assert gazetteer.count() == 13
+    assert gazetteer.find("pinheiros") == (-23.567, -46.702)
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("Avenida Paulista", (-23.5614, -46.6559)),
+        ("av paulista", (-23.5614, -46.6559)),
+        ("  PRAÇA DA SE ", (-23.5503, -46.6342)),
+        ("Sampa", (-23.5505, -46.6333)),
+    ],
+)
+def test_exact_names_ignore_case_accents_and_punctuation(gazetteer, name, expected):
+    assert gazetteer.find(name) == expected
+
+
+def test_ambiguous_name_prefers_the_most_important_place(gazetteer):
+    assert gazetteer.find("São Paulo") == (-23.5505, -46.6333)
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("Paulista", (-23.5614, -46.6559)),
+        ("Augusta, São Paulo", (-23.5535, -46.6570)),
+        ("Paulista Brasil", (-23.5614, -46.6559)),
+        ("santa rita", (-22.1, -48.2)),
+    ],
+)
+def test_trigram_index_finds_names_containing_every_word(gazetteer, name, expected):
+    assert gazetteer.find(name) == expected
+
+
+@pytest.mark.parametrize("name", ["Paul", "Paulistana", "Augusta Rio", "Sé", "", "!!"])
+def test_unknown_names_are_a_miss(gazetteer, name):
+    assert gazetteer.find(name) is None
+
+
+def test_unsupported_format(gazetteer):
+    with pytest.raises(BadRequestError):
+        gazetteer.import_places(io.StringIO(""), "xml", chunk_size=100)
+
+
+def test_search_key():
+    assert search_key("Av. Paulista, São-Paulo") == "av paulista sao paulo"
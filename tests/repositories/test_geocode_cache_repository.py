@@ -0,0 +1,86 @@
+import pytest
+
+from app.repositories.geocode_cache_repository import GeocodeCacheRepository
+
+
+@pytest.fixture
+def cache(spatial_db):
+    config = spatial_db.config
+    config.GEOCODE_CACHE_TTL = 3600
+    config.GEOCODE_CACHE_NEGATIVE_TTL = 60
+    config.GEOCODE_CACHE_MAX_ENTRIES = 2
+    return GeocodeCacheRepository(config, spatial_db)
+
+
+def test_get_returns_stored_result(cache):
+    cache.put("av paulista", -23.56, -46.65)
+
+    assert cache.get("av paulista") == {"lat": -23.56, "lon": -46.65, "found": True}
+    assert cache.stats()["hits"] == 1
+
+
+def test_negative_result_is_cached(cache):
+    cache.put("nowhere", None, None)
+
+    assert cache.get("nowhere") == {"lat": None, "lon": None, "found": False}
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_miss_is_counted(cache):
+    assert cache.get("unknown") is None
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.0
+
+
+def test_expired_entry_is_a_miss(cache):
+    cache.config.GEOCODE_CACHE_NEGATIVE_TTL = -1
+    cache.put("nowhere", None, None)
+
+    assert cache.get("nowhere") is None
+
+
+def last_used_at(cache, name_key):
+    with cache.db.get_cursor() as (conn, cur):
+        cur.execute("SELECT last_used_at FROM geocode_cache WHERE name_key = ?", (name_key,))
+        return cur.fetchone()["last_used_at"]
+
+
+def age(cache, name_key, seconds):
+    with cache.db.get_cursor() as (conn, cur):
+        cur.execute("UPDATE geocode_cache SET last_used_at = last_used_at - ? WHERE name_key = ?", (seconds, name_key))
+
+
+def test_recent_hit_does_not_write(cache):
+    cache.put("a", 1.0, 1.0)
+    before = last_used_at(cache, "a")
+
+    cache.get("a")
+
+    assert last_used_at(cache, "a") == before
+
+
+def test_hit_refreshes_a_stale_last_used_at(cache):
+    cache.put("a", 1.0, 1.0)
+    age(cache, "a", 2 * cache.TOUCH_AFTER)
+    before = last_used_at(cache, "a")
+
+    cache.get("a")
+
+    assert last_used_at(cache, "a") > before + cache.TOUCH_AFTER
+
+
+def test_evict_keeps_most_recently_used(cache):
+    cache.put("a", 1.0, 1.0)
+    cache.put("b", 2.0, 2.0)
+    cache.put("c", 3.0, 3.0)
+    for name_key, seconds in (("a", 300), ("b", 200), ("c", 100)):
+        age(cache, name_key, seconds)
+    cache.get("a")
+
+    cache.evict()
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
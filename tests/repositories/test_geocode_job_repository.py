@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from app.repositories.geocode_job_repository import GeocodeJobRepository
+
+
+@pytest.fixture
+def jobs(spatial_db):
+    spatial_db.config.JOB_LEASE = 60
+    return GeocodeJobRepository(spatial_db.config, spatial_db)
+
+
+def test_created_job_is_pending(jobs):
+    job = jobs.create_job("update", "Av. Paulista", "loc-1")
+
+    assert job["status"] == "pending"
+    assert job["attempts"] == 0
+    assert jobs.get_job(job["id"]) == job
+
+
+def test_claim_takes_each_job_once(jobs):
+    first = jobs.create_job("create", "A")
+    second = jobs.create_job("create", "B")
+
+    claimed = [jobs.claim_job(), jobs.claim_job(), jobs.claim_job()]
+
+    assert [job["id"] for job in claimed[:2]] == [first["id"], second["id"]]
+    assert claimed[0]["status"] == "running"
+    assert claimed[0]["attempts"] == 1
+    assert claimed[2] is None
+
+
+def test_expired_lease_makes_a_running_job_claimable_again(jobs):
+    jobs.config.JOB_LEASE = -1
+    job = jobs.create_job("create", "A")
+    jobs.claim_job()
+
+    reclaimed = jobs.claim_job()
+
+    assert reclaimed["id"] == job["id"]
+    assert reclaimed["attempts"] == 2
+
+
+def test_retry_waits_until_run_at(jobs):
+    job = jobs.create_job("create", "A")
+    jobs.claim_job()
+
+    jobs.retry_job(job["id"], time.time() + 60, "Failed to fetch location")
+
+    assert jobs.claim_job() is None
+    assert jobs.get_job(job["id"])["error"] == "Failed to fetch location"
+    jobs.retry_job(job["id"], time.time() - 1, "Failed to fetch location")
+    assert jobs.claim_job()["attempts"] == 2
+
+
+def test_complete_and_fail(jobs):
+    created = jobs.create_job("create", "A")
+    failed = jobs.create_job("create", "B")
+    location = {"id": "loc-1", "name": "A", "lat": 1.0, "lon": 2.0}
+
+    jobs.complete_job(created["id"], location)
+    jobs.fail_job(failed["id"], 422, "Failed to search for name")
+
+    assert jobs.get_job(created["id"]) | {"updated_at": None} == created | {
+        "status": "succeeded",
+        "location_id": "loc-1",
+        "result": location,
+        "updated_at": None,
+    }
+    assert jobs.get_job(failed["id"])["error_status"] == 422
+    assert jobs.claim_job() is None
+
+
+def test_delete_finished_jobs(jobs):
+    pending = jobs.create_job("create", "A")
+    done = jobs.create_job("create", "B")
+    jobs.fail_job(done["id"], 422, "Failed to search for name")
+
+    assert jobs.delete_finished_jobs(time.time() + 1) == 1
+    assert jobs.get_job(done["id"]) is None
+    assert jobs.get_job(pending["id"]) is not None
@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from app.database.utils_sqlite import haversine
+from app.repositories.location_memory_index import LocationMemoryIndex
+from app.repositories.location_repository import _bounding_box
+
+
+def make_locations(count=500, seed=42):
+    rng = random.Random(seed)
+    return [
+        {"id": f"id-{i}", "name": f"Place {i}", "lat": rng.uniform(-23.7, -23.4), "lon": rng.uniform(-46.8, -46.4)}
+        for i in range(count)
+    ]
+
+
+def sql_reference(locations, lat, lon, radius_km):
+    # Mirrors NEARBY_SQL: bounding box prefilter, haversine check, ORDER BY distance_km
+    min_lat, max_lat, min_lon, max_lon = _bounding_box(lat, lon, radius_km)
+    rows = []
+    for loc in locations:
+        if min_lat <= loc["lat"] <= max_lat and min_lon <= loc["lon"] <= max_lon:
+            distance_km = haversine(lat, lon, loc["lat"], loc["lon"])
+            if distance_km <= radius_km:
+                rows.append({**loc, "distance_km": distance_km})
+    return sorted(rows, key=lambda row: row["distance_km"])
+
+
+@pytest.fixture
+def locations():
+    return make_locations()
+
+
+@pytest.fixture
+def index(locations):
+    index = LocationMemoryIndex()
+    index.rebuild(locations)
+    return index
+
+
+@pytest.mark.parametrize("radius_km", [1.0, 2.0, 10.0, 50.0])
+def test_matches_sql_results(index, locations, radius_km):
+    result = index.get_nearby_locations(-23.55, -46.63, radius_km)
+
+    assert result
+    assert result == sql_reference(locations, -23.55, -46.63, radius_km)
+    assert list(result[0]) == ["id", "name", "lon", "lat", "distance_km"]
+
+
+def test_upsert_adds_location(index):
+    index.upsert({"id": "new", "name": "New", "lat": -23.5501, "lon": -46.6301})
+
+    result = index.get_nearby_locations(-23.55, -46.63, 0.1)
+
+    assert [loc["id"] for loc in result] == ["new"]
+
+
+def test_upsert_moves_existing_location(index, locations):
+    moved = {**locations[0], "name": "Moved", "lat": 10.0, "lon": 20.0}
+
+    index.upsert(moved)
+
+    assert len(index) == len(locations)
+    assert index.get_nearby_locations(10.0, 20.0, 1.0)[0]["name"] == "Moved"
+
+
+def test_remove_location(index, locations):
+    target = locations[0]
+
+    index.remove(target["id"])
+
+    assert len(index) == len(locations) - 1
+    result = index.get_nearby_locations(target["lat"], target["lon"], 0.001)
+    assert target["id"] not in [loc["id"] for loc in result]
+
+
+def test_writes_match_sql_results_across_compactions(locations, monkeypatch):
+    monkeypatch.setattr(LocationMemoryIndex, "COMPACT_AFTER", 16)
+    index = LocationMemoryIndex()
+    index.rebuild(locations)
+    current = {loc["id"]: loc for loc in locations}
+    rng = random.Random(7)
+
+    for i in range(100):
+        if i % 4 == 3:
+            index.remove(current.pop(rng.choice(sorted(current)))["id"])
+        else:
+            location = make_locations(1, seed=i)[0] | {"id": rng.choice([f"id-{i}", f"new-{i}"])}
+            current[location["id"]] = location
+            index.upsert(location)
+
+        assert len(index) == len(current)
+    assert index.get_nearby_locations(-23.55, -46.63, 10.0) == sql_reference(current.values(), -23.55, -46.63, 10.0)
+
+
+def test_empty_index_returns_nothing():
+    assert LocationMemoryIndex().get_nearby_locations(0.0, 0.0, 10.0) == []
+
+
+def test_get_nearest_locations(index, locations):
+    expected = sorted(haversine(-23.55, -46.63, loc["lat"], loc["lon"]) for loc in locations)[:5]
+
+    result = index.get_nearest_locations(-23.55, -46.63, 5, initial_radius_km=0.1)
+
+    assert [loc["distance_km"] for loc in result] == expected
@@ -1,5 +1,24 @@
+import math
+import random
+import sqlite3
+
 import pytest
 
+from app.database.utils_sqlite import haversine
+from app.exceptions import ConflictError
+from app.repositories.location_repository import (
+    CLUSTERS_SQL,
+    LIST_SQL,
+    NEARBY_BATCH_SQL,
+    NEARBY_SQL,
+    WITHIN_BOX_SQL,
+    WITHIN_POLYGON_SQL,
+    _box_params,
+    _bounding_box,
+    _group_overlapping,
+    _nearby_params,
+)
+
 def test_create_location(repository, mock_db):
     _, cur = mock_db
     result = repository.create_location("Test Av. Paulista", 10.0, 20.0)
@@ -59,9 +78,88 @@ def test_get_nearby_locations(repository, mock_db):
     assert result[0]["name"] == "Test A"
 
 
+def test_get_nearby_locations_prefilters_with_rtree(repository, mock_db):
+    _, cur = mock_db
+    cur.fetchall.return_value = []
+
+    repository.get_nearby_locations(10.0, 20.0, 5.0)
+
+    sql, params = cur.execute.call_args.args
+    assert "idx_locations_geom" in sql
+    assert params["max_lon"] > params["min_lon"]
+    assert params["max_lat"] > params["min_lat"]
+
+
+def test_nearby_query_plan_uses_spatial_index(spatial_db):
+    with spatial_db.get_cursor() as (conn, cur):
+        cur.execute(f"EXPLAIN QUERY PLAN {NEARBY_SQL}", _nearby_params(10.0, 20.0, 5.0))
+        plan = [row[3] for row in cur.fetchall()]
+
+    assert any(step.startswith("SCAN idx_locations_geom VIRTUAL TABLE INDEX") for step in plan)
+    assert "SEARCH locations USING INTEGER PRIMARY KEY (rowid=?)" in plan
+    assert not any(step.startswith("SCAN locations") for step in plan)
+
+
+def test_get_nearby_locations_matches_python_haversine(spatial_repository):
+    rng = random.Random(7)
+    for i in range(300):
+        spatial_repository.create_location(f"Place {i}", rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4))
+
+    result = spatial_repository.get_nearby_locations(-23.55, -46.63, 8.0)
+
+    expected = sorted(
+        (
+            {**loc, "distance_km": haversine(-23.55, -46.63, loc["lat"], loc["lon"])}
+            for loc in spatial_repository.get_all_locations()
+        ),
+        key=lambda loc: loc["distance_km"],
+    )
+    expected = [loc for loc in expected if loc["distance_km"] <= 8.0]
+    assert result
+    assert [loc["id"] for loc in result] == [loc["id"] for loc in expected]
+    assert [loc["distance_km"] for loc in result] == [loc["distance_km"] for loc in expected]
+
+
+@pytest.fixture
+def nearby_rows(spatial_repository):
+    rng = random.Random(11)
+    points = [(rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4)) for _ in range(200)]
+    # Repeated coordinates tie on distance_km, so pages and rings must break ties by id
+    spatial_repository.create_locations([(f"Place {i}", *points[i % 150]) for i in range(200)])
+    return spatial_repository.get_nearby_locations(-23.55, -46.63, 15.0)
+
+
+def test_get_nearby_locations_pages_by_distance_and_id(spatial_repository, nearby_rows):
+    pages = []
+    after = None
+    while page := spatial_repository.get_nearby_locations(-23.55, -46.63, 15.0, after, limit=7):
+        pages.append(page)
+        after = (page[-1]["distance_km"], page[-1]["id"])
+
+    assert [loc for page in pages for loc in page] == nearby_rows
+    assert nearby_rows == sorted(nearby_rows, key=lambda loc: (loc["distance_km"], loc["id"]))
+    assert len({loc["distance_km"] for loc in nearby_rows}) < len(nearby_rows)
+
+
+@pytest.mark.parametrize("initial_radius_km", [0.0, 0.01, 1.0, 3.75, 15.0, 100.0])
+def test_iter_nearby_locations_walks_rings_in_order(spatial_repository, nearby_rows, initial_radius_km):
+    rows = spatial_repository.iter_nearby_locations(-23.55, -46.63, 15.0, initial_radius_km, batch_size=16)
+
+    assert list(rows) == nearby_rows
+
+
+def test_iter_nearby_locations_releases_connection_when_closed(spatial_repository, spatial_db, nearby_rows):
+    rows = spatial_repository.iter_nearby_locations(-23.55, -46.63, 15.0, 1.0, batch_size=4)
+    next(rows)
+
+    rows.close()
+
+    assert spatial_db.pool_stats()["in_use"] == 0
+
+
 def test_update_location_success(repository, mock_db):
     _, cur = mock_db
-    cur.rowcount = 1
+    cur.fetchall.return_value = [{"id": "123"}]
 
     result = repository.update_location("123", "Updated", 11.0, 22.0)
 
@@ -71,7 +169,7 @@ def test_update_location_success(repository, mock_db):
 
 def test_update_location_not_found(repository, mock_db):
     _, cur = mock_db
-    cur.rowcount = 0
+    cur.fetchall.return_value = []
 
     result = repository.update_location("999", "Not Found", 0.0, 0.0)
     assert result is None
@@ -91,3 +189,324 @@ def test_delete_location_not_found(repository, mock_db):
 
     result = repository.delete_location("not found")
     assert result is False
+
+
+def test_create_location_is_one_statement(repository, mock_db):
+    _, cur = mock_db
+
+    repository.create_location("A", 1.0, 2.0)
+
+    cur.execute.assert_called_once()
+    assert "ON CONFLICT (name_normalized) DO NOTHING RETURNING id" in cur.execute.call_args.args[0]
+
+
+def test_create_location_conflicts_on_normalized_name(spatial_repository):
+    spatial_repository.create_location("Av  Paulista", 1.0, 2.0)
+
+    with pytest.raises(ConflictError):
+        spatial_repository.create_location("av paulista", 3.0, 4.0)
+
+    assert [loc["name"] for loc in spatial_repository.get_all_locations()] == ["Av  Paulista"]
+
+
+def test_create_locations_marks_conflicts_in_one_transaction(spatial_repository):
+    spatial_repository.create_location("A", 1.0, 2.0)
+
+    result = spatial_repository.create_locations([("a", 1.0, 2.0), ("B", 3.0, 4.0), ("b ", 5.0, 6.0)])
+
+    assert result[0] is None
+    assert result[1]["name"] == "B"
+    assert result[2] is None
+    assert sorted(loc["name"] for loc in spatial_repository.get_all_locations()) == ["A", "B"]
+
+
+def test_update_location_conflicts_with_another_row(spatial_repository):
+    spatial_repository.create_location("A", 1.0, 2.0)
+    location = spatial_repository.create_location("B", 3.0, 4.0)
+
+    with pytest.raises(ConflictError):
+        spatial_repository.update_location(location["id"], " a", 5.0, 6.0)
+
+    assert spatial_repository.get_location_by_id(location["id"])["name"] == "B"
+    # Renaming a row to a variant of its own name is not a conflict
+    assert spatial_repository.update_location(location["id"], "b", 5.0, 6.0)["name"] == "b"
+
+
+def test_get_locations_by_names(spatial_repository):
+    spatial_repository.create_locations([("A", 1.0, 2.0), ("B", 3.0, 4.0), ("C", 5.0, 6.0)])
+
+    result = spatial_repository.get_locations_by_names(["a", "C ", "Missing"])
+
+    assert sorted(loc["name"] for loc in result) == ["A", "C"]
+
+
+def test_import_locations_commits_in_chunks_and_skips_existing_ids(spatial_repository):
+    rows = [{"id": f"id-{i}", "name": f"Place {i}", "lat": i / 100, "lon": i / 100} for i in range(10)]
+    spatial_repository.import_locations(iter(rows[:3]), chunk_size=2)
+
+    imported = spatial_repository.import_locations(iter(rows), chunk_size=4)
+
+    assert imported == 7
+    assert len(spatial_repository.get_all_locations()) == 10
+    assert len(spatial_repository.get_nearby_locations(0.05, 0.05, 20.0)) == 10
+
+
+def test_import_locations_rolls_back_the_failing_chunk_before_rebuilding_the_index(repository, mock_db):
+    db, cur = mock_db
+    conn, _ = db.get_cursor.return_value.__enter__.return_value
+    calls = []
+    conn.commit.side_effect = lambda: calls.append("commit")
+    conn.rollback.side_effect = lambda: calls.append("rollback")
+    cur.execute.side_effect = lambda sql, *args: calls.append(sql)
+    cur.executemany.side_effect = [None, sqlite3.OperationalError("disk I/O error")]
+    rows = [{"id": f"id-{i}", "name": f"Place {i}", "lat": i / 100, "lon": i / 100} for i in range(4)]
+
+    with pytest.raises(sqlite3.OperationalError):
+        repository.import_locations(iter(rows), chunk_size=2, defer_index=True)
+
+    # The first chunk is kept; the partial second one is rolled back, not committed with the index rebuild
+    assert calls == [
+        "SELECT DisableSpatialIndex('locations', 'geom')",
+        "commit",
+        "rollback",
+        "DROP TABLE IF EXISTS idx_locations_geom",
+        "SELECT CreateSpatialIndex('locations', 'geom')",
+        "commit",
+    ]
+
+
+def test_every_committed_write_bumps_the_generation(spatial_repository, spatial_db):
+    generations = [spatial_repository.get_generation()]
+    location = spatial_repository.create_location("A", 1.0, 2.0)
+    generations.append(spatial_repository.get_generation())
+    spatial_repository.update_location(location["id"], "B", 1.0, 2.0)
+    generations.append(spatial_repository.get_generation())
+    # Another process, e.g. cli.py import, writing through its own connection
+    conn = spatial_db.connect()
+    conn.execute("DELETE FROM locations")
+    conn.commit()
+    generations.append(spatial_repository.get_generation())
+
+    assert generations == sorted(set(generations))
+    spatial_repository.get_all_locations()
+    assert spatial_repository.get_generation() == generations[-1]
+
+
+def test_iter_locations_streams_in_batches(spatial_repository):
+    spatial_repository.create_locations([(f"Place {i}", i / 100, i / 100) for i in range(5)])
+
+    rows = spatial_repository.iter_locations(batch_size=2)
+    first = next(rows)
+    rows.close()
+
+    assert set(first) == {"id", "name", "lat", "lon"}
+    assert spatial_repository.db.pool_stats()["in_use"] == 0
+    assert len(list(spatial_repository.iter_locations(batch_size=2))) == 5
+
+
+def test_list_locations_pages_by_id(spatial_repository):
+    created = spatial_repository.create_locations([(f"Place {i}", i / 100, i / 100) for i in range(5)])
+    ids = sorted(loc["id"] for loc in created)
+
+    first = spatial_repository.list_locations(None, 3)
+    second = spatial_repository.list_locations(first[-1]["id"], 3)
+
+    assert [loc["id"] for loc in first] == ids[:3]
+    assert [loc["id"] for loc in second] == ids[3:]
+
+
+def test_list_query_plan_seeks_primary_key_index(spatial_db):
+    with spatial_db.get_cursor() as (conn, cur):
+        cur.execute(f"EXPLAIN QUERY PLAN {LIST_SQL}", {"after_id": "x", "limit": 10})
+        plan = [row[3] for row in cur.fetchall()]
+
+    assert plan == ["SEARCH locations USING INDEX sqlite_autoindex_locations_1 (id>?)"]
+
+
+@pytest.mark.parametrize(
+    ("lat", "lon", "radius_km"),
+    [(-23.55, -46.63, 50.0), (78.2, 15.6, 300.0), (-89.5, 0.0, 100.0), (10.0, 179.9, 100.0), (0.0, 0.0, 25000.0)],
+)
+def test_bounding_box_contains_whole_circle(lat, lon, radius_km):
+    rng = random.Random(1)
+    min_lat, max_lat, min_lon, max_lon = _bounding_box(lat, lon, radius_km)
+
+    # Points at random bearings up to the edge of the circle
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    for _ in range(5000):
+        bearing = rng.uniform(0, 2 * math.pi)
+        angle = radius_km * rng.uniform(0.9, 0.99999) / 6371
+        lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(bearing))
+        lon2 = lon1 + math.atan2(
+            math.sin(bearing) * math.sin(angle) * math.cos(lat1), math.cos(angle) - math.sin(lat1) * math.sin(lat2)
+        )
+        point_lat, point_lon = math.degrees(lat2), (math.degrees(lon2) + 540) % 360 - 180
+
+        assert min_lat <= point_lat <= max_lat
+        assert min_lon <= point_lon <= max_lon
+
+
+@pytest.mark.parametrize(("count", "spread"), [(400, 0.3), (40, 60.0)])
+def test_get_nearest_locations_matches_brute_force(spatial_repository, count, spread):
+    rng = random.Random(count)
+    spatial_repository.create_locations(
+        [(f"Place {i}", rng.uniform(-spread, spread) / 2, rng.uniform(-spread, spread)) for i in range(count)]
+    )
+    expected = sorted(
+        haversine(0.0, 0.0, loc["lat"], loc["lon"]) for loc in spatial_repository.get_all_locations()
+    )[:10]
+
+    result = spatial_repository.get_nearest_locations(0.0, 0.0, 10, initial_radius_km=1.0)
+
+    assert [loc["distance_km"] for loc in result] == expected
+
+
+def test_get_nearest_locations_with_fewer_rows_than_k(spatial_repository):
+    spatial_repository.create_locations([("A", 1.0, 1.0), ("B", -60.0, 170.0)])
+
+    result = spatial_repository.get_nearest_locations(0.0, 0.0, 5, initial_radius_km=1.0)
+
+    assert [loc["name"] for loc in result] == ["A", "B"]
+
+
+def test_get_nearest_locations_with_zero_initial_radius(spatial_repository):
+    spatial_repository.create_locations([("A", 1.0, 1.0), ("B", 2.0, 2.0)])
+
+    result = spatial_repository.get_nearest_locations(0.0, 0.0, 1, initial_radius_km=0.0)
+
+    assert [loc["name"] for loc in result] == ["A"]
+
+
+def test_get_nearby_locations_batch_matches_single_queries(spatial_repository):
+    rng = random.Random(10)
+    spatial_repository.create_locations(
+        [(f"Place {i}", rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4)) for i in range(300)]
+        + [("Far", 40.0, 179.99), ("Pole", 89.9, 10.0)]
+    )
+    queries = [(rng.uniform(-23.7, -23.4), rng.uniform(-46.8, -46.4), rng.uniform(1, 10)) for _ in range(20)]
+    queries += [(-23.55, -46.63, 8.0), (40.0, -179.99, 5.0), (89.95, -170.0, 20.0), (0.0, 0.0, 1.0)]
+
+    result = spatial_repository.get_nearby_locations_batch(queries)
+
+    assert result == [spatial_repository.get_nearby_locations(*query) for query in queries]
+    assert [loc["name"] for loc in result[-3]] == ["Far"]
+    assert [loc["name"] for loc in result[-2]] == ["Pole"]
+    assert result[-1] == []
+
+
+def test_get_nearby_locations_batch_uses_one_connection(spatial_repository, spatial_db):
+    acquired = spatial_db.pool_stats()["acquired"]
+
+    spatial_repository.get_nearby_locations_batch([(10.0, 20.0, 5.0), (50.0, 20.0, 5.0)])
+
+    assert spatial_db.pool_stats()["acquired"] == acquired + 1
+
+
+def test_nearby_batch_query_plan_reads_candidates_once(spatial_db):
+    sql = NEARBY_BATCH_SQL.format(values=", ".join(["(?, ?, ?, ?, ?, ?, ?, ?, ?)"] * 2))
+    with spatial_db.get_cursor() as (conn, cur):
+        cur.execute(f"EXPLAIN QUERY PLAN {sql}", [0] * 22)
+        plan = [row[3] for row in cur.fetchall()]
+
+    assert "MATERIALIZE candidates" in plan
+    assert any(step.startswith("SCAN idx_locations_geom VIRTUAL TABLE INDEX") for step in plan)
+    assert not any(step.startswith("SCAN locations") for step in plan)
+
+
+def test_group_overlapping_shares_overlapping_boxes():
+    boxes = [
+        (0.0, 1.0, 0.0, 1.0),
+        (0.1, 1.1, 0.1, 1.1),
+        (0.2, 0.9, 0.2, 0.9),
+        (10.0, 11.0, 10.0, 11.0),
+    ]
+
+    groups = list(_group_overlapping(boxes))
+
+    assert groups == [([0, 1, 2], (0.0, 1.1, 0.0, 1.1)), ([3], (10.0, 11.0, 10.0, 11.0))]
+
+
+def test_group_overlapping_does_not_chain_a_route_into_one_box():
+    boxes = [(i * 0.5, i * 0.5 + 1, i * 0.5, i * 0.5 + 1) for i in range(10)]
+
+    groups = [indexes for indexes, _ in _group_overlapping(boxes)]
+
+    assert sorted(i for indexes in groups for i in indexes) == list(range(10))
+    assert max(len(indexes) for indexes in groups) <= 3
+
+
+def test_get_locations_within_box_pages_by_id(spatial_repository):
+    spatial_repository.create_locations([
+        ("In A", 1.0, 1.0), ("In B", 2.0, 2.0), ("Edge", 3.0, 3.0), ("Out", 3.0001, 1.0), ("Far", 40.0, 40.0)
+    ])
+    bbox = (0.0, 0.0, 3.0, 3.0)
+
+    first = spatial_repository.get_locations_within_box(bbox, None, 2)
+    rest = spatial_repository.get_locations_within_box(bbox, first[-1]["id"], 2)
+
+    names = {loc["name"] for loc in first + rest}
+    assert names == {"In A", "In B", "Edge"}
+    assert [loc["id"] for loc in first + rest] == sorted(loc["id"] for loc in first + rest)
+
+
+def test_get_locations_within_polygon(spatial_repository):
+    spatial_repository.create_locations([("Inside", 0.25, 0.5), ("In hole", 0.5, 0.5), ("Outside", 1.5, 1.5)])
+    geometry = {
+        "type": "Polygon",
+        "coordinates": [
+            [[0.0, 0.0], [2.0, 0.0], [0.0, 2.0], [0.0, 0.0]],
+            [[0.4, 0.4], [0.6, 0.4], [0.6, 0.6], [0.4, 0.6], [0.4, 0.4]],
+        ],
+    }
+
+    result = spatial_repository.get_locations_within_polygon(geometry, (0.0, 0.0, 2.0, 2.0), None, 10)
+
+    assert [loc["name"] for loc in result] == ["Inside"]
+
+
+@pytest.mark.parametrize("sql", [WITHIN_BOX_SQL, WITHIN_POLYGON_SQL])
+def test_within_query_plans_use_spatial_index(spatial_db, sql):
+    params = {**_box_params((0.0, 0.0, 1.0, 1.0)), "geometry": "{}", "after_id": "", "limit": 10}
+    with spatial_db.get_cursor() as (conn, cur):
+        cur.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = [row[3] for row in cur.fetchall()]
+
+    assert any(step.startswith("SCAN idx_locations_geom VIRTUAL TABLE INDEX") for step in plan)
+    assert not any(step.startswith("SCAN l") or step.startswith("SCAN locations") for step in plan)
+
+
+def test_get_clusters_counts_every_location_in_the_bbox(spatial_repository):
+    rng = random.Random(13)
+    spatial_repository.create_locations(
+        [(f"Place {i}", rng.uniform(-24.0, -23.0), rng.uniform(-47.0, -46.0)) for i in range(500)]
+        + [("Far", 40.0, 40.0)]
+    )
+
+    clusters = spatial_repository.get_clusters((-47.0, -24.0, -46.0, -23.0), 8)
+
+    assert sum(cluster["count"] for cluster in clusters) == 500
+    assert len(clusters) <= 4
+    for cluster in clusters:
+        assert -24.0 <= cluster["lat"] <= -23.0
+        assert -47.0 <= cluster["lon"] <= -46.0
+
+
+def test_update_location_moves_cluster_cell(spatial_repository):
+    location = spatial_repository.create_location("A", 10.0, 10.0)
+
+    spatial_repository.update_location(location["id"], "A", -10.0, -10.0)
+
+    assert spatial_repository.get_clusters((0.0, 0.0, 20.0, 20.0), 4) == []
+    [cluster] = spatial_repository.get_clusters((-20.0, -20.0, 0.0, 0.0), 4)
+    assert cluster["count"] == 1
+    assert cluster["lat"] == pytest.approx(-10.0)
+    assert cluster["lon"] == pytest.approx(-10.0)
+
+
+def test_clusters_query_plan_uses_covering_index(spatial_db):
+    sql = CLUSTERS_SQL.format(values="(?, ?), (?, ?)", column="cell_8")
+    with spatial_db.get_cursor() as (conn, cur):
+        cur.execute(f"EXPLAIN QUERY PLAN {sql}", [0, 1, 2, 3])
+        plan = [row[3] for row in cur.fetchall()]
+
+    assert any(step.startswith("SEARCH l USING COVERING INDEX idx_locations_cell_8") for step in plan)
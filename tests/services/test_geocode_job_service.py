@@ -0,0 +1,171 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from app.exceptions import ConflictError, NotFoundError, UnprocessableEntityError
+from app.repositories.geocode_job_repository import GeocodeJobRepository
+from app.schemas.location_schema import LocationOut
+from app.services.geocode_job_service import GeocodeJobService
+
+LOCATION = {"id": "loc-1", "name": "Av. Paulista", "lat": 1.0, "lon": 2.0}
+
+
+@pytest.fixture
+def job_config():
+    return SimpleNamespace(
+        JOB_WORKERS=2, JOB_MAX_ATTEMPTS=3, JOB_BACKOFF=2.0, JOB_LEASE=60, JOB_POLL_INTERVAL=0.05, JOB_RETENTION=3600
+    )
+
+
+@pytest.fixture
+def job_repo():
+    return Mock()
+
+
+@pytest.fixture
+def location_service():
+    return Mock()
+
+
+@pytest.fixture
+def jobs(job_repo, location_service, job_config):
+    return GeocodeJobService(job_repo, location_service, job_config)
+
+
+def make_job(operation="create", attempts=1, **fields):
+    return {"id": "job-1", "operation": operation, "name": "Av. Paulista", "location_id": None,
+            "status": "running", "attempts": attempts, "result": None, "error": None, "error_status": None,
+            "created_at": 1.0, "updated_at": 1.0, **fields}
+
+
+def test_submit_create_checks_the_name_first(jobs, job_repo, location_service):
+    location_service.check_name_available.side_effect = ConflictError()
+
+    with pytest.raises(ConflictError):
+        jobs.submit_create("Av. Paulista")
+    job_repo.create_job.assert_not_called()
+
+
+def test_submit_update_of_unknown_id_is_not_found(jobs, job_repo, location_service):
+    location_service.get_location_by_id.side_effect = NotFoundError()
+
+    with pytest.raises(NotFoundError):
+        jobs.submit_update("missing", "Av. Paulista")
+    job_repo.create_job.assert_not_called()
+
+
+def test_submit_update_records_the_job(jobs, job_repo, location_service):
+    job_repo.create_job.return_value = make_job("update", attempts=0, status="pending", location_id="loc-1")
+
+    job = jobs.submit_update("loc-1", "Av. Paulista")
+
+    assert job.status == "pending"
+    location_service.check_name_available.assert_called_once_with("Av. Paulista", "loc-1")
+    job_repo.create_job.assert_called_once_with("update", "Av. Paulista", "loc-1")
+
+
+def test_get_unknown_job(jobs, job_repo):
+    job_repo.get_job.return_value = None
+
+    with pytest.raises(NotFoundError):
+        jobs.get_job("unknown")
+
+
+def test_successful_job_stores_the_location(jobs, job_repo, location_service):
+    location_service.update_location.return_value = LocationOut(**LOCATION)
+
+    jobs.run_job(make_job("update", location_id="loc-1"))
+
+    location_service.update_location.assert_called_once_with("loc-1", "Av. Paulista")
+    job_repo.complete_job.assert_called_once_with("job-1", LOCATION)
+
+
+@pytest.mark.parametrize(
+    ("error", "status"),
+    [(ConflictError(), 409), (UnprocessableEntityError(), 422), (NotFoundError(), 404)],
+)
+def test_client_errors_fail_the_job_without_retrying(jobs, job_repo, location_service, error, status):
+    location_service.create_location.side_effect = error
+
+    jobs.run_job(make_job())
+
+    assert job_repo.fail_job.call_args.args[:2] == ("job-1", status)
+    job_repo.retry_job.assert_not_called()
+
+
+@pytest.mark.parametrize(("attempts", "window"), [(1, (1.0, 2.0)), (2, (2.0, 4.0))])
+def test_other_errors_are_retried_with_backoff(jobs, job_repo, location_service, attempts, window):
+    low, high = window
+    location_service.create_location.side_effect = ValueError("Failed to fetch location")
+
+    before = time.time()
+    jobs.run_job(make_job(attempts=attempts))
+
+    job_id, run_at, error = job_repo.retry_job.call_args.args
+    assert before + low <= run_at <= time.time() + high
+    assert error == "Failed to fetch location"
+
+
+def test_last_attempt_fails_the_job(jobs, job_repo, location_service):
+    location_service.create_location.side_effect = ValueError("Failed to fetch location")
+
+    jobs.run_job(make_job(attempts=3))
+
+    job_repo.fail_job.assert_called_once_with("job-1", 500, "Internal server")
+    job_repo.retry_job.assert_not_called()
+
+
+def test_create_job_inserts_the_location_with_the_job_id(jobs, job_repo, location_service):
+    location_service.create_location.return_value = LocationOut(**LOCATION)
+
+    jobs.run_job(make_job())
+
+    location_service.create_location.assert_called_once_with("Av. Paulista", "job-1")
+    job_repo.complete_job.assert_called_once_with("job-1", LOCATION)
+
+
+def test_retry_after_the_insert_completes_with_the_location_it_created(jobs, job_repo, location_service):
+    # The first attempt inserted the location but died before the job was marked done
+    location_service.create_location.side_effect = ConflictError()
+    location_service.get_location_by_id.return_value = LocationOut(**{**LOCATION, "id": "job-1"})
+
+    jobs.run_job(make_job(attempts=2))
+
+    location_service.get_location_by_id.assert_called_once_with("job-1")
+    job_repo.complete_job.assert_called_once_with("job-1", {**LOCATION, "id": "job-1"})
+    job_repo.fail_job.assert_not_called()
+
+
+def test_retry_conflicting_with_another_location_fails(jobs, job_repo, location_service):
+    location_service.create_location.side_effect = ConflictError()
+    location_service.get_location_by_id.side_effect = NotFoundError()
+
+    jobs.run_job(make_job(attempts=2))
+
+    job_repo.fail_job.assert_called_once_with("job-1", 409, "Location already exists")
+    job_repo.complete_job.assert_not_called()
+
+
+def test_job_reclaimed_after_its_last_attempt_is_failed(jobs, job_repo, location_service):
+    jobs.run_job(make_job(attempts=4))
+
+    location_service.create_location.assert_not_called()
+    job_repo.fail_job.assert_called_once_with("job-1", 500, "Internal server")
+
+
+def test_workers_run_submitted_jobs(spatial_db, location_service, job_config):
+    spatial_db.config.JOB_LEASE = 60
+    location_service.create_location.return_value = LocationOut(**LOCATION)
+    jobs = GeocodeJobService(GeocodeJobRepository(spatial_db.config, spatial_db), location_service, job_config)
+    jobs.start()
+    try:
+        job = jobs.submit_create("Av. Paulista")
+        deadline = time.monotonic() + 5
+        while jobs.get_job(job.id).status != "succeeded" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        jobs.stop()
+
+    assert jobs.get_job(job.id).location == LocationOut(**LOCATION)
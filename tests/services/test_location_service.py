@@ -1,10 +1,24 @@
+import io
+
 import pytest
-from app.schemas.location_schema import LocationOut, LocationNearbyOut
-from app.exceptions import ConflictError, NotFoundError, UnprocessableEntityError
+from unittest.mock import Mock
+
+from app.services.location_service import LocationService
+from app.services.nearby_cache import NearbyResultCache
+from app.utils import decode_cursor, encode_cursor
+from app.schemas.location_schema import (
+    LocationClustersIn,
+    LocationOut,
+    LocationNearbyIn,
+    LocationNearbyOut,
+    LocationNearbyPageIn,
+    LocationWithinBoxIn,
+    LocationWithinPolygonIn,
+)
+from app.exceptions import BadRequestError, ConflictError, NotFoundError, UnprocessableEntityError
 
 
 def test_create_location_success(service, mock_repo, mock_nominatim):
-    mock_repo.get_location_by_name.return_value = None
     mock_nominatim.get_location.return_value = (10.0, 20.0)
     mock_repo.create_location.return_value = {"id": "123", "name": "Av. Paulista", "lat": 10.0, "lon": 20.0}
 
@@ -12,18 +26,19 @@ def test_create_location_success(service, mock_repo, mock_nominatim):
 
     assert isinstance(result, LocationOut)
     assert result.name == "Av. Paulista"
-    mock_repo.get_location_by_name.assert_called_once_with("Av. Paulista")
+    mock_repo.create_location.assert_called_once_with("Av. Paulista", 10.0, 20.0, location_id=None)
+    mock_repo.get_location_by_name.assert_not_called()
 
 
-def test_create_location_conflict(service, mock_repo):
-    mock_repo.get_location_by_name.return_value = {"id": "123"}
+def test_create_location_conflict(service, mock_repo, mock_nominatim):
+    mock_nominatim.get_location.return_value = (10.0, 20.0)
+    mock_repo.create_location.side_effect = ConflictError("Location already exists")
 
     with pytest.raises(ConflictError, match="Location already exists"):
         service.create_location("Av. Paulista")
 
 
 def test_create_location_unprocessable(service, mock_repo, mock_nominatim):
-    mock_repo.get_location_by_name.return_value = None
     mock_nominatim.get_location.return_value = (None, None)
 
     with pytest.raises(UnprocessableEntityError, match="Name not found"):
@@ -62,8 +77,6 @@ def test_get_nearby_locations(service, mock_repo):
 
 
 def test_update_location_success(service, mock_repo, mock_nominatim):
-    mock_repo.get_location_by_id.return_value = {"id": "123", "name": "Old", "lat": 1.0, "lon": 1.0}
-    mock_repo.get_location_by_name.return_value = None
     mock_nominatim.get_location.return_value = (10.0, 20.0)
     mock_repo.update_location.return_value = {"id": "123", "name": "New", "lat": 10.0, "lon": 20.0}
 
@@ -71,26 +84,26 @@ def test_update_location_success(service, mock_repo, mock_nominatim):
 
     assert isinstance(result, LocationOut)
     assert result.name == "New"
+    mock_repo.get_location_by_id.assert_not_called()
 
 
-def test_update_location_not_found(service, mock_repo):
-    mock_repo.get_location_by_id.return_value = None
+def test_update_location_not_found(service, mock_repo, mock_nominatim):
+    mock_nominatim.get_location.return_value = (10.0, 20.0)
+    mock_repo.update_location.return_value = None
 
     with pytest.raises(NotFoundError, match="Location not found exists"):
         service.update_location("999", "New")
 
 
-def test_update_location_conflict(service, mock_repo):
-    mock_repo.get_location_by_id.return_value = {"id": "123", "name": "Old"}
-    mock_repo.get_location_by_name.return_value = {"id": "999"}
+def test_update_location_conflict(service, mock_repo, mock_nominatim):
+    mock_nominatim.get_location.return_value = (10.0, 20.0)
+    mock_repo.update_location.side_effect = ConflictError("Location already exists")
 
     with pytest.raises(ConflictError, match="Location already exists"):
         service.update_location("123", "Existing Name")
 
 
 def test_update_location_unprocessable(service, mock_repo, mock_nominatim):
-    mock_repo.get_location_by_id.return_value = {"id": "123", "name": "Old"}
-    mock_repo.get_location_by_name.return_value = None
     mock_nominatim.get_location.return_value = (None, None)
 
     with pytest.raises(UnprocessableEntityError, match="Name not found"):
@@ -98,15 +111,330 @@ def test_update_location_unprocessable(service, mock_repo, mock_nominatim):
 
 
 def test_delete_location_success(service, mock_repo):
-    mock_repo.get_location_by_id.return_value = {"id": "123"}
     mock_repo.delete_location.return_value = True
 
     result = service.delete_location("123")
     assert result is True
+    mock_repo.get_location_by_id.assert_not_called()
 
 
 def test_delete_location_not_found(service, mock_repo):
-    mock_repo.get_location_by_id.return_value = None
+    mock_repo.delete_location.return_value = False
 
     with pytest.raises(NotFoundError, match="Location not found"):
         service.delete_location("999")
+
+
+def test_get_nearby_locations_uses_memory_index(mock_repo, mock_nominatim, config):
+    index = Mock()
+    index.get_nearby_locations.return_value = [
+        {"id": "1", "name": "Test A", "lat": 10.0, "lon": 20.0, "distance_km": 1.2},
+    ]
+    service = LocationService(mock_repo, mock_nominatim, config, index)
+
+    result = service.get_nearby_locations(10.0, 20.0, 5.0)
+
+    assert result[0].id == "1"
+    mock_repo.get_nearby_locations.assert_not_called()
+
+
+def test_writes_keep_memory_index_in_sync(mock_repo, mock_nominatim, config):
+    index = Mock()
+    service = LocationService(mock_repo, mock_nominatim, config, index)
+    created = {"id": "123", "name": "New", "lat": 10.0, "lon": 20.0}
+    mock_repo.get_location_by_name.return_value = None
+    mock_repo.get_location_by_id.return_value = created
+    mock_nominatim.get_location.return_value = (10.0, 20.0)
+    mock_repo.create_location.return_value = created
+    mock_repo.update_location.return_value = created
+    mock_repo.delete_location.return_value = True
+
+    service.create_location("New")
+    service.update_location("123", "New")
+    service.delete_location("123")
+
+    assert index.upsert.call_count == 2
+    index.remove.assert_called_once_with("123")
+
+
+def test_get_nearby_locations_goes_through_cache(mock_repo, mock_nominatim, config):
+    cache = NearbyResultCache(max_rows=100, ttl=60, grid_deg=0.01, generation=lambda: 0)
+    mock_repo.get_nearby_locations.return_value = [
+        {"id": "1", "name": "Test A", "lon": 20.0, "lat": 10.0, "distance_km": 0.5},
+    ]
+    service = LocationService(mock_repo, mock_nominatim, config, nearby_cache=cache)
+
+    first = service.get_nearby_locations(10.001, 20.0, 5.0)
+    second = service.get_nearby_locations(10.002, 20.001, 5.0)
+
+    mock_repo.get_nearby_locations.assert_called_once()
+    assert first[0].distance_km == pytest.approx(0.1112, abs=1e-4)
+    assert second[0].distance_km == pytest.approx(0.2479, abs=1e-4)
+
+
+def test_writes_invalidate_nearby_cache(mock_repo, mock_nominatim, config):
+    cache = Mock()
+    service = LocationService(mock_repo, mock_nominatim, config, nearby_cache=cache)
+    created = {"id": "123", "name": "New", "lat": 10.0, "lon": 20.0}
+    mock_repo.get_location_by_name.return_value = None
+    mock_repo.get_location_by_id.return_value = created
+    mock_nominatim.get_location.return_value = (10.0, 20.0)
+    mock_repo.create_location.return_value = created
+    mock_repo.update_location.return_value = created
+    mock_repo.delete_location.return_value = True
+
+    service.create_location("New")
+    service.update_location("123", "New")
+    service.delete_location("123")
+
+    assert cache.invalidate.call_count == 3
+
+
+def test_create_locations_reports_each_item(service, mock_repo, mock_nominatim, config):
+    config.BATCH_MAX_ITEMS = 10
+    config.GEOCODE_WORKERS = 2
+    mock_repo.get_locations_by_names.return_value = [{"id": "1", "name": "Existing"}]
+    mock_nominatim.get_location.side_effect = lambda name: (None, None) if name == "Nowhere" else (10.0, 20.0)
+    mock_repo.create_locations.side_effect = lambda items: [
+        {"id": f"id-{name}", "name": name, "lat": lat, "lon": lon} for name, lat, lon in items
+    ]
+
+    result = service.create_locations(["New", "Existing", "Nowhere", "New"])
+
+    assert [item.status for item in result] == [201, 409, 422, 409]
+    assert result[0].location.id == "id-New"
+    mock_repo.get_locations_by_names.assert_called_once_with(["New", "Existing", "Nowhere"])
+    mock_repo.create_locations.assert_called_once_with([("New", 10.0, 20.0)])
+
+
+def test_create_locations_reports_conflicts_found_at_insert(service, mock_repo, mock_nominatim, config):
+    config.BATCH_MAX_ITEMS = 10
+    config.GEOCODE_WORKERS = 2
+    mock_repo.get_locations_by_names.return_value = []
+    mock_nominatim.get_location.return_value = (10.0, 20.0)
+    mock_repo.create_locations.return_value = [None, {"id": "2", "name": "B", "lat": 10.0, "lon": 20.0}]
+
+    result = service.create_locations(["A", "B", "b "])
+
+    assert [item.status for item in result] == [409, 201, 409]
+    mock_repo.create_locations.assert_called_once_with([("A", 10.0, 20.0), ("B", 10.0, 20.0)])
+
+
+def test_create_locations_geocoding_failure_is_per_item(service, mock_repo, mock_nominatim, config):
+    config.BATCH_MAX_ITEMS = 10
+    config.GEOCODE_WORKERS = 2
+    mock_repo.get_locations_by_names.return_value = []
+    mock_nominatim.get_location.side_effect = ValueError("Failed to fetch location")
+
+    result = service.create_locations(["A"])
+
+    assert result[0].status == 500
+    mock_repo.create_locations.assert_not_called()
+
+
+def test_create_locations_rejects_oversized_batch(service, config):
+    config.BATCH_MAX_ITEMS = 1
+
+    with pytest.raises(BadRequestError):
+        service.create_locations(["A", "B"])
+
+
+def test_import_locations_reports_counts(service, mock_repo):
+    mock_repo.import_locations.side_effect = lambda rows, chunk_size, defer_index: len(list(rows)) - 1
+    stream = io.StringIO('{"name": "A", "lat": 1, "lon": 2}\n{"name": "B", "lat": 3, "lon": 4}\n{"name": ""}\n')
+
+    stats = service.import_locations(stream, "ndjson", chunk_size=100)
+
+    assert stats["imported"] == 1
+    assert stats["skipped"] == 1
+    assert stats["rejected"] == 1
+    assert "rows_per_sec" in stats
+
+
+def test_import_locations_rejects_unknown_format(service, mock_repo):
+    with pytest.raises(BadRequestError):
+        service.import_locations(io.StringIO(""), "xml", chunk_size=100)
+    mock_repo.import_locations.assert_not_called()
+
+
+def test_list_locations_returns_next_cursor(service, mock_repo, config):
+    config.PAGE_DEFAULT_LIMIT = 2
+    config.PAGE_MAX_LIMIT = 10
+    mock_repo.list_locations.return_value = [
+        {"id": str(i), "name": f"Place {i}", "lat": 1.0, "lon": 2.0} for i in range(3)
+    ]
+
+    page = service.list_locations()
+
+    assert [loc.id for loc in page.items] == ["0", "1"]
+    assert decode_cursor(page.next_cursor) == {"id": "1"}
+    mock_repo.list_locations.assert_called_once_with(None, 3)
+
+
+def test_list_locations_last_page(service, mock_repo, config):
+    config.PAGE_DEFAULT_LIMIT = 2
+    config.PAGE_MAX_LIMIT = 10
+    mock_repo.list_locations.return_value = [{"id": "5", "name": "Place", "lat": 1.0, "lon": 2.0}]
+
+    page = service.list_locations(encode_cursor({"id": "4"}), 50)
+
+    assert page.next_cursor is None
+    mock_repo.list_locations.assert_called_once_with("4", 11)
+
+
+def test_list_locations_invalid_cursor(service, config):
+    config.PAGE_DEFAULT_LIMIT = 2
+    config.PAGE_MAX_LIMIT = 10
+
+    with pytest.raises(BadRequestError):
+        service.list_locations("not-a-cursor")
+
+
+def test_get_nearby_page_continues_after_distance_and_id(service, mock_repo, config):
+    config.PAGE_DEFAULT_LIMIT = 2
+    config.PAGE_MAX_LIMIT = 10
+    mock_repo.get_nearby_locations.return_value = [
+        {"id": str(i), "name": f"Place {i}", "lat": 1.0, "lon": 2.0, "distance_km": 0.5} for i in range(3)
+    ]
+    cursor = encode_cursor({"distance_km": 0.25, "id": "9"})
+
+    page = service.get_nearby_page(LocationNearbyPageIn(lat=1.0, lon=2.0, radius_km=5.0, cursor=cursor))
+
+    assert [loc.id for loc in page.items] == ["0", "1"]
+    assert decode_cursor(page.next_cursor) == {"distance_km": 0.5, "id": "1"}
+    mock_repo.get_nearby_locations.assert_called_once_with(1.0, 2.0, 5.0, (0.25, "9"), 3)
+
+
+@pytest.mark.parametrize(
+    "position",
+    [{"id": "1"}, {"distance_km": "1", "id": "1"}, {"distance_km": True, "id": "1"}, {"distance_km": 1.0, "id": 1}],
+)
+def test_get_nearby_page_invalid_cursor(service, config, position):
+    config.PAGE_DEFAULT_LIMIT = 2
+    config.PAGE_MAX_LIMIT = 10
+
+    with pytest.raises(BadRequestError):
+        service.get_nearby_page(LocationNearbyPageIn(lat=1.0, lon=2.0, cursor=encode_cursor(position)))
+
+
+def test_get_nearby_page_from_memory_index(mock_repo, mock_nominatim, config):
+    config.PAGE_DEFAULT_LIMIT = 2
+    config.PAGE_MAX_LIMIT = 10
+    index = Mock()
+    index.get_nearby_locations.return_value = [
+        {"id": id_, "name": id_, "lat": 1.0, "lon": 2.0, "distance_km": distance_km}
+        for distance_km, id_ in [(0.1, "a"), (0.2, "a"), (0.2, "b"), (0.2, "c"), (0.3, "a")]
+    ]
+    service = LocationService(mock_repo, mock_nominatim, config, index)
+    cursor = encode_cursor({"distance_km": 0.2, "id": "a"})
+
+    page = service.get_nearby_page(LocationNearbyPageIn(lat=1.0, lon=2.0, cursor=cursor))
+
+    assert [(loc.distance_km, loc.id) for loc in page.items] == [(0.2, "b"), (0.2, "c")]
+    assert decode_cursor(page.next_cursor) == {"distance_km": 0.2, "id": "c"}
+    mock_repo.get_nearby_locations.assert_not_called()
+
+
+def test_iter_nearby_rows_streams_from_the_repository(service, mock_repo, config):
+    config.NEAREST_INITIAL_RADIUS_KM = 5
+    config.NEARBY_STREAM_BATCH_SIZE = 100
+    service.nearby_cache = Mock()
+
+    service.iter_nearby_rows(1.0, 2.0, 50.0)
+
+    mock_repo.iter_nearby_locations.assert_called_once_with(1.0, 2.0, 50.0, 5, 100)
+    service.nearby_cache.get_nearby_locations.assert_not_called()
+
+
+def test_get_nearest_locations(service, mock_repo, config):
+    config.NEAREST_INITIAL_RADIUS_KM = 5
+    mock_repo.get_nearest_locations.return_value = [
+        {"id": "1", "name": "Test A", "lat": 10.0, "lon": 20.0, "distance_km": 1.2},
+    ]
+
+    result = service.get_nearest_locations(10.0, 20.0, 1)
+
+    assert isinstance(result[0], LocationNearbyOut)
+    mock_repo.get_nearest_locations.assert_called_once_with(10.0, 20.0, 1, 5)
+
+
+def test_get_nearby_locations_batch(service, mock_repo, config):
+    config.BATCH_MAX_ITEMS = 10
+    mock_repo.get_nearby_locations_batch.return_value = [
+        [{"id": "1", "name": "Test A", "lat": 10.0, "lon": 20.0, "distance_km": 1.2}],
+        [],
+    ]
+    queries = [LocationNearbyIn(lat=10.0, lon=20.0, radius_km=5), LocationNearbyIn(lat=50.0, lon=20.0)]
+
+    result = service.get_nearby_locations_batch(queries)
+
+    mock_repo.get_nearby_locations_batch.assert_called_once_with([(10.0, 20.0, 5.0), (50.0, 20.0, 10.0)])
+    assert [item.radius_km for item in result] == [5.0, 10.0]
+    assert isinstance(result[0].locations[0], LocationNearbyOut)
+    assert result[1].locations == []
+
+
+def test_get_nearby_locations_batch_too_many_queries(service, mock_repo, config):
+    config.BATCH_MAX_ITEMS = 1
+    queries = [LocationNearbyIn(lat=10.0, lon=20.0), LocationNearbyIn(lat=50.0, lon=20.0)]
+
+    with pytest.raises(BadRequestError):
+        service.get_nearby_locations_batch(queries)
+    mock_repo.get_nearby_locations_batch.assert_not_called()
+
+
+def test_get_locations_within_box(service, mock_repo, config):
+    config.PAGE_DEFAULT_LIMIT = 1
+    config.PAGE_MAX_LIMIT = 10
+    mock_repo.get_locations_within_box.return_value = [
+        {"id": "1", "name": "A", "lat": 1.0, "lon": 1.0},
+        {"id": "2", "name": "B", "lat": 2.0, "lon": 2.0},
+    ]
+
+    page = service.get_locations_within_box(LocationWithinBoxIn(bbox="0,0,3,3"))
+
+    mock_repo.get_locations_within_box.assert_called_once_with((0.0, 0.0, 3.0, 3.0), None, 2)
+    assert [loc.id for loc in page.items] == ["1"]
+    assert decode_cursor(page.next_cursor) == {"id": "1"}
+
+
+def test_get_locations_within_polygon(service, mock_repo, config):
+    config.PAGE_DEFAULT_LIMIT = 50
+    config.PAGE_MAX_LIMIT = 10
+    mock_repo.get_locations_within_polygon.return_value = []
+    geometry = {"type": "Polygon", "coordinates": [[[0, 0], [2, 0], [0, 1], [0, 0]]]}
+
+    page = service.get_locations_within_polygon(
+        LocationWithinPolygonIn(geometry=geometry, cursor=encode_cursor({"id": "4"}))
+    )
+
+    mock_repo.get_locations_within_polygon.assert_called_once_with(
+        {"type": "Polygon", "coordinates": [[[0.0, 0.0], [2.0, 0.0], [0.0, 1.0], [0.0, 0.0]]]},
+        (0.0, 0.0, 2.0, 1.0),
+        "4",
+        11,
+    )
+    assert page.items == []
+    assert page.next_cursor is None
+
+
+@pytest.mark.parametrize(
+    ("bbox", "zoom", "max_cells", "level"),
+    [
+        ("-180,-90,180,90", 0, 1024, 4),
+        ("-47,-24,-46,-23", 10, 1024, 12),
+        ("-46.64,-23.56,-46.63,-23.55", 22, 1024, 16),
+        ("-47,-24,-46,-23", 22, 1024, 12),
+        ("-47,-24,-46,-23", 22, 16, 10),
+        ("-180,-90,180,90", 10, 1, 4),
+    ],
+)
+def test_get_clusters_picks_level(service, mock_repo, config, bbox, zoom, max_cells, level):
+    config.CLUSTERS_MAX_CELLS = max_cells
+    mock_repo.get_clusters.return_value = [{"cell": 1, "count": 3, "lat": 1.0, "lon": 2.0}]
+
+    result = service.get_clusters(LocationClustersIn(bbox=bbox, zoom=zoom))
+
+    assert result.level == level
+    assert result.clusters[0].count == 3
+    mock_repo.get_clusters.assert_called_once_with(LocationClustersIn(bbox=bbox, zoom=zoom).bbox, level)
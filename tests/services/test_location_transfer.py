@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+from app.exceptions import BadRequestError
+from app.services.location_transfer import TransferStats, read_rows, write_rows
+
+
+def test_read_ndjson_skips_invalid_rows():
+    stream = io.StringIO(
+        '{"name": "A", "lat": 1.0, "lon": 2.0}\n'
+        '\n'
+        'not json\n'
+        '{"name": "B", "lat": 100.0, "lon": 2.0}\n'
+        '{"id": "b", "name": "C", "lat": -1.5, "lon": 3.5}\n'
+    )
+    stats = TransferStats()
+
+    rows = list(read_rows(stream, "ndjson", stats))
+
+    assert [(row.id, row.name) for row in rows] == [(None, "A"), ("b", "C")]
+    assert stats.rows == 2
+    assert stats.rejected == 2
+
+
+def test_read_csv():
+    stream = io.StringIO("id,name,lat,lon\n,A,1.0,2.0\nx,\"B, C\",3.0,4.0\n")
+
+    rows = list(read_rows(stream, "csv", TransferStats()))
+
+    assert [(row.id, row.name, row.lat, row.lon) for row in rows] == [(None, "A", 1.0, 2.0), ("x", "B, C", 3.0, 4.0)]
+
+
+def test_write_rows_round_trips():
+    locations = [{"id": str(i), "name": f"Place {i}", "lat": i / 10, "lon": -i / 10} for i in range(5)]
+
+    for fmt in ("ndjson", "csv"):
+        stats = TransferStats()
+        output = "".join(write_rows(iter(locations), fmt, stats, rows_per_chunk=2))
+
+        rows = list(read_rows(io.StringIO(output), fmt, TransferStats()))
+        assert [row.model_dump() for row in rows] == locations
+        assert stats.rows == 5
+
+
+def test_write_rows_is_lazy():
+    def rows():
+        yield {"id": "1", "name": "A", "lat": 1.0, "lon": 2.0}
+        raise AssertionError("consumed too far")
+
+    chunks = write_rows(rows(), "ndjson", rows_per_chunk=1)
+
+    assert next(chunks) == '{"id": "1", "name": "A", "lat": 1.0, "lon": 2.0}\n'
+
+
+def test_unsupported_format():
+    with pytest.raises(BadRequestError):
+        list(read_rows(io.StringIO(""), "xml", TransferStats()))
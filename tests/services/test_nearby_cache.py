@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+from app.repositories.location_memory_index import LocationMemoryIndex
+from app.services import nearby_cache
+from app.services.nearby_cache import NearbyResultCache
+
+
+@pytest.fixture
+def index():
+    rng = random.Random(3)
+    index = LocationMemoryIndex()
+    index.rebuild(
+        {"id": f"id-{i}", "name": f"Place {i}", "lat": rng.uniform(-23.7, -23.4), "lon": rng.uniform(-46.8, -46.4)}
+        for i in range(2000)
+    )
+    return index
+
+
+@pytest.fixture
+def generation():
+    return [0]
+
+
+@pytest.fixture
+def cache(generation):
+    return NearbyResultCache(max_rows=100000, ttl=60, grid_deg=0.01, generation=lambda: generation[0])
+
+
+def test_hits_return_exact_results_for_the_requested_point(cache, index):
+    rng = random.Random(4)
+    for _ in range(50):
+        # Points in the same few cells, so most lookups are hits on another point's entry
+        lat, lon = -23.55 + rng.uniform(-0.01, 0.01), -46.63 + rng.uniform(-0.01, 0.01)
+
+        result = cache.get_nearby_locations(lat, lon, 2.0, index.get_nearby_locations)
+
+        assert result == index.get_nearby_locations(lat, lon, 2.0)
+    assert cache.stats()["hits"] > 30
+
+
+@pytest.mark.parametrize(("lat", "lon"), [(89.995, 10.0), (-89.995, -170.0), (60.0, 179.999), (0.004, -0.004)])
+def test_cells_at_the_edges_of_the_map(lat, lon):
+    index = LocationMemoryIndex()
+    rng = random.Random(5)
+    index.rebuild(
+        {"id": str(i), "name": str(i), "lat": lat + rng.uniform(-0.004, 0.004), "lon": lon_}
+        for i in range(500)
+        for lon_ in [(lon + rng.uniform(-0.1, 0.1) + 180) % 360 - 180]
+    )
+    cache = NearbyResultCache(max_rows=1000, ttl=60, grid_deg=0.01, generation=lambda: 0)
+
+    cache.get_nearby_locations(lat - 0.004, lon, 5.0, index.get_nearby_locations)
+    result = cache.get_nearby_locations(lat, lon, 5.0, index.get_nearby_locations)
+
+    assert result == index.get_nearby_locations(lat, lon, 5.0)
+
+
+def load_one(calls):
+    def load(lat, lon, radius_km):
+        calls.append(lat)
+        return [{"id": "1", "name": "A", "lon": lon, "lat": lat, "distance_km": 0.0}]
+
+    return load
+
+
+def test_invalidate_drops_entries(cache):
+    calls = []
+
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load_one(calls))
+    cache.invalidate()
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load_one(calls))
+
+    assert len(calls) == 2
+
+
+def test_write_from_another_process_makes_entries_stale(cache, generation):
+    calls = []
+
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load_one(calls))
+    generation[0] += 1
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load_one(calls))
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load_one(calls))
+
+    assert len(calls) == 2
+    assert cache.stats()["generation"] == 1
+    assert cache.stats()["stale"] == 1
+
+
+def test_write_while_loading_is_not_served(cache, generation):
+    calls = []
+
+    def load(lat, lon, radius_km):
+        generation[0] += 1
+        return load_one(calls)(lat, lon, radius_km)
+
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load)
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load_one(calls))
+
+    assert len(calls) == 2
+
+
+def test_evicts_least_recently_used_entries_by_rows():
+    cache = NearbyResultCache(max_rows=2, ttl=60, grid_deg=1, generation=lambda: 0)
+    loads = []
+    load = load_one(loads)
+
+    cache.get_nearby_locations(1.0, 0.0, 1.0, load)
+    cache.get_nearby_locations(2.0, 0.0, 1.0, load)
+    cache.get_nearby_locations(1.0, 0.0, 1.0, load)
+    cache.get_nearby_locations(3.0, 0.0, 1.0, load)
+    cache.get_nearby_locations(1.0, 0.0, 1.0, load)
+    cache.get_nearby_locations(2.0, 0.0, 1.0, load)
+
+    assert loads == [1.0, 2.0, 3.0, 2.0]
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["rows"] == 2
+
+
+def test_entries_larger_than_the_bound_are_not_cached():
+    cache = NearbyResultCache(max_rows=1, ttl=60, grid_deg=1, generation=lambda: 0)
+
+    calls = []
+
+    cache.get_nearby_locations(1.0, 0.0, 1.0, lambda lat, lon, radius_km: load_one(calls)(lat, lon, radius_km) * 2)
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_reloaded(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(nearby_cache.time, "monotonic", lambda: now[0])
+    loads = []
+
+    def load(lat, lon, radius_km):
+        loads.append(lat)
+        return []
+
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load)
+    now[0] += 59
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load)
+    now[0] += 2
+    cache.get_nearby_locations(1.0, 1.0, 5.0, load)
+
+    assert len(loads) == 2
+    assert cache.stats() == {
+        "entries": 1,
+        "rows": 0,
+        "generation": 0,
+        "hits": 1,
+        "misses": 2,
+        "stale": 1,
+        "evictions": 0,
+        "hit_ratio": 1 / 3,
+    }
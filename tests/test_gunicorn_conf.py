@@ -0,0 +1,55 @@
+import runpy
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.config import Config
+
+CONF = Path(__file__).parent.parent / "gunicorn.conf.py"
+
+
+@pytest.fixture
+def conf():
+    return runpy.run_path(str(CONF))
+
+
+@pytest.fixture
+def worker():
+    registry = MagicMock()
+    return SimpleNamespace(wsgi=SimpleNamespace(extensions={"registry": registry}), registry=registry)
+
+
+def test_app_is_preloaded_and_threaded(conf):
+    assert conf["preload_app"] is True
+    assert conf["worker_class"] == "gthread"
+    assert conf["workers"] >= 1
+
+
+def test_worker_starts_its_registry_after_fork(conf, worker):
+    conf["post_worker_init"](worker)
+
+    worker.registry.startup.assert_called_once_with()
+    worker.registry.shutdown.assert_not_called()
+
+
+def test_worker_shuts_its_registry_down_on_exit(conf, worker):
+    conf["worker_exit"](None, worker)
+
+    worker.registry.shutdown.assert_called_once_with()
+
+
+@pytest.mark.parametrize(("engine", "workers"), [("sql", 4), ("memory", 1)])
+def test_server_starts(conf, monkeypatch, engine, workers):
+    monkeypatch.setattr(Config, "NEARBY_ENGINE", engine)
+
+    conf["on_starting"](SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+
+def test_memory_engine_refuses_several_workers(conf, monkeypatch):
+    # Each worker's snapshot would miss the writes made by the others
+    monkeypatch.setattr(Config, "NEARBY_ENGINE", "memory")
+
+    with pytest.raises(RuntimeError, match="single worker"):
+        conf["on_starting"](SimpleNamespace(cfg=SimpleNamespace(workers=2)))
@@ -0,0 +1,78 @@
+import json
+import logging
+import sys
+import time
+
+from app import logger as app_logger
+from app.logger import JsonFormatter, RateLimitFilter, _LazyQueueHandler, setup_logger
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord("app", logging.ERROR, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_writes_message_and_extra_fields():
+    line = JsonFormatter().format(make_record("Location with ID %s not found", "abc", suppressed=3))
+
+    entry = json.loads(line)
+    assert entry["message"] == "Location with ID abc not found"
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "app"
+    assert entry["suppressed"] == 3
+
+
+def test_json_formatter_includes_the_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("app", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(record))["exc_info"]
+
+
+def test_rate_limit_is_per_template_and_reports_what_it_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(app_logger.time, "monotonic", lambda: now[0])
+    limit = RateLimitFilter(limit=2, interval=10)
+
+    passed = [limit.filter(make_record("Location with ID %s not found", i)) for i in range(5)]
+    other = limit.filter(make_record("Location with name %s already exists", "A"))
+    now[0] += 10
+    record = make_record("Location with ID %s not found", 9)
+
+    assert passed == [True, True, False, False, False]
+    assert other
+    assert limit.filter(record)
+    assert record.suppressed == 3
+
+
+def test_queue_handler_renders_the_message_when_logged():
+    names = ["A"]
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("app", logging.ERROR, __file__, 1, "Failed to import %s", (names,), sys.exc_info())
+
+    prepared = _LazyQueueHandler(None).prepare(record)
+    names.append("B")
+
+    assert prepared.getMessage() == "Failed to import ['A']"
+    assert prepared.exc_info[0] is ValueError
+
+
+def test_records_are_written_by_the_background_thread(capsys):
+    logger = setup_logger("pipeline-test", level="INFO")
+    logger.propagate = False
+
+    logger.debug("hidden %s", "debug")
+    logger.info("Location with ID %s not found", "abc")
+
+    deadline = time.monotonic() + 2
+    output = ""
+    while "abc" not in output and time.monotonic() < deadline:
+        time.sleep(0.01)
+        output += capsys.readouterr().out
+    assert json.loads(output.splitlines()[-1])["message"] == "Location with ID abc not found"
+    assert "hidden" not in output
@@ -0,0 +1,86 @@
+import threading
+
+from app.metrics import Metrics, statement_family
+
+
+def test_histogram_renders_cumulative_buckets():
+    metrics = Metrics()
+    histogram = metrics.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1))
+    histogram.observe(0.05, "read")
+    histogram.observe(0.5, "read")
+    histogram.observe(5, "read")
+
+    lines = metrics.render().splitlines()
+
+    assert lines[:2] == ["# HELP op_seconds Op latency", "# TYPE op_seconds histogram"]
+    assert lines[2:] == [
+        'op_seconds_bucket{op="read",le="0.1"} 1',
+        'op_seconds_bucket{op="read",le="1"} 2',
+        'op_seconds_bucket{op="read",le="+Inf"} 3',
+        'op_seconds_sum{op="read"} 5.55',
+        'op_seconds_count{op="read"} 3',
+    ]
+
+
+def test_counter_and_gauges():
+    metrics = Metrics()
+    counter = metrics.counter("errors_total", "Errors", ("kind",))
+    counter.inc('say "hi"\n')
+    counter.inc('say "hi"\n', amount=2)
+
+    text = metrics.render({"pool": {"open": 2, "hit_ratio": 0.5, "name": "ignored"}})
+
+    assert 'errors_total{kind="say \\"hi\\"\\n"} 3' in text
+    assert "pool_open 2\n" in text
+    assert "pool_hit_ratio 0.5\n" in text
+    assert "pool_name" not in text
+
+
+def test_registering_twice_returns_the_same_metric():
+    metrics = Metrics()
+
+    assert metrics.counter("c", "C") is metrics.counter("c", "C")
+
+
+def test_concurrent_observations_are_not_lost():
+    histogram = Metrics().histogram("h", "H", ("worker",))
+
+    def observe():
+        for i in range(10000):
+            histogram.observe(i / 10000, "w")
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert histogram.count("w") == 80000
+
+
+def test_short_lived_threads_do_not_accumulate_shards():
+    metrics = Metrics()
+    counter = metrics.counter("c", "C", ("kind",))
+    histogram = metrics.histogram("h", "H")
+
+    def record():
+        counter.inc("a")
+        histogram.observe(0.01)
+
+    for _ in range(1000):
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+
+    assert len(counter._shards) <= 1
+    assert len(histogram._shards) <= 1
+    assert counter.value("a") == 1000
+    assert histogram.count() == 1000
+    assert "h_count 1000" in metrics.render()
+
+
+def test_statement_family():
+    assert statement_family("SELECT id FROM locations WHERE id = ?") == "select_locations"
+    assert statement_family("\n    INSERT INTO geocode_cache (name_key) VALUES (?)") == "insert_geocode_cache"
+    assert statement_family("UPDATE locations SET name = ?") == "update_locations"
+    assert statement_family("PRAGMA user_version") == "pragma"
@@ -0,0 +1,46 @@
+from app.profiling import Profile, ProfileStore, current_profile
+
+
+def test_profile_is_current_until_finished():
+    profile = Profile("GET", "/api/v1/locations/nearby", "token").start()
+
+    assert current_profile() is profile
+    report = profile.finish(200)
+
+    assert current_profile() is None
+    assert report["status"] == 200
+    assert report["functions"]
+    assert {"function", "calls", "total_ms", "cumulative_ms"} <= set(report["functions"][0])
+
+
+def test_statement_timings_go_to_the_last_top_level_statement():
+    profile = Profile("POST", "/api/v1/locations/", "sample").start()
+    profile.trace("INSERT INTO locations VALUES ('a')")
+    profile.trace("-- TRIGGER gii_locations_geom")
+    entry = profile.finish_statement("insert_locations", 0.0015)
+    report = profile.finish(201)
+
+    assert entry is report["statements"][0]
+    assert report["statements"][0]["statement"] == "insert_locations"
+    assert report["statements"][0]["ms"] == 1.5
+    assert report["statements"][1]["ms"] is None
+
+
+def test_second_profile_in_flight_skips_the_call_profile():
+    first = Profile("GET", "/a", "token").start()
+    second = Profile("GET", "/b", "token").start()
+
+    assert second.finish(200)["functions"] is None
+    assert first.finish(200)["functions"] is not None
+
+
+def test_store_keeps_the_latest_reports():
+    store = ProfileStore(2)
+    for i in range(3):
+        store.add({"id": str(i), "method": "GET", "path": "/", "status": 200, "reason": "sample",
+                   "started_at": 0.0, "ms": 1.0, "statements": [{}] * i})
+
+    assert [summary["id"] for summary in store.summaries()] == ["1", "2"]
+    assert store.summaries()[1]["statements"] == 2
+    assert store.get("0") is None
+    assert store.get("2")["id"] == "2"
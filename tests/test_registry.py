@@ -0,0 +1,77 @@
+import pytest
+
+from app.config import Config
+from app.database.sqlite import DatabaseSqlite
+from app.external.gazetteer import GazetteerGeocoder
+from app.external.nominatim_api import NominatimAPI
+from app.registry import Registry
+from main import create_app
+
+
+def make_config(spatial_db, **overrides):
+    class TestConfig(Config):
+        DATABASE = spatial_db.config.DATABASE
+        DB_POOL_SIZE = 2
+
+    for name, value in overrides.items():
+        setattr(TestConfig, name, value)
+    return TestConfig()
+
+
+def test_create_app_keeps_one_registry():
+    registry = Registry()
+    app = create_app(registry)
+
+    with app.app_context():
+        assert Registry.current() is registry
+        assert Registry.current().location() is registry.location()
+
+
+def test_startup_warms_pool_and_memory_index(spatial_db):
+    registry = Registry(make_config(spatial_db, NEARBY_ENGINE="memory"))
+    registry.location_repository().create_location("A", 1.0, 2.0)
+
+    registry.startup()
+
+    assert registry.db.pool_stats()["open"] == 2
+    assert len(registry.nearby_index()) == 1
+    assert registry.location().nearby_index is registry.nearby_index()
+    registry.shutdown()
+
+
+def test_shutdown_closes_pool(spatial_db):
+    registry = Registry(make_config(spatial_db))
+    registry.startup()
+
+    registry.shutdown()
+
+    assert spatial_db.config.DATABASE not in DatabaseSqlite._pools
+
+
+@pytest.mark.parametrize(
+    ("geocoder", "expected", "fallback"),
+    [
+        ("nominatim", NominatimAPI, None),
+        ("gazetteer", GazetteerGeocoder, NominatimAPI),
+        ("offline", GazetteerGeocoder, None),
+    ],
+)
+def test_geocoder_is_selected_by_config(spatial_db, tmp_path, geocoder, expected, fallback):
+    registry = Registry(make_config(spatial_db, GEOCODER=geocoder, GAZETTEER_DATABASE=str(tmp_path / "gazetteer.db")))
+
+    selected = registry.location().nominatim_api
+
+    assert type(selected) is expected
+    assert type(getattr(selected, "fallback", None)) is (fallback or type(None))
+    registry.shutdown()
+
+
+def test_stats_cover_pool_and_caches(spatial_db):
+    registry = Registry(make_config(spatial_db, NEARBY_ENGINE="memory", NEARBY_CACHE_MAX_ROWS=10))
+    registry.startup()
+
+    stats = registry.stats()
+
+    assert set(stats) == {"db_pool", "geocode_cache", "nearby_cache", "nearby_index"}
+    assert stats["db_pool"]["open"] == 2
+    registry.shutdown()